@@ -1,15 +1,26 @@
-import argparse, asyncio, json, os, re, sys, time, difflib, random, statistics, math, copy
+import argparse, asyncio, json, os, re, sys, time, random, statistics, math, copy
 from urllib.parse import urlparse, urljoin, parse_qs, urlencode, urlunparse
 from typing import Dict, List, Set, Tuple, Optional, Any, Union
 from collections import defaultdict, Counter, deque
-from bs4 import BeautifulSoup
-import numpy as np
 try:
     from llama_cpp import Llama
 except Exception:
     Llama=None
-from playwright.async_api import async_playwright
 import cloudscraper
+from sqldetector.core.bulk import sliding_window
+from sqldetector.net.scraper_pool import ScraperPool
+from sqldetector.smart.browser.pool import shared_pool
+from sqldetector.discovery.crawler import BrowserCrawler, same_site
+from sqldetector.net.prewarm import Prewarmer
+from sqldetector.detect.features import extract_features
+from sqldetector.detect.sql_errors import SQL_ERROR_RX
+from sqldetector.diff.engine import get_engine
+from sqldetector.payload.variants import VariantGenerator
+from sqldetector.core.stages import Stage, StagedPipeline
+from sqldetector.core.profile_cache import ProfileCache
+from sqldetector.timing.sequential import SequentialTimingEngine
+from sqldetector.runners.sharded import resolve_workers, run_sharded, shards_for
+from sqldetector.pacing.host_bucket import HostRateLimiter
 try:
     from colorama import init, Fore, Back, Style
     init(autoreset=True)
@@ -22,11 +33,10 @@ except ImportError:
     Back = DummyColor()
     Style = DummyColor()
 
-SQL_ERROR_RX=re.compile(r"(SQL syntax.*MySQL|Warning.*mysql_|valid MySQL result|PostgreSQL.*ERROR|SQL Server|ODBC.*SQL Server|SQLite.*(?:error|Exception)|UNION.*SELECT|ORA-\d{5}|psql:|PG::|SequelizeDatabaseError|ActiveRecord::StatementInvalid|PDOException|MySqlException|DataSourceError|org\.hibernate|JDBCException|System\.Data\.SqlClient|sqlite3\.OperationalError)",re.I)
 DB_RX={"mysql":r"MySQL|mysql_|PDO.*MySQL|MySqlException","pgsql":r"PostgreSQL|PG::|org\.postgresql|psql:","mssql":r"SQL Server|ODBC.*SQL Server|System\.Data\.SqlClient|mssql|Microsoft OLE DB Provider for SQL Server","oracle":r"ORA-\d{5}|Oracle error|oci_","sqlite":r"SQLite|sqlite_error|sqlite3\.OperationalError"}
 FRAME_RX=re.compile(r"(django|laravel|symfony|express|rails|spring|asp\.net|next\.js|nuxt|strapi|nestjs|adonis|koa|gin|fastapi|flask)",re.I)
-JS_URL_RX=re.compile(r'(["\'])(https?://[^"\']+)\1|(?:fetch|axios\.(?:get|post)|open)\(\s*(["\'])(/[^"\']+)\3',re.I)
-JSON_URL_RX=re.compile(r'["\']url["\']\s*:\s*["\'](/[^"\']+)["\']')
+# içerik farkı motoru: "fast" (doğrusal, maliyet sınırlı) ya da "difflib"
+DIFF=get_engine(os.getenv("DIFF_ENGINE", "fast") or "fast")
 
 def sp():
     x=os.getenv("SYSTEM_PROMPT")
@@ -200,11 +210,11 @@ class LearningDetectionEngine:
     def calculate_basic_score(self, baseline, test_result):
         html1 = baseline.get("html", "")
         html2 = test_result.get("html", "")
-        content_diff = 1.0 - difflib.SequenceMatcher(None, html1, html2).ratio()
+        content_diff = 1.0 - DIFF.ratio(html1, html2)
         tags1 = self.tag_profile(html1)
         tags2 = self.tag_profile(html2)
         tag_diff = self.profile_dist(tags1, tags2)
-        sql_error = bool(SQL_ERROR_RX.search(html2))
+        sql_error = extract_features(html2).sql_error
         header_change = 0
         for k in ["content-encoding", "transfer-encoding", "content-length"]:
             if test_result.get("headers", {}).get(k, "") != baseline.get("headers", {}).get(k, ""):
@@ -214,14 +224,7 @@ class LearningDetectionEngine:
         return score
 
     def tag_profile(self, html):
-        soup = BeautifulSoup(html, "html.parser")
-        d = {}
-        for el in soup.find_all(True):
-            t = el.name
-            d[t] = d.get(t, 0) + 1
-        total = sum(d.values()) or 1
-        for k in d: d[k] = d[k] / total
-        return d
+        return extract_features(html).tag_profile
 
     def profile_dist(self, a, b):
         keys = set(a.keys()) | set(b.keys())
@@ -259,7 +262,7 @@ class LearningDetectionEngine:
         return {
             'score': final_score,
             'confidence': self.calculate_confidence(final_score),
-            'sql_error': bool(SQL_ERROR_RX.search(test_result.get("html", ""))),
+            'sql_error': extract_features(test_result.get("html", "")).sql_error,
             'is_vulnerable': final_score > 0.8,
             'details': {'basic_score': basic_score, 'contextual_score': contextual_score}
         }
@@ -297,40 +300,6 @@ class DynamicFrameworkAdapter:
                 adaptations['header_modifications'].update(signature.get('default_headers', {}))
         return adaptations
 
-class IntelligentEncoder:
-    def __init__(self):
-        self.encoding_strategies = [
-            'url_encoding', 'double_url_encoding', 'unicode_encoding', 'html_entities',
-            'comment_injection', 'whitespace_variants', 'case_variations'
-        ]
-
-    def generate_smart_encodings(self, payload):
-        encodings = set([payload])
-        encodings.add(payload.replace("'", "%27").replace('"', "%22"))
-        encodings.add(payload.replace("'", "%2527").replace('"', "%2522"))
-        encodings.add(payload.replace("'", "&#39;").replace('"', "&#34;"))
-        encodings.add(payload.replace(" ", "/**/"))
-        encodings.add(payload.replace("OR", "O/**/R").replace("or", "o/**/r"))
-        encodings.add(payload.replace(" ", "\u00A0"))
-        encodings.add(payload.replace(" ", "\u2003"))
-        encodings.add(payload.replace(" ", "+"))
-        encodings.add(payload.replace("'", "\u0027"))
-        encodings.add(payload.replace('"', "\u0022"))
-        if "OR" in payload: encodings.add(payload.replace("OR", "oR"))
-        if "AND" in payload: encodings.add(payload.replace("AND", "aNd"))
-        if "SELECT" in payload: encodings.add(payload.replace("SELECT", "SeLeCt"))
-        zero_width_payloads = set()
-        for p in encodings:
-            zero_width_payloads.add(p)
-            zero_width_payloads.add("\u200b".join(list(p)))
-            zero_width_payloads.add("\u200c".join(list(p)))
-        encodings.update(zero_width_payloads)
-        try:
-            hex_payload = ''.join([f'%{ord(c):02x}' for c in payload])
-            encodings.add(hex_payload)
-        except: pass
-        return list(encodings)
-
 class BehavioralProfiler:
     def __init__(self):
         self.baseline_profiles = {}
@@ -397,9 +366,7 @@ class BehavioralProfiler:
         tag_counts = []
         for response in responses:
             html = response.get('html', '')
-            soup = BeautifulSoup(html, 'html.parser')
-            tags = [tag.name for tag in soup.find_all()]
-            tag_counts.append(len(set(tags)))
+            tag_counts.append(len(extract_features(html).tags))
         return {
             'avg_length': statistics.mean(lengths) if lengths else 0,
             'std_length': statistics.stdev(lengths) if len(lengths) > 1 else 0,
@@ -785,78 +752,45 @@ class AdvancedTimingAnalyzer:
         self.side_channel_detectors = {}
 
     async def comprehensive_timing_analysis(self, target_url, test_payloads):
+        # A/B/A' aralıklı örnekleme, payloadlar paralel; her payload ardışık test karar verince durur.
+        # http_fetch hatada Playwright'a düşer; zamanlama için hata fırlatan doğrudan istek gerekir
+        async def send(url):
+            return await SCRAPERS.get(url, headers={"User-Agent": UA}, timeout=25, allow_redirects=True)
+
+        engine = SequentialTimingEngine(
+            send,
+            method=os.getenv("TIMING_METHOD", "sprt") or "sprt",
+            max_rounds=int(os.getenv("TIMING_MAX_ROUNDS", "10") or "10"),
+            per_host=int(os.getenv("TIMING_PER_HOST", "4") or "4"),
+            limiter=TIMING_LIMITER,
+        )
+        payloads = test_payloads[:10]
+        variants = [self.inject_payload_to_url(target_url, p) for p in payloads]
+        verdicts = await engine.test_many(target_url, variants)
         timing_results = []
-        baseline_timings = await self.create_timing_baseline(target_url, samples=15)
-        for payload in test_payloads[:10]:
-            payload_timings = await self.test_payload_timing(target_url, payload, samples=8)
-            timing_analysis = self.analyze_timing_statistics(baseline_timings, payload_timings)
+        for payload, verdict in zip(payloads, verdicts):
             timing_results.append({
                 'payload': payload,
-                'timing_analysis': timing_analysis,
-                'side_channel_signals': await self.detect_side_channels(payload_timings)
+                'timing_analysis': self.analyze_timing_statistics(verdict),
+                'side_channel_signals': await self.detect_side_channels(verdict.variant_times)
             })
         return timing_results
 
-    async def create_timing_baseline(self, target_url, samples=15):
-        timings = []
-        for i in range(samples):
-            try:
-                start_time = time.time()
-                response = await http_fetch(target_url)
-                end_time = time.time()
-                timings.append(end_time - start_time)
-            except Exception:
-                timings.append(None)
-        valid_timings = [t for t in timings if t is not None]
-        if not valid_timings:
-            return {'mean': 0, 'median': 0, 'std_dev': 0, 'percentiles': {}}
-        return {
-            'mean': statistics.mean(valid_timings),
-            'median': statistics.median(valid_timings),
-            'std_dev': statistics.stdev(valid_timings) if len(valid_timings) > 1 else 0,
-            'percentiles': self.calculate_percentiles(valid_timings)
-        }
-
-    def calculate_percentiles(self, timings):
-        if not timings:
-            return {}
-        sorted_timings = sorted(timings)
-        percentiles = {}
-        for p in [25, 50, 75, 90, 95, 99]:
-            percentiles[p] = np.percentile(sorted_timings, p)
-        return percentiles
-
-    async def test_payload_timing(self, target_url, payload, samples=8):
-        timings = []
-        test_url = self.inject_payload_to_url(target_url, payload)
-        for i in range(samples):
-            try:
-                start_time = time.time()
-                await http_fetch(test_url)
-                end_time = time.time()
-                timings.append(end_time - start_time)
-            except Exception:
-                timings.append(None)
-        return [t for t in timings if t is not None]
-
-    def analyze_timing_statistics(self, baseline, payload_timings):
-        if not payload_timings:
+    def analyze_timing_statistics(self, verdict):
+        if not verdict.variant_times:
             return {'anomaly': False, 'score': 0}
-        baseline_mean = baseline.get('mean', 0)
-        baseline_std = baseline.get('std_dev', 0)
-        payload_mean = statistics.mean(payload_timings)
-        if baseline_std > 0:
-            z_score = abs(payload_mean - baseline_mean) / baseline_std
-            anomaly = z_score > 2.5
-        else:
-            ratio = payload_mean / baseline_mean if baseline_mean > 0 else 0
-            anomaly = ratio > 3 or ratio < 0.3
+        baseline_mean = statistics.mean(verdict.control_times)
+        payload_mean = statistics.mean(verdict.variant_times)
         return {
-            'anomaly': anomaly,
-            'z_score': z_score if baseline_std > 0 else 0,
+            'anomaly': verdict.detected,
+            'decided': verdict.decided,
+            'rounds': verdict.rounds,
+            'requests': verdict.requests,
+            'shift': verdict.shift,
             'ratio': payload_mean / baseline_mean if baseline_mean > 0 else 0,
             'payload_mean': payload_mean,
-            'baseline_mean': baseline_mean
+            'baseline_mean': baseline_mean,
+            **verdict.stats
         }
 
     async def detect_side_channels(self, timings):
@@ -1538,9 +1472,9 @@ class AISecurityOrchestrator:
         print(f"{Fore.CYAN}{Style.BRIGHT}[*] AI: Bütüncül güvenlik değerlendirmesi başlatılıyor: {target_url}")
         target_analysis = await self.initial_target_analysis(target_url)
         print(f"{Fore.GREEN}[+] AI: Hedef analizi tamamlandı: {target_analysis.get('risk_level', 'unknown')}")
-        behavioral_profile = await self.modules['behavioral_profiler'].create_behavioral_baseline(target_url)
+        behavioral_profile = await PROFILES.for_route("behaviour", target_url, lambda: self.modules['behavioral_profiler'].create_behavioral_baseline(target_url))
         print(f"{Fore.GREEN}[+] AI: Davranışsal profil oluşturuldu")
-        security_analysis = await self.modules['security_detector'].detect_security_mechanisms(target_url)
+        security_analysis = await PROFILES.for_host("security", target_url, lambda: self.modules['security_detector'].detect_security_mechanisms(target_url))
         print(f"{Fore.GREEN}[+] AI: Güvenlik mekanizmaları tespit edildi: {security_analysis.get('waf_type', 'none')}")
         test_strategy = await self.modules['strategy_engine'].develop_dynamic_strategy({
             'target_analysis': target_analysis, 'behavioral_profile': behavioral_profile, 'security_analysis': security_analysis
@@ -1599,11 +1533,10 @@ class AISecurityOrchestrator:
 
     def analyze_target_complexity(self, html, headers):
         complexity_score = 0
-        soup = BeautifulSoup(html, 'html.parser')
-        tag_count = len(soup.find_all())
-        complexity_score += min(tag_count / 100, 3)
+        features = extract_features(html)
+        complexity_score += min(features.tag_total / 100, 3)
         complexity_score += min(len(headers) / 5, 2)
-        if '<script' in html.lower():
+        if features.tags.get('script'):
             complexity_score += 1
         if complexity_score >= 4:
             return 'high'
@@ -1869,32 +1802,19 @@ class Qwen:
         u = list(dict.fromkeys(out))
         return u[:n] if u else []
 
+# lxml ile tek ayrıştırma, gövde özetine göre önbellekli (bkz. extract_features)
 def core_html(html):
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup(["script", "style", "noscript", "nav", "header", "footer", "svg", "canvas", "meta", "link"]):
-        tag.decompose()
-    mains = soup.find_all(["main", "article"])
-    target = mains[0] if mains else soup.body or soup
-    txt = target.get_text(" ", strip=True)
-    return re.sub(r"\s+", " ", txt).strip()
+    return extract_features(html).core_text
 
 def tag_profile(html):
-    soup = BeautifulSoup(html, "html.parser")
-    d = {}
-    for el in soup.find_all(True):
-        t = el.name
-        d[t] = d.get(t, 0) + 1
-    total = sum(d.values()) or 1
-    for k in list(d.keys()):
-        d[k] = d[k] / total
-    return d
+    return extract_features(html).tag_profile
 
 def profile_dist(a, b):
     keys = set(a.keys()) | set(b.keys())
     return sum(abs(a.get(k, 0) - b.get(k, 0)) for k in keys)
 
 def diff_ratio(a, b):
-    return 1.0 - difflib.SequenceMatcher(None, a, b).ratio()
+    return 1.0 - DIFF.ratio(a, b)
 
 def detect_db(text, headers):
     for db, rx in DB_RX.items():
@@ -1904,136 +1824,24 @@ def detect_db(text, headers):
         if re.search(rx, s, re.I): return db
     return "generic"
 
-def enc_mut(payload):
-    out = set([payload])
-    try:
-        out.add(payload.encode("utf-8").decode("utf-8"))
-    except: pass
-    out.add(payload.replace("'", "%27").replace('"', "%22"))
-    out.add(payload.replace("'", "%2527").replace('"', "%2522"))
-    out.add(payload.replace("'", "&#39;").replace('"', "&#34;"))
-    out.add(payload.replace(" ", "/**/"))
-    out.add(payload.replace("or", "o/**/r").replace("OR", "O/**/R"))
-    out.add(payload.replace("1=1", "1%3D1"))
-    fw = str.maketrans({"'": "＇", '"': "＂", " ": "\u00A0"})
-    out.add(payload.translate(fw))
-    out2 = set()
-    for p in out:
-        out2.add(p)
-        out2.add("\u200b".join(list(p)))
-    return list(dict.fromkeys(out2))
-
-def build_get(url, payloads, only_param=None, headersets=None):
-    parsed = urlparse(url)
-    qs = parse_qs(parsed.query, keep_blank_values=True)
-    v = []
-    headersets = headersets or [None, {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}]
-    for param in qs:
-        if only_param and param != only_param: continue
-        ov = qs[param][0]
-        for payload in payloads:
-            for m in enc_mut(payload):
-                qsm = qs.copy()
-                qsm[param] = [ov + m]
-                new_query = urlencode(qsm, doseq=True, safe=":/@")
-                for h in headersets:
-                    v.append(("GET", urlunparse(parsed._replace(query=new_query)), param, {}, h))
-    return v
-
-def build_post(form, payloads, only_param=None, headersets=None):
-    action = form['action']
-    base = dict(form.get('inputs') or {})
-    v = []
-    headersets = headersets or [None, {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}]
-    for param in list(base.keys()):
-        if only_param and param != only_param: continue
-        ov = base[param]
-        for payload in payloads:
-            for m in enc_mut(payload):
-                d = base.copy()
-                d[param] = f"{ov}{m}"
-                for h in headersets:
-                    v.append(("POST", action, param, d, h))
-    return v
-
 async def browser_crawl(start_url, max_pages, include_subdomains=True, headless=True):
-    out_urls = set()
-    forms_all = []
-    js_inline_targets = set()
-    net_targets = set()
-    headers_any = {}
-    frames = set()
-    pr = urlparse(start_url)
-    root_domain = pr.hostname or ""
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless, args=["--disable-web-security", "--no-sandbox"])
-        context = await browser.new_context(
-            ignore_https_errors=True, 
-            java_script_enabled=True, 
-            user_agent="SQLDetector/7.0"
-        )
-        page = await context.new_page()
-        async def on_request(req):
-            try:
-                u = req.url
-                pu = urlparse(u)
-                if pu.scheme.startswith("http"):
-                    if (pu.hostname or "").endswith(root_domain) or (include_subdomains and root_domain in (pu.hostname or "")):
-                        net_targets.add(u)
-            except: pass
-        page.on("request", on_request)
-        q = [start_url]
-        seen = set(q)
-        while q and len(seen) < max_pages:
-            u = q.pop(0)
-            try:
-                r = await page.goto(u, wait_until="domcontentloaded", timeout=25000)
-                await page.wait_for_timeout(500)
-                await page.wait_for_load_state("networkidle", timeout=25000)
-                cheaders = r.headers if r else {}
-                headers_any.update({k.lower(): v for k, v in cheaders.items()})
-                html = await page.content()
-                frames.update([f.lower() for f in FRAME_RX.findall(html)])
-                soup = BeautifulSoup(html, "html.parser")
-                for a in soup.find_all("a", href=True):
-                    nh = urljoin(u, a["href"])
-                    pu = urlparse(nh)
-                    if pu.scheme.startswith("http"):
-                        if (pu.hostname or "").endswith(root_domain) or (include_subdomains and root_domain in (pu.hostname or "")):
-                            if nh not in seen:
-                                seen.add(nh)
-                                q.append(nh)
-                for form in soup.find_all("form"):
-                    action = form.get("action") or u
-                    method = (form.get("method") or "get").lower()
-                    inputs = {}
-                    for inp in form.find_all(['input', 'select', 'textarea']):
-                        name = inp.get('name')
-                        if not name: continue
-                        val = inp.get('value') or ''
-                        inputs[name] = val
-                    forms_all.append({
-                        "action": urljoin(u, action),
-                        "method": method,
-                        "inputs": inputs
-                    })
-                for script in soup.find_all("script"):
-                    txt = script.string or ""
-                    for m in JS_URL_RX.finditer(txt):
-                        if m.group(2):
-                            js_inline_targets.add(m.group(2))
-                        elif m.group(4):
-                            js_inline_targets.add(urljoin(u, m.group(4)))
-                    for m in JSON_URL_RX.finditer(txt):
-                        js_inline_targets.add(urljoin(u, m.group(1)))
-                out_urls.add(u)
-                if len(seen) >= max_pages: break
-            except Exception as e:
-                print(f"{Fore.YELLOW}[!] Crawl hatası {u}: {e}")
-                continue
-        await browser.close()
-    urls = set(filter(lambda x: urlparse(x).scheme.startswith("http"), out_urls | js_inline_targets | net_targets))
-    return urls, forms_all, headers_any, list(frames)
+    # paralel sayfalarla, Frontier önceliğine göre tarama; bağlantı/form/JS çıkarımı sayfa içinde yapılır
+    # her yeni origin için tarama sırasında SCRAPERS oturumları ısıtılır (challenge + keep-alive)
+    warm = Prewarmer(SCRAPERS, SCRAPERS.per_host)
+    crawler = BrowserCrawler(
+        browsers(headless),
+        pages=int(os.getenv("CRAWL_PAGES", "4") or "4"),
+        max_pages=max_pages,
+        rate=float(os.getenv("CRAWL_RATE", "0") or "0"),
+        in_scope=same_site(start_url, include_subdomains),
+        markers=FRAME_RX,
+        on_host=warm.add,
+    )
+    result = await crawler.crawl([start_url])
+    await warm.wait()
+    for u, err in result.errors.items():
+        print(f"{Fore.YELLOW}[!] Crawl hatası {u}: {err}")
+    return result.urls(), result.forms, result.headers, list(result.markers)
 
 def synth_params(urls):
     out = set()
@@ -2058,29 +1866,83 @@ def risk_score(url):
     if any(x in pu.path.lower() for x in ["admin", "report", "export"]): score += 2
     return score
 
-# cloudscraper entegrasyonu
+UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36 SQLDetector/7.0"
+
+# cloudscraper entegrasyonu: host başına oturum havuzu, istekler thread havuzunda
+SCRAPERS = ScraperPool(
+    per_host=int(os.getenv("SCRAPER_PER_HOST", "8") or "8"),
+    max_workers=int(os.getenv("SCRAPER_WORKERS", "32") or "32"),
+    factory=cloudscraper.create_scraper,
+)
+
+# zamanlama testleri için host başına istek hızı (istek/sn, 0 = sınırsız)
+TIMING_LIMITER = HostRateLimiter(float(os.getenv("TIMING_RATE", "5") or "5"))
+
+# tarama istekleri için host başına hız (istek/sn, 0 = sınırsız); parçalı modda
+# işçi süreçler ebeveynin paylaşılan kovalarını kullanır
+SCAN_RATE = float(os.getenv("SCAN_RATE", "0") or "0")
+SCAN_LIMITER = HostRateLimiter(SCAN_RATE)
+
+# host/rota profil önbelleği: WAF, framework ve davranış profili bir kez hesaplanır
+PROFILES = ProfileCache(
+    ttl=float(os.getenv("PROFILE_TTL", "1800") or "1800"),
+    persist=os.getenv("PROFILE_PERSIST", "0") == "1",
+)
+
+def browsers(headless=True):
+    # tek tarayıcı, bağlam havuzu; resim/font/medya istekleri engellenir.
+    # ayarlar yalnızca havuz ilk oluşturulurken geçerlidir
+    return shared_pool(
+        headless=headless,
+        size=int(os.getenv("BROWSER_POOL_SIZE", "4") or "4"),
+        max_uses=int(os.getenv("BROWSER_CONTEXT_USES", "50") or "50"),
+        context_options={
+            "java_script_enabled": True,
+            "user_agent": UA,
+        },
+    )
+
+async def browser_fetch(url, method="GET", extra_headers=None):
+    async with browsers().page() as page:
+        if extra_headers:
+            await page.set_extra_http_headers(extra_headers)
+        start_time = time.time()
+        if method.upper() == "GET":
+            r = await page.goto(url, wait_until="domcontentloaded", timeout=25000)
+            await page.wait_for_load_state("networkidle", timeout=25000)
+        else: # POST için basit form submit
+            r = None
+            await page.goto(url, wait_until="domcontentloaded", timeout=25000)
+            await page.wait_for_load_state("networkidle", timeout=25000)
+        html = await page.content()
+        end_time = time.time()
+        status = r.status if r else 200
+        response_headers = r.headers if r else {}
+    return {
+        "html": html,
+        "headers": {k.lower(): v for k, v in response_headers.items()},
+        "status": status,
+        "response_time": end_time - start_time
+    }
+
 async def http_fetch(url, method="GET", data=None, extra_headers=None, headless=True):
-    # cloudscraper oturumunu oluştur
-    scraper = cloudscraper.create_scraper()
-    # cloudscraper için varsayılan timeout
-    scraper.timeout = 25
-    
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36 SQLDetector/7.0"
+        "User-Agent": UA
     }
     if extra_headers:
         headers.update(extra_headers)
 
+    await SCAN_LIMITER.acquire(urlparse(url).hostname or "")
     try:
         start_time = time.time()
         if method.upper() == "GET":
-            response = scraper.get(url, headers=headers, timeout=25, allow_redirects=True)
+            response = await SCRAPERS.get(url, headers=headers, timeout=25, allow_redirects=True)
             end_time = time.time()
             status = response.status_code
             html = response.text
             response_headers = dict(response.headers)
         elif method.upper() == "POST":
-            response = scraper.post(url, data=data, headers=headers, timeout=25, allow_redirects=True)
+            response = await SCRAPERS.post(url, data=data, headers=headers, timeout=25, allow_redirects=True)
             end_time = time.time()
             status = response.status_code
             html = response.text
@@ -2088,34 +1950,7 @@ async def http_fetch(url, method="GET", data=None, extra_headers=None, headless=
         else:
             # Diğer metodlar için playwright fallback
             print(f"{Fore.YELLOW}[!] Cloudscraper desteklemiyor: {method}. Playwright fallback yapılıyor.")
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=headless, args=["--disable-web-security", "--no-sandbox"])
-                context = await browser.new_context(
-                    ignore_https_errors=True,
-                    java_script_enabled=True,
-                    user_agent=headers["User-Agent"]
-                )
-                page = await context.new_page()
-                if extra_headers:
-                    await page.set_extra_http_headers(extra_headers)
-                start_time = time.time()
-                if method.upper() == "GET":
-                    r = await page.goto(url, wait_until="domcontentloaded", timeout=25000)
-                    await page.wait_for_load_state("networkidle", timeout=25000)
-                else: # POST için basit form submit
-                    await page.goto(url, wait_until="domcontentloaded", timeout=25000)
-                    await page.wait_for_load_state("networkidle", timeout=25000)
-                html = await page.content()
-                end_time = time.time()
-                status = r.status if method.upper() == "GET" and r else 200
-                response_headers = r.headers if method.upper() == "GET" and r else {}
-                await browser.close()
-                return {
-                    "html": html,
-                    "headers": {k.lower(): v for k, v in response_headers.items()},
-                    "status": status,
-                    "response_time": end_time - start_time
-                }
+            return await browser_fetch(url, method, extra_headers)
         
         return {
             "html": html,
@@ -2128,34 +1963,7 @@ async def http_fetch(url, method="GET", data=None, extra_headers=None, headless=
         print(f"{Fore.RED}[ERROR] HTTP isteği başarısız: {url} - {e}")
         # Hata durumunda playwright fallback
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=headless, args=["--disable-web-security", "--no-sandbox"])
-                context = await browser.new_context(
-                    ignore_https_errors=True,
-                    java_script_enabled=True,
-                    user_agent=headers.get("User-Agent", "SQLDetector/7.0")
-                )
-                page = await context.new_page()
-                if extra_headers:
-                    await page.set_extra_http_headers(extra_headers)
-                start_time = time.time()
-                if method.upper() == "GET":
-                    r = await page.goto(url, wait_until="domcontentloaded", timeout=25000)
-                    await page.wait_for_load_state("networkidle", timeout=25000)
-                else:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=25000)
-                    await page.wait_for_load_state("networkidle", timeout=25000)
-                html = await page.content()
-                end_time = time.time()
-                status = r.status if method.upper() == "GET" and r else 200
-                response_headers = r.headers if method.upper() == "GET" and r else {}
-                await browser.close()
-                return {
-                    "html": html,
-                    "headers": {k.lower(): v for k, v in response_headers.items()},
-                    "status": status,
-                    "response_time": end_time - start_time
-                }
+            return await browser_fetch(url, method, extra_headers)
         except Exception as e2:
             print(f"{Fore.RED}[ERROR] Playwright fallback de başarısız: {url} - {e2}")
             return {
@@ -2198,8 +2006,8 @@ class Scanner:
             "method": method,
             "url": url,
             "param": param,
-            "diff_core": round(1.0 - difflib.SequenceMatcher(None, self.baseline["core"], core_html(test_result["html"])).ratio(), 3),
-            "diff_tags": round(profile_dist(self.baseline["tags"], tag_profile(test_result["html"])), 3),
+            "diff_core": round(diff_ratio(core_html(self.baseline["html"]), core_html(test_result["html"])), 3),
+            "diff_tags": round(profile_dist(tag_profile(self.baseline["html"]), tag_profile(test_result["html"])), 3),
             "sql_error": analysis.get("sql_error", False),
             "status": test_result["status"],
             "is_vulnerable": analysis.get("is_vulnerable", False),
@@ -2209,7 +2017,175 @@ class Scanner:
             "details": analysis.get("details", {})
         }
 
+class ScanJob:
+    # adayların asıl işi: baseline → profil → payload planı → enjeksiyon → analiz.
+    # tek süreçte aday URL'lerle, parçalı modda işçi süreçlerde (uç nokta × parametre)
+    # parçalarıyla aynı aşamalar çalışır. report("finding", bulgu) her bulguyu,
+    # report("done", url) analize ulaşan, düşen ya da hata veren her öğeyi bir kez bildirir
+    def __init__(self, forms, frames, db_guess, report):
+        self.forms = forms
+        self.frames = frames
+        self.db_guess = db_guess
+        self.report = report
+        qpath = os.getenv("QWEN_PATH", "")
+        ng = int(os.getenv("QWEN_N_GPU_LAYERS", "16") or "16")
+        self.payload_generator = AdaptiveAIPayloadGenerator(qpath if qpath else None, ng)
+        self.framework_adapter = DynamicFrameworkAdapter()
+        self.behavioral_profiler = BehavioralProfiler()
+        self.security_detector = SecurityMechanismDetector()
+        self.variant_budget = int(os.getenv("VARIANT_BUDGET", "120") or "120")
+        self.successful_payloads = []
+        # aynı uç noktanın parçaları baseline ve payload planını paylaşır
+        self.baselines = {}
+        self.plans = {}
+
+    async def stage_baseline(self, c):
+        t = c["url"]
+        if t not in self.baselines:
+            self.baselines[t] = asyncio.ensure_future(baseline_via_browser(t, headless=True))
+        try:
+            c["base"] = await asyncio.shield(self.baselines[t])
+        except Exception as e:
+            print(f"\n{Fore.YELLOW}[!] {Fore.WHITE}Baseline oluşturulamadı: {e}")
+            self.report("done", t)
+            return None
+        return c
+
+    async def stage_profile(self, c):
+        t, base = c["url"], c["base"]
+        detected, behavioral, security = await asyncio.gather(
+            PROFILES.for_host("framework", t, lambda: self.framework_adapter.detect_framework(base["html"], base["headers"])),
+            PROFILES.for_route("behaviour", t, lambda: self.behavioral_profiler.create_behavioral_baseline(t)),
+            PROFILES.for_host("security", t, lambda: self.security_detector.detect_security_mechanisms(t)),
+            return_exceptions=True,
+        )
+        c["frameworks"] = detected if isinstance(detected, list) else []
+        c["behavioral_profile"] = behavioral if isinstance(behavioral, dict) else {}
+        c["security_analysis"] = security if isinstance(security, dict) else {}
+        return c
+
+    def stage_plan(self, c):
+        t = c["url"]
+        params = list(parse_qs(urlparse(t).query).keys())
+        keys = params[:10] if params else []
+        if t not in self.plans:
+            target_info = {
+                "url": t,
+                "params": keys,
+                "path": urlparse(t).path,
+                "param_count": len(keys)
+            }
+            self.plans[t] = self.payload_generator.generate_contextual_payloads(
+                target_info,
+                self.db_guess,
+                ",".join(self.frames + c["frameworks"]),
+                list(self.successful_payloads),
+                n=40
+            )
+        c["payloads"] = self.plans[t]
+        # parça: yalnızca kendi sorgu parametresi ya da form alanı enjekte edilir
+        if "form" in c:
+            keys = []
+        elif "param" in c:
+            keys = [c["param"]]
+        c["keys"] = keys
+        return c
+
+    async def stage_inject(self, c):
+        t, keys, payloads = c["url"], c["keys"], c["payloads"]
+        security_analysis = c["security_analysis"]
+        # Hata düzeltme: security_analysis'in doğru yapıya sahip olduğundan emin olun
+        if security_analysis.get('waf_detected'):
+            try:
+                bypass_payloads = await self.security_detector.generate_waf_bypass_payloads(security_analysis, payloads)
+                payloads = list(set(payloads + bypass_payloads))
+            except Exception as e:
+                print(f"\n{Fore.YELLOW}[!] {Fore.WHITE}WAF bypass üretimi başarısız: {e}")
+        headersets = [None, {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}]
+        # varyantlar tembel üretilir: aynı wire baytları bir kez, parametre başına bütçe
+        variant_gen = VariantGenerator(budget=self.variant_budget, headersets=headersets)
+        if "form" in c:
+            forms = [(c["form"], [c["param"]])]
+        elif "param" in c:
+            forms = []
+        else:
+            forms = [(f, list(f["inputs"].keys())[:5]) for f in self.forms[:3] if f.get("inputs")]
+        def variants():
+            for p in keys:
+                yield from variant_gen.for_query(t, p, payloads[:20])
+            for f, fields in forms:
+                for p in fields:
+                    yield from variant_gen.for_form(f, p, payloads[:15])
+        c["results"] = []
+        if keys or forms:
+            sc = Scanner(c["base"], c["base"], c["base"]["headers"])
+            async for _, o in sliding_window(variants(), sc.test, window=50):
+                if isinstance(o, dict) and o.get("is_vulnerable"):
+                    c["results"].append(o)
+        return c
+
+    def stage_analysis(self, c):
+        for o in c["results"]:
+            self.report("finding", o)
+            if "param" in o and "url" in o:
+                payload_key = f"{o['param']}_{o['url']}"
+                if payload_key not in self.successful_payloads:
+                    self.successful_payloads.append(payload_key)
+        self.report("done", c["url"])
+        return c
+
+    def stage_failed(self, stage, item, e):
+        print(f"\n{Fore.YELLOW}[!] {Fore.WHITE}{stage} aşaması başarısız: {e}")
+        self.report("done", item["url"])
+
+    def pipeline(self):
+        # her aşamanın kendi işçileri var, aşamalar sınırlı kuyruklarla bağlı
+        net_workers = int(os.getenv("PIPELINE_WORKERS", "4") or "4")
+        per_host = int(os.getenv("PIPELINE_PER_HOST", "4") or "4")
+        return StagedPipeline(
+            [
+                Stage("baseline", self.stage_baseline, workers=net_workers, per_host=per_host),
+                Stage("profile", self.stage_profile, workers=net_workers, per_host=per_host),
+                # yerel LLM tek örnek: tek işçi, olay döngüsünü bloklamasın diye thread'de
+                Stage("plan", self.stage_plan, workers=1, offload=True),
+                Stage("inject", self.stage_inject, workers=2, per_host=2),
+                Stage("analysis", self.stage_analysis),
+            ],
+            host_of=lambda item: urlparse(item["url"]).netloc,
+            on_error=self.stage_failed,
+        )
+
+def scan_shards(candidates, forms):
+    # parçalar: aday URL'lerin her sorgu parametresi ve ilk formların her alanı
+    shards = [{"url": u, "param": p} for u, p in shards_for(candidates)]
+    for f in forms[:3]:
+        for p in list((f.get("inputs") or {}).keys())[:5]:
+            shards.append({"url": f.get("action") or "", "form": f, "param": p})
+    return [s for s in shards if s["url"]]
+
+async def shard_worker(shards, limiter, report, forms, frames, db_guess):
+    # işçi süreç: kendi olay döngüsü, oturum ve tarayıcı havuzu; host hız bütçesi
+    # ebeveynin paylaşılan kovalarından gelir
+    global SCAN_LIMITER
+    SCAN_LIMITER = limiter
+    job = ScanJob(forms, frames, db_guess, report)
+    try:
+        async for _ in job.pipeline().run(shards):
+            pass
+    finally:
+        await browsers().aclose()
+        await PROFILES.aclose()
+        SCRAPERS.close()
+
 async def run(target):
+    # tarama hata ile bitse de tarayıcı kapatılır ve profiller yazılır
+    try:
+        return await scan(target)
+    finally:
+        await browsers().aclose()
+        await PROFILES.aclose()
+
+async def scan(target):
     start_time = time.time()
     print(f"{Fore.MAGENTA}{Style.BRIGHT}{'='*60}")
     print(f"{Fore.MAGENTA}{Style.BRIGHT}           SQLDetector AI v2.0")
@@ -2234,86 +2210,39 @@ async def run(target):
             print(f"{Fore.GREEN}[+] {Fore.WHITE}Veritabanı türü tespit edildi: {Fore.CYAN}{db_guess}")
         except Exception as e:
             print(f"{Fore.YELLOW}[!] {Fore.WHITE}DB tespiti başarısız: {e}")
-    qpath = os.getenv("QWEN_PATH", "")
-    ng = int(os.getenv("QWEN_N_GPU_LAYERS", "16") or "16")
-    system_prompt = sp()
-    payload_generator = AdaptiveAIPayloadGenerator(qpath if qpath else None, ng)
-    framework_adapter = DynamicFrameworkAdapter()
-    encoder = IntelligentEncoder()
-    behavioral_profiler = BehavioralProfiler()
-    security_detector = SecurityMechanismDetector()
-    timing_analyzer = AdvancedTimingAnalyzer()
     findings = []
-    successful_payloads = []
     total_candidates = min(100, len(candidates))
-    for i, t in enumerate(candidates[:total_candidates]):
-        progress = int((i + 1) / total_candidates * 20)
+    workers = resolve_workers(int(os.getenv("SCAN_WORKERS", "1") or "1"))
+    def draw(done, total, label=""):
+        progress = int(done / total * 20) if total else 20
         bar = f"[{Fore.GREEN}{'#' * progress}{Fore.RED}{'-' * (20 - progress)}{Fore.RESET}]"
-        print(f"\r{Fore.CYAN}[{time.strftime('%H:%M:%S')}] {Fore.WHITE}Hedefler test ediliyor {bar} {i+1}/{total_candidates} ({t[:50]}...)", end='', flush=True)
-        try:
-            base = await baseline_via_browser(t, headless=True)
-        except Exception as e:
-            print(f"\n{Fore.YELLOW}[!] {Fore.WHITE}Baseline oluşturulamadı: {e}")
-            continue
-        detected_frameworks = await framework_adapter.detect_framework(base["html"], base["headers"])
-        try:
-            behavioral_profile = await behavioral_profiler.create_behavioral_baseline(t)
-        except Exception as e:
-            behavioral_profile = {}
-        try:
-            security_analysis = await security_detector.detect_security_mechanisms(t)
-        except Exception as e:
-            security_analysis = {}
-        params = list(parse_qs(urlparse(t).query).keys())
-        keys = params[:10] if params else []
-        target_info = {
-            "url": t, 
-            "params": keys,
-            "path": urlparse(t).path,
-            "param_count": len(keys)
-        }
-        payloads = payload_generator.generate_contextual_payloads(
-            target_info, 
-            db_guess, 
-            ",".join(frames + detected_frameworks), 
-            successful_payloads,
-            n=40
+        print(f"\r{Fore.CYAN}[{time.strftime('%H:%M:%S')}] {Fore.WHITE}Hedefler test ediliyor {bar} {done}/{total} {label}", end='', flush=True)
+    if workers > 1:
+        # parçalı mod: uç nokta × parametre parçaları işçi süreçlere dağıtılır,
+        # ayrıştırma/fark/analiz her süreçte ayrı çekirdekte çalışır
+        shards = scan_shards(candidates[:total_candidates], forms)
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Parçalı tarama: {Fore.YELLOW}{len(shards)} {Fore.WHITE}parça, {Fore.YELLOW}{workers} {Fore.WHITE}işçi süreç")
+        findings += await run_sharded(
+            shards,
+            shard_worker,
+            workers=workers,
+            args=(forms, frames, db_guess),
+            rate=SCAN_RATE,
+            hosts={urlparse(s["url"]).hostname or "" for s in shards},
+            progress=lambda pct: draw(round(pct * len(shards) / 100), len(shards)),
         )
-        # Hata düzeltme: security_analysis'in doğru yapıya sahip olduğundan emin olun
-        if isinstance(security_analysis, dict) and security_analysis.get('waf_detected'):
-            try:
-                bypass_payloads = await security_detector.generate_waf_bypass_payloads(security_analysis, payloads)
-                payloads = list(set(payloads + bypass_payloads))
-            except Exception as e:
-                print(f"\n{Fore.YELLOW}[!] {Fore.WHITE}WAF bypass üretimi başarısız: {e}")
-        headersets = [None, {"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"}]
-        variants = []
-        for p in keys:
-            encoded_payloads = []
-            for payload in payloads[:20]:
-                encoded_payloads.extend(encoder.generate_smart_encodings(payload))
-            variants.extend(build_get(t, list(set(encoded_payloads)), only_param=p, headersets=headersets))
-        for f in forms[:3]:
-            if not f.get("inputs"): continue
-            fkeys = list(f["inputs"].keys())[:5]
-            for p in fkeys:
-                encoded_payloads = []
-                for payload in payloads[:15]:
-                    encoded_payloads.extend(encoder.generate_smart_encodings(payload))
-                variants.extend(build_post(f, list(set(encoded_payloads)), only_param=p, headersets=headersets))
-        if variants:
-            batch_size = 50
-            for i in range(0, len(variants), batch_size):
-                batch = variants[i:i + batch_size]
-                sc = Scanner(base, base, base["headers"])
-                outs = await asyncio.gather(*[sc.test(v) for v in batch], return_exceptions=True)
-                for o in outs:
-                    if isinstance(o, dict) and o.get("is_vulnerable"):
-                        findings.append(o)
-                        if "param" in o and "url" in o:
-                            payload_key = f"{o['param']}_{o['url']}"
-                            if payload_key not in successful_payloads:
-                                successful_payloads.append(payload_key)
+    else:
+        done = 0
+        def report(kind, payload):
+            nonlocal done
+            if kind == "finding":
+                findings.append(payload)
+                return
+            done += 1
+            draw(done, total_candidates, f"({payload[:50]}...)")
+        job = ScanJob(forms, frames, db_guess, report)
+        async for _ in job.pipeline().run({"url": t} for t in candidates[:total_candidates]):
+            pass
     print(f"\n{Fore.CYAN}[{time.strftime('%Y-%m-%d %H:%M:%S')}] {Fore.WHITE}AI analiz sonuçları işleniyor...")
     ai_vulnerabilities = ai_results.get('vulnerabilities', [])
     for vuln in ai_vulnerabilities:
@@ -2364,6 +2293,8 @@ def main():
         print(f"\n{Fore.RED}[ERROR] {Fore.WHITE}{e}")
         import traceback
         traceback.print_exc()
+    finally:
+        SCRAPERS.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -32,9 +32,24 @@ def load(domain: str) -> Dict[str, Any]:
 def save(domain: str, profile: Dict[str, Any], preset: str) -> None:
     """Persist profile and preset selection for ``domain``."""
     store = _load_store()
-    store[domain] = {
+    entry = store.get(domain, {})
+    entry.update({
         "last_profile": profile,
         "chosen_preset": preset,
         "ts": time.time(),
-    }
+    })
+    store[domain] = entry
+    _save_store(store)
+
+
+def load_profiles(domain: str) -> Dict[str, Any]:
+    """Return cached target profiles (WAF, framework, behaviour) for ``domain``."""
+    return _load_store().get(domain, {}).get("profiles", {})
+
+
+def save_profiles(domain: str, profiles: Dict[str, Any]) -> None:
+    """Merge ``profiles`` into the cached target profiles of ``domain``."""
+    store = _load_store()
+    entry = store.setdefault(domain, {})
+    entry.setdefault("profiles", {}).update(profiles)
     _save_store(store)
@@ -12,7 +12,12 @@ except Exception:  # pragma: no cover - psutil missing
 
 
 def detect_system() -> Dict[str, int]:
-    """Return a very small set of system characteristics."""
+    """Return a very small set of system characteristics.
+
+    ``workers`` is the suggested process count for a sharded scan
+    (:mod:`sqldetector.runners.sharded`): one core is left for the
+    coordinating parent.
+    """
     cores = os.cpu_count() or 1
     ram_gb = 0
     if psutil is not None:
@@ -20,7 +25,8 @@ def detect_system() -> Dict[str, int]:
             ram_gb = int(psutil.virtual_memory().total / (1024 ** 3))
         except Exception:  # pragma: no cover
             ram_gb = 0
-    return {"cores": int(cores), "ram_gb": int(ram_gb)}
+    workers = max(1, cores - 1) if cores > 2 else 1
+    return {"cores": int(cores), "ram_gb": int(ram_gb), "workers": int(workers)}
 
 
 def tune_by_system(cfg: Dict[str, Any], sysinfo: Dict[str, int], rtt_ms: Any) -> Dict[str, Any]:
@@ -0,0 +1,110 @@
+"""Sliding-window execution of many independent awaitables.
+
+``asyncio.gather`` over fixed batches idles at the end of every batch until
+its slowest member finishes.  :func:`sliding_window` instead starts a new job
+as soon as any running one completes, pulling inputs lazily so a slow
+consumer or a large generator never materialises more than ``window`` jobs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .errors import SQLDetectorError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# errors a job may end with that are handed to the consumer instead of
+# aborting the whole run
+_JOB_ERRORS = (Exception, SQLDetectorError)
+
+
+async def _pull(items: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def sliding_window(
+    items: Union[Iterable[T], AsyncIterable[T]],
+    worker: Callable[[T], Awaitable[R]],
+    *,
+    window: int,
+    ordered: bool = False,
+    stop: Optional[Callable[[Any], bool]] = None,
+) -> AsyncIterator[Tuple[T, Any]]:
+    """Run ``worker`` over ``items`` keeping ``window`` jobs outstanding.
+
+    Yields ``(item, result)`` pairs where ``result`` is the worker's return
+    value or the exception it raised.  With ``ordered`` results come back in
+    input order; completed jobs waiting behind a slower predecessor count
+    against ``window`` so the reorder buffer stays bounded.  Once ``stop``
+    returns true for a yielded result, or the consumer stops iterating, the
+    remaining jobs are cancelled and no further items are pulled; ``stop`` is
+    only consulted for jobs that returned, never for raised exceptions.
+    """
+
+    window = max(1, window)
+    source = _pull(items)
+    pending: Dict["asyncio.Future[R]", Tuple[int, T]] = {}
+    # index -> (item, result, failed)
+    ready: Dict[int, Tuple[T, Any, bool]] = {}
+    started = emitted = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) + len(ready) < window:
+                try:
+                    item = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(worker(item))] = (started, item)
+                started += 1
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                index, item = pending.pop(fut)
+                try:
+                    ready[index] = (item, fut.result(), False)
+                except _JOB_ERRORS as exc:
+                    ready[index] = (item, exc, True)
+            if ordered:
+                batch = []
+                while emitted in ready:
+                    batch.append(ready.pop(emitted))
+                    emitted += 1
+            else:
+                batch = list(ready.values())
+                ready.clear()
+            for item, result, failed in batch:
+                yield item, result
+                if stop is not None and not failed and stop(result):
+                    return
+    finally:
+        for fut in pending:
+            fut.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await source.aclose()
+
+
+__all__ = ["sliding_window"]
@@ -0,0 +1,130 @@
+"""In-process hot tier for :class:`CacheTransport`.
+
+Recently used responses are kept in memory under a byte budget so repeated
+requests for robots.txt, sitemaps, bundles and baseline pages are answered
+without a disk read.  Entries still inside their freshness lifetime are
+served without revalidating at all; ``404``/``410`` answers are remembered for
+a short TTL as negative entries.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_store import vary_key
+
+NEGATIVE_STATUSES = (404, 410)
+
+
+@dataclass
+class HotEntry:
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+    names: List[str]
+    vary_key: str
+    fresh_until: float
+
+    def header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers) + 64
+
+    def fresh(self, now: Optional[float] = None) -> bool:
+        return (time.monotonic() if now is None else now) < self.fresh_until
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def freshness(headers: Any, cap: float) -> float:
+    """Seconds a response may be reused without revalidation, at most ``cap``.
+
+    ``max-age`` wins; ``no-cache``/``no-store``/``private`` mean zero.  Without
+    explicit directives the usual heuristic of 10% of the time since
+    ``Last-Modified`` applies.
+    """
+    cc = {}
+    for part in headers.get("cache-control", "").lower().split(","):
+        key, _, val = part.strip().partition("=")
+        if key:
+            cc[key] = val.strip('"')
+    if "no-store" in cc or "no-cache" in cc or "private" in cc:
+        return 0.0
+    if "max-age" in cc:
+        try:
+            return max(0.0, min(cap, float(cc["max-age"])))
+        except ValueError:
+            return 0.0
+    modified = _http_date(headers.get("last-modified"))
+    if modified is None:
+        return 0.0
+    date = _http_date(headers.get("date")) or time.time()
+    return max(0.0, min(cap, (date - modified) * 0.1))
+
+
+class MemoryTier:
+    """LRU of :class:`HotEntry` per URL and Vary variant under ``max_bytes``."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[Tuple[str, str], HotEntry]" = OrderedDict()
+        # Vary header names seen per URL, needed to build the lookup key
+        self._names: Dict[str, List[str]] = {}
+        self._variants: Dict[str, int] = {}
+
+    def get(self, url: str, request_headers: Any) -> Optional[HotEntry]:
+        names = self._names.get(url)
+        if names is None:
+            return None
+        key = (url, vary_key(names, request_headers))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, url: str, entry: HotEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        key = (url, entry.vary_key)
+        self.discard(url, entry.vary_key)
+        self._names[url] = entry.names
+        self._variants[url] = self._variants.get(url, 0) + 1
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes and self._entries:
+            old_url, old_key = next(iter(self._entries))
+            self.discard(old_url, old_key)
+
+    def discard(self, url: str, key: str) -> None:
+        old = self._entries.pop((url, key), None)
+        if old is None:
+            return
+        self.total_bytes -= old.size
+        self._variants[url] -= 1
+        if not self._variants[url]:
+            del self._variants[url]
+            del self._names[url]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = ["HotEntry", "MemoryTier", "NEGATIVE_STATUSES", "freshness"]
@@ -0,0 +1,212 @@
+"""Size-bounded, content-addressed store backing :class:`CacheTransport`.
+
+Bodies are written once per distinct content under ``blobs/`` keyed by their
+xxh3-128 digest, so the same JS bundle or error page served from many URLs
+occupies disk once.  Response metadata lives in a SQLite index in WAL mode
+with one row per ``(url, Vary variant)``.  When the blobs exceed
+``max_bytes`` the least recently used entries are dropped and blobs no longer
+referenced are unlinked.
+
+All file and SQLite work runs on a single dedicated thread: the event loop
+never blocks on disk and the connection is only ever used from one thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+import xxhash
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT NOT NULL,
+    vary_key TEXT NOT NULL,
+    vary TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    atime REAL NOT NULL,
+    PRIMARY KEY (url, vary_key)
+);
+CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL);
+"""
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    vary_key: str
+    headers: List[Tuple[str, str]]
+    digest: str
+
+    def header(self, name: str) -> Optional[str]:
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return None
+
+
+def vary_names(vary: str) -> List[str]:
+    return sorted({v.strip().lower() for v in vary.split(",") if v.strip()})
+
+
+def vary_key(names: Sequence[str], request_headers: Any) -> str:
+    """Key the request headers named by ``Vary`` select on."""
+    if not names:
+        return ""
+    raw = "\n".join(f"{n}:{request_headers.get(n, '')}" for n in names)
+    return xxhash.xxh64_hexdigest(raw.encode())
+
+
+class CacheStore:
+    def __init__(self, root: Path = Path(".cache"), max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="http-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # -------------------------------------------------------------- threading
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            self.total_bytes = int(row[0])
+            self._conn = conn
+        return self._conn
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    # -------------------------------------------------------------- sync parts
+    def _lookup(self, url: str, request_headers: Dict[str, str]) -> Optional[CacheEntry]:
+        rows = self._db().execute(
+            "SELECT vary_key, vary, headers, digest FROM entries WHERE url=?", (url,)
+        ).fetchall()
+        for key, vary, headers, digest in rows:
+            if vary_key(json.loads(vary), request_headers) == key:
+                return CacheEntry(url, key, [tuple(h) for h in json.loads(headers)], digest)
+        return None
+
+    def _read(self, entry: CacheEntry) -> Optional[bytes]:
+        conn = self._db()
+        try:
+            data = self._blob_path(entry.digest).read_bytes()
+        except OSError:
+            row = conn.execute(
+                "SELECT size FROM blobs WHERE digest=?", (entry.digest,)
+            ).fetchone()
+            conn.execute("DELETE FROM entries WHERE digest=?", (entry.digest,))
+            conn.execute("DELETE FROM blobs WHERE digest=?", (entry.digest,))
+            if row:
+                self.total_bytes -= row[0]
+            conn.commit()
+            return None
+        conn.execute(
+            "UPDATE entries SET atime=? WHERE url=? AND vary_key=?",
+            (time.time(), entry.url, entry.vary_key),
+        )
+        conn.commit()
+        return data
+
+    def _put(
+        self, url: str, names: List[str], key: str, headers: List[Tuple[str, str]], body: bytes
+    ) -> CacheEntry:
+        conn = self._db()
+        digest = xxhash.xxh3_128_hexdigest(body)
+        if conn.execute("SELECT 1 FROM blobs WHERE digest=?", (digest,)).fetchone() is None:
+            path = self._blob_path(digest)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(body)
+            tmp.replace(path)
+            conn.execute("INSERT INTO blobs (digest, size) VALUES (?, ?)", (digest, len(body)))
+            self.total_bytes += len(body)
+        old = conn.execute(
+            "SELECT digest FROM entries WHERE url=? AND vary_key=?", (url, key)
+        ).fetchone()
+        conn.execute(
+            "REPLACE INTO entries (url, vary_key, vary, headers, digest, atime) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, key, json.dumps(names), json.dumps(headers), digest, time.time()),
+        )
+        if old and old[0] != digest:
+            self._drop_orphan(old[0])
+        self._evict(keep=digest)
+        conn.commit()
+        return CacheEntry(url, key, headers, digest)
+
+    def _drop_orphan(self, digest: str) -> None:
+        conn = self._db()
+        if conn.execute("SELECT 1 FROM entries WHERE digest=? LIMIT 1", (digest,)).fetchone():
+            return
+        row = conn.execute("SELECT size FROM blobs WHERE digest=?", (digest,)).fetchone()
+        conn.execute("DELETE FROM blobs WHERE digest=?", (digest,))
+        if row:
+            self.total_bytes -= row[0]
+        try:
+            self._blob_path(digest).unlink()
+        except OSError:
+            pass
+
+    def _evict(self, keep: str = "") -> None:
+        conn = self._db()
+        while self.total_bytes > self.max_bytes:
+            row = conn.execute(
+                "SELECT url, vary_key, digest FROM entries WHERE digest != ? "
+                "ORDER BY atime LIMIT 1",
+                (keep,),
+            ).fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM entries WHERE url=? AND vary_key=?", row[:2])
+            self._drop_orphan(row[2])
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # -------------------------------------------------------------- async API
+    async def lookup(self, url: str, request_headers: Any) -> Optional[CacheEntry]:
+        headers = {k.lower(): v for k, v in request_headers.items()}
+        return await self._run(self._lookup, url, headers)
+
+    async def read(self, entry: CacheEntry) -> Optional[bytes]:
+        """Return the entry's body (``None`` if the blob vanished) and mark it used."""
+        return await self._run(self._read, entry)
+
+    async def put(
+        self, url: str, vary: str, request_headers: Any, headers: List[Tuple[str, str]], body: bytes
+    ) -> Optional[CacheEntry]:
+        names = vary_names(vary)
+        if "*" in names or len(body) > self.max_bytes:
+            return None
+        key = vary_key(names, {k.lower(): v for k, v in request_headers.items()})
+        return await self._run(self._put, url, names, key, headers, body)
+
+    async def aclose(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
+
+
+__all__ = ["CacheEntry", "CacheStore", "vary_key", "vary_names"]
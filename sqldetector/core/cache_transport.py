@@ -1,75 +1,208 @@
 """Simple on-disk HTTP conditional cache."""
 
 from __future__ import annotations
-import hashlib
-import json
+
+import time
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, List, Optional, Tuple, Union
 
 import httpx
 
+from .cache_memory import NEGATIVE_STATUSES, HotEntry, MemoryTier, freshness
+from .cache_store import CacheEntry, CacheStore, vary_key, vary_names
+
+# hop-by-hop and representation headers that must not be replayed from cache
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class _Resumed(httpx.AsyncByteStream):
+    """A body whose start was already read, followed by the rest of the stream."""
+
+    def __init__(self, head: bytes, rest: AsyncIterator[bytes], response: httpx.Response) -> None:
+        self._head = head
+        self._rest = rest
+        self._response = response
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield self._head
+        async for chunk in self._rest:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+
 
 class CacheTransport(httpx.AsyncBaseTransport):
-    """Wrap another transport and provide ETag/Last-Modified cache."""
+    """Wrap another transport and provide ETag/Last-Modified cache.
+
+    Two tiers back the cache: a :class:`MemoryTier` of recently used
+    responses and the on-disk :class:`CacheStore`.  Responses still fresh per
+    ``Cache-Control`` (capped at ``fresh_sec``) are served from memory without
+    touching the network; ``404``/``410`` are remembered for
+    ``negative_sec``.  Bodies are read at most ``max_body_bytes`` at a time:
+    a longer body is passed on unread past that point and not cached, and
+    neither is one ``skip_body(url, response)`` rejects (binary content).  A
+    request sending ``Cache-Control: no-cache`` (or
+    ``Pragma: no-cache``) always goes to the network unconditionally and only
+    refreshes the cache; ``no-store`` bypasses it entirely.
+    """
 
-    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache_dir: Path = Path(".cache"),
+        max_bytes: int = 256 * 1024 * 1024,
+        *,
+        memory_bytes: int = 32 * 1024 * 1024,
+        fresh_sec: float = 60.0,
+        negative_sec: float = 30.0,
+        max_body_bytes: Optional[int] = None,
+        skip_body: Optional[Callable[[str, httpx.Response], bool]] = None,
+    ) -> None:
         self._transport = transport or httpx.AsyncHTTPTransport()
-        self.cache_dir = Path(".cache")
-        self.cache_dir.mkdir(exist_ok=True)
+        self.store = CacheStore(cache_dir, max_bytes)
+        self.memory = MemoryTier(memory_bytes)
+        self.fresh_sec = fresh_sec
+        self.negative_sec = negative_sec
+        self.max_body_bytes = max_body_bytes
+        self.skip_body = skip_body
 
     # --------------------------------------------------------------
-    def _key(self, request: httpx.Request) -> Path:
-        digest = hashlib.sha1(str(request.url).encode()).hexdigest()
-        return self.cache_dir / f"{digest}.json"
+    @staticmethod
+    def _directives(request: httpx.Request) -> Tuple[bool, bool]:
+        """``(no_cache, no_store)`` asked for by the request's headers."""
+        cc = request.headers.get("Cache-Control", "").lower()
+        no_store = "no-store" in cc
+        no_cache = no_store or "no-cache" in cc or "max-age=0" in cc
+        if "no-cache" in request.headers.get("Pragma", "").lower():
+            no_cache = True
+        return no_cache, no_store
+
+    @staticmethod
+    def _replay(
+        request: httpx.Request, status: int, headers: List[Tuple[str, str]], body: bytes
+    ) -> httpx.Response:
+        return httpx.Response(
+            status,
+            headers=headers,
+            content=body,
+            request=request,
+            extensions={"from_cache": True},
+        )
+
+    async def _read_capped(
+        self, response: httpx.Response
+    ) -> Tuple[bytes, Optional[AsyncIterator[bytes]]]:
+        """The decoded body, or its first part and the unread rest past the cap."""
+        chunks: List[bytes] = []
+        seen = 0
+        rest = response.aiter_bytes()
+        async for chunk in rest:
+            chunks.append(chunk)
+            seen += len(chunk)
+            if self.max_body_bytes is not None and seen > self.max_body_bytes:
+                return b"".join(chunks), rest
+        return b"".join(chunks), None
+
+    def _remember(
+        self,
+        url: str,
+        request: httpx.Request,
+        status: int,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+        ttl: float,
+        vary: str,
+    ) -> None:
+        names = vary_names(vary)
+        if "*" in names:
+            return
+        entry = HotEntry(
+            status,
+            headers,
+            body,
+            names,
+            vary_key(names, request.headers),
+            time.monotonic() + ttl,
+        )
+        self.memory.put(url, entry)
 
     async def handle_async_request(self, request: httpx.Request) -> httpx.Response:  # noqa: D401
-        meta_path = self._key(request)
-        if request.method == "GET" and meta_path.exists():
-            try:
-                meta = json.loads(meta_path.read_text())
-                if et := meta.get("etag"):
-                    request.headers["If-None-Match"] = et
-                if lm := meta.get("last_mod"):
-                    request.headers["If-Modified-Since"] = lm
-            except Exception:  # pragma: no cover - corrupt cache
-                pass
+        if request.method != "GET":
+            return await self._transport.handle_async_request(request)
+
+        no_cache, no_store = self._directives(request)
+        if no_store:
+            return await self._transport.handle_async_request(request)
+
+        url = str(request.url)
+        entry: Optional[Union[HotEntry, CacheEntry]] = None
+        if not no_cache:
+            hot = self.memory.get(url, request.headers)
+            if hot is not None and hot.fresh():
+                return self._replay(request, hot.status, hot.headers, hot.body)
+            if hot is not None and hot.status == 200:
+                entry = hot
+            else:
+                entry = await self.store.lookup(url, request.headers)
+        if entry is not None:
+            if et := entry.header("etag"):
+                request.headers["If-None-Match"] = et
+            if lm := entry.header("last-modified"):
+                request.headers["If-Modified-Since"] = lm
 
         response = await self._transport.handle_async_request(request)
 
-        if request.method != "GET":
-            return response
-
-        if response.status_code == 304 and meta_path.exists():
-            meta = json.loads(meta_path.read_text())
-            return httpx.Response(
-                200,
-                headers=meta.get("headers", {}),
-                content=Path(meta["body"]).read_bytes(),
-                request=request,
-            )
-
-        if response.status_code == 200:
+        if response.status_code == 304 and entry is not None:
+            body = entry.body if isinstance(entry, HotEntry) else await self.store.read(entry)
+            if body is not None:
+                await response.aclose()
+                ttl = freshness(response.headers, self.fresh_sec) or freshness(
+                    httpx.Headers(entry.headers), self.fresh_sec
+                )
+                vary = entry.header("vary") or ""
+                self._remember(url, request, 200, entry.headers, body, ttl, vary)
+                return self._replay(request, 200, entry.headers, body)
+
+        status = response.status_code
+        if status == 200 or status in NEGATIVE_STATUSES:
+            cc = response.headers.get("Cache-Control", "").lower()
             et = response.headers.get("ETag")
             lm = response.headers.get("Last-Modified")
-            if et or lm:
-                body_path = meta_path.with_suffix(".body")
-                data = await response.aread()
-                body_path.write_bytes(data)
-                meta = {
-                    "etag": et,
-                    "last_mod": lm,
-                    "headers": dict(response.headers),
-                    "body": str(body_path),
-                }
-                meta_path.write_text(json.dumps(meta))
+            if status in NEGATIVE_STATUSES:
+                ttl = 0.0 if "no-store" in cc else self.negative_sec
+            else:
+                ttl = freshness(response.headers, self.fresh_sec)
+            if "no-store" not in cc and (et or lm or ttl > 0):
+                if self.skip_body is not None and self.skip_body(url, response):
+                    return response
+                data, rest = await self._read_capped(response)
+                headers = [
+                    (k, v) for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS
+                ]
+                if rest is not None:
+                    # over the body cap: hand the stream on, never cache a partial body
+                    return httpx.Response(
+                        status,
+                        headers=headers,
+                        stream=_Resumed(data, rest, response),
+                        request=request,
+                    )
+                vary = response.headers.get("Vary", "")
+                self._remember(url, request, status, headers, data, ttl, vary)
+                if status == 200 and (et or lm):
+                    await self.store.put(url, vary, request.headers, headers, data)
                 response = httpx.Response(
-                    200,
-                    headers=response.headers,
+                    status,
+                    headers=headers,
                     content=data,
                     request=request,
                 )
         return response
 
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+        await self.store.aclose()
 
-# best effort synchronous fallback -----------------------------------------
 
+__all__ = ["CacheTransport"]
@@ -0,0 +1,95 @@
+"""Per-host circuit breaker with half-open probing.
+
+The breaker trips when the failure ratio over the last ``window`` outcomes
+reaches ``error_rate`` (once at least ``min_calls`` outcomes were seen).  While
+open every call is rejected; after a jittered, exponentially growing cool-down
+the breaker turns half-open and lets exactly one probe through.  A successful
+probe closes the circuit, a failed one re-opens it with a longer cool-down.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        cooldown: float = 1.0,
+        max_cooldown: float = 60.0,
+    ) -> None:
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._open_until = 0.0
+        self._probing = False
+
+    # --------------------------------------------------------------
+    def allow(self) -> bool:
+        """Return whether a request may be sent now."""
+        if self.state == OPEN:
+            if time.monotonic() < self._open_until:
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, failure: bool) -> None:
+        """Record the outcome of a request admitted by :meth:`allow`."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if failure:
+                self._trip()
+            else:
+                self.state = CLOSED
+                self.trips = 0
+                self._outcomes.clear()
+            return
+        if self.state == OPEN:
+            return
+        self._outcomes.append(failure)
+        if len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.error_rate:
+                self._trip()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot that ended without a verdict."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def _trip(self) -> None:
+        self.trips += 1
+        delay = min(self.max_cooldown, self.cooldown * 2 ** (self.trips - 1))
+        # equal jitter keeps breakers of many hosts from re-probing in lockstep
+        self._open_until = time.monotonic() + delay * random.uniform(0.5, 1.0)
+        self.state = OPEN
+        self._outcomes.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        failures = sum(self._outcomes)
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+        }
+
+
+__all__ = ["CircuitBreaker", "CLOSED", "OPEN", "HALF_OPEN"]
@@ -23,13 +23,23 @@ class Settings:
     max_connections: int = 100
     max_keepalive_connections: int = 20
     concurrency: int = 5
+    concurrency_max: Optional[int] = None
     retry_budget: int = 5
+    throttle_retries: int = 5
+    throttle_max_wait: float = 60.0
+    circuit_window: int = 20
+    circuit_min_calls: int = 5
+    circuit_error_rate: float = 0.5
+    circuit_cooldown: float = 1.0
     rate_limit: int = 5
+    rate_limit_burst: Optional[int] = None
+    rate_limit_hosts: dict[str, float] = field(default_factory=dict)
     log_json: bool = False
     log_level: str = "INFO"
     trace_dir: Optional[Path] = None
     hedge_delay: float = 0.0
     hedge_max_ratio: float = 0.1
+    coalesce_requests: bool = True
     transport: Optional[Any] = None
     trace_sample_rate: float = 1.0
     trace_compress: Optional[str] = None
@@ -51,6 +61,10 @@ class Settings:
     happy_eyeballs: bool = False
     range_fetch_kb: int = 0
     http_cache_enabled: bool = False
+    http_cache_max_mb: int = 256
+    http_cache_memory_mb: int = 32
+    http_cache_fresh_sec: float = 60.0
+    http_cache_negative_sec: float = 30.0
     respect_robots: bool = True
     simhash_enabled: bool = False
     near_duplicate_threshold: int = 6
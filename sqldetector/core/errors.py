@@ -1,3 +1,6 @@
+from typing import Optional
+
+
 class SQLDetectorError(BaseException):
     """Base class for sqldetector errors."""
 
@@ -20,3 +23,11 @@ class PolicyViolation(SQLDetectorError):
 
 class RetryBudgetExceeded(SQLDetectorError):
     pass
+
+
+class RateLimited(WAFBlocked):
+    """Host kept throttling (429/403) beyond the allowed retries or wait."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
 import asyncio
+import datetime
+import hashlib
 import random
 import sys
 import time
-from collections import defaultdict, deque
-from typing import Dict
+import urllib.request
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import httpx
 import certifi
@@ -18,55 +33,88 @@ try:  # optional ssl trust-store on CPython 3.12+
 except Exception:  # pragma: no cover - truststore not available
     truststore = None  # type: ignore
 
-from .errors import RetryBudgetExceeded, TimeoutError, WAFBlocked
+from .bulk import sliding_window
+from .circuit import CLOSED, CircuitBreaker
+from .errors import RateLimited, RetryBudgetExceeded, TimeoutError, WAFBlocked
 from .config import Settings
+from .singleflight import SingleFlight
+from ..fetch.range_cache import CACHE_PATH as RANGE_CACHE_PATH, RangeSupportCache
+from ..modules.pacing import ratelimit
+from ..net.dns_cache import DNSCache
+from ..net.transport import ResolvingTransport
+from ..pacing.concurrency import GradientLimiter
+from ..pacing.host_bucket import HostRateLimiter
+from ..timing.latency import LatencyRegistry
 
+# methods that are safe to collapse into a single network call
+_COALESCE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# per-request session or credential overrides: such calls are never shared
+_NO_COALESCE_KWARGS = ("files", "cookies", "auth", "extensions")
+# bodies of these types are never useful for SQL error or diff analysis
+_BINARY_CTYPES = ("image/", "audio/", "video/", "font/")
+_BINARY_APP_TYPES = {
+    "application/octet-stream",
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/x-tar",
+    "application/vnd.rar",
+}
+# partial bodies of these types are usable for analysis
+_RANGE_CTYPES = {"text/html", "application/json", "text/xml", "application/xml"}
+# headers that no longer describe a body re-materialised from decoded chunks
+_STREAM_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
 
-class AdaptiveSemaphore:
-    """Semaphore with a dynamically adjustable limit."""
 
-    def __init__(self, value: int):
-        self.limit = value
-        self._sem = asyncio.Semaphore(value)
 
-    async def acquire(self) -> None:
-        await self._sem.acquire()
-
-    def release(self) -> None:
-        self._sem.release()
-
-    def adjust(self, value: int) -> None:
-        if value > self.limit:
-            for _ in range(value - self.limit):
-                self._sem.release()
-        elif value < self.limit:
-            diff = self.limit - value
-            # decrease available tokens without blocking
-            self._sem._value = max(0, self._sem._value - diff)
-        self.limit = value
+def _env_proxied() -> bool:
+    """Whether httpx would send requests through a proxy from the environment."""
+    return any(scheme in ("http", "https", "all") for scheme in urllib.request.getproxies())
 
 
 class HttpClient:
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        limiter: Optional[HostRateLimiter] = None,
+        dns: Optional[DNSCache] = None,
+    ):
         self.settings = settings
+        self.dns = dns
         self._client: httpx.AsyncClient | None = None
-        self._semaphores: Dict[str, AdaptiveSemaphore] = defaultdict(
-            lambda: AdaptiveSemaphore(settings.concurrency)
+        self._resolving: Optional[ResolvingTransport] = None
+        self._own_dns: Optional[DNSCache] = None
+        self._limits: Dict[str, GradientLimiter] = defaultdict(
+            lambda: GradientLimiter(
+                settings.concurrency,
+                max_limit=settings.concurrency_max or settings.max_connections,
+            )
+        )
+        self.latency = LatencyRegistry()
+        self._limiter = limiter or HostRateLimiter(
+            settings.rate_limit, settings.rate_limit_burst, settings.rate_limit_hosts
         )
-        self._host_latencies: Dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=20))
-        self._host_avgs: Dict[str, float] = {}
-        self._tokens = float(settings.rate_limit)
-        self._last_refill = time.monotonic()
         self._retry_budget = {
             "network": settings.retry_budget,
             "server": settings.retry_budget,
             "timeout": settings.retry_budget,
         }
-        self._failures = 0
-        self._circuit_open_until = 0.0
-        self._latencies: deque[float] = deque(maxlen=50)
+        self._breakers: Dict[str, CircuitBreaker] = defaultdict(
+            lambda: CircuitBreaker(
+                window=settings.circuit_window,
+                min_calls=settings.circuit_min_calls,
+                error_rate=settings.circuit_error_rate,
+                cooldown=settings.circuit_cooldown,
+            )
+        )
         self._hedge_counts: Dict[str, int] = defaultdict(int)
         self._req_counts: Dict[str, int] = defaultdict(int)
+        self._flight = SingleFlight()
+        self.range_cache = RangeSupportCache(
+            RANGE_CACHE_PATH if settings.range_fetch_kb > 0 else None
+        )
 
     async def __aenter__(self) -> "HttpClient":
         timeout = httpx.Timeout(
@@ -103,10 +151,34 @@ class HttpClient:
             "Accept-Encoding": ", ".join(encodings),
         }
         transport = self.settings.transport
+        if (
+            transport is None
+            and (self.dns is not None or self.settings.happy_eyeballs)
+            and not _env_proxied()
+        ):
+            # dial pre-resolved addresses instead of resolving per connection;
+            # with HTTP(S)_PROXY set the proxy resolves, so httpx keeps its own
+            if self.dns is None:
+                self.dns = self._own_dns = DNSCache(self.settings.dns_cache_ttl_sec)
+            transport = self._resolving = ResolvingTransport(
+                self.dns,
+                happy_eyeballs=self.settings.happy_eyeballs,
+                verify=verify,
+                http2=True,
+                limits=limits,
+            )
         if self.settings.http_cache_enabled:
             from .cache_transport import CacheTransport
 
-            transport = CacheTransport(transport)
+            transport = CacheTransport(
+                transport,
+                max_bytes=self.settings.http_cache_max_mb * 1024 * 1024,
+                memory_bytes=self.settings.http_cache_memory_mb * 1024 * 1024,
+                fresh_sec=self.settings.http_cache_fresh_sec,
+                negative_sec=self.settings.http_cache_negative_sec,
+                max_body_bytes=self._body_cap(),
+                skip_body=self._skip_body,
+            )
 
         self._client = httpx.AsyncClient(
             http2=True,
@@ -121,60 +193,137 @@ class HttpClient:
     async def __aexit__(self, exc_type, exc, tb) -> None:  # noqa: D401
         if self._client:
             await self._client.aclose()
+        if self._own_dns is not None:
+            await self._own_dns.aclose()
+        self.range_cache.save()
 
-    async def _acquire(self, url: str) -> tuple[str, AdaptiveSemaphore]:
-        host = httpx.URL(url).host or ""
-        sem = self._semaphores[host]
-        await sem.acquire()
-        return host, sem
-
-    async def _rate_limit(self) -> None:
-        now = time.monotonic()
-        rate = float(self.settings.rate_limit)
-        capacity = rate
-        self._tokens = min(capacity, self._tokens + rate * (now - self._last_refill))
-        self._last_refill = now
-        if self._tokens < 1:
-            await asyncio.sleep((1 - self._tokens) / rate)
-            self._tokens = 0
-        self._tokens -= 1
+    async def _acquire(self, host: str) -> GradientLimiter:
+        limit = self._limits[host]
+        await limit.acquire()
+        return limit
+
+    async def _rate_limit(self, host: str) -> None:
+        await self._limiter.acquire(host)
 
     async def _request_once(self, method: str, url: str, **kwargs) -> httpx.Response:
-        await self._rate_limit()
-        host, sem = await self._acquire(url)
+        host = httpx.URL(url).host or ""
+        await self._rate_limit(host)
+        limit = await self._acquire(host)
         try:
             assert self._client is not None
             start = time.monotonic()
-            resp = await self._client.request(method, url, **kwargs)
+            resp = await self._send(method, url, **kwargs)
             latency = time.monotonic() - start
-            self._latencies.append(latency)
-            self._host_latencies[host].append(latency)
-            self._adjust_concurrency(host)
+            self.latency.record(host, latency)
+            if resp.status_code in (429, 503):
+                limit.on_drop()
+            else:
+                self._adjust_concurrency(host, latency)
             return resp
         except httpx.TimeoutException as exc:  # pragma: no cover - exercised in tests
+            limit.on_drop()
             raise TimeoutError(str(exc)) from exc
         finally:
-            sem.release()
+            limit.release()
+
+    def _body_cap(self) -> Optional[int]:
+        if self.settings.max_body_kb:
+            return self.settings.max_body_kb * 1024
+        return None
+
+    def _skip_body(self, url: str, resp: httpx.Response) -> bool:
+        exts = self.settings.skip_binary_ext or []
+        path = httpx.URL(url).path.lower()
+        if exts and "." in path.rsplit("/", 1)[-1]:
+            if path.rsplit(".", 1)[-1] in {e.lower().lstrip(".") for e in exts}:
+                return True
+        ctype = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        return ctype.startswith(_BINARY_CTYPES) or ctype in _BINARY_APP_TYPES
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, streaming the body when a size cap is configured."""
+        assert self._client is not None
+        if self._body_cap() is None and not self.settings.skip_binary_ext:
+            return await self._client.request(method, url, **kwargs)
+        chunks: list[bytes] = []
+        truncated = False
+        start = time.monotonic()
+        async with self._client.stream(method, url, **kwargs) as resp:
+            skipped = self._skip_body(url, resp)
+            if not skipped:
+                async for chunk in self.iter_body(resp):
+                    chunks.append(chunk)
+                truncated = bool(resp.extensions.get("body_truncated"))
+        headers = [
+            (k, v) for k, v in resp.headers.multi_items() if k.lower() not in _STREAM_DROP_HEADERS
+        ]
+        out = httpx.Response(
+            resp.status_code,
+            headers=headers,
+            content=b"".join(chunks),
+            request=resp.request,
+            extensions={**resp.extensions, "body_truncated": truncated, "body_skipped": skipped},
+        )
+        out.elapsed = datetime.timedelta(seconds=time.monotonic() - start)
+        return out
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Open a streaming response under the host's rate and concurrency limits.
+
+        The body is not read; consume it with :meth:`iter_body`.  Retries and
+        hedging do not apply to streamed requests.
+        """
+        host = httpx.URL(url).host or ""
+        await self._rate_limit(host)
+        limit = await self._acquire(host)
+        try:
+            assert self._client is not None
+            async with self._client.stream(method, url, **kwargs) as resp:
+                yield resp
+        finally:
+            limit.release()
 
-    def _adjust_concurrency(self, host: str) -> None:
-        latencies = self._host_latencies[host]
-        if len(latencies) < 2:
+    async def iter_body(
+        self, resp: httpx.Response, max_bytes: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Yield decoded body chunks, stopping at ``max_bytes`` or ``max_body_kb``.
+
+        Binary bodies (by ``skip_binary_ext`` or Content-Type) yield nothing.
+        When the cap cuts the body short ``resp.extensions["body_truncated"]`` is
+        set.  Breaking out of the loop early leaves the rest unread.
+        """
+        cap = max_bytes if max_bytes is not None else self._body_cap()
+        if self._skip_body(str(resp.request.url), resp):
             return
-        avg = sum(latencies) / len(latencies)
-        prev = self._host_avgs.get(host, avg)
-        self._host_avgs[host] = avg
-        sem = self._semaphores[host]
-        if avg > prev * 1.2:
-            sem.adjust(max(1, sem.limit // 2))
-        elif avg < prev * 0.8 and sem.limit < self.settings.concurrency:
-            sem.adjust(sem.limit + 1)
+        seen = 0
+        async for chunk in resp.aiter_bytes():
+            if cap is not None and seen + len(chunk) >= cap:
+                if seen + len(chunk) > cap:
+                    resp.extensions["body_truncated"] = True
+                yield chunk[: cap - seen]
+                return
+            seen += len(chunk)
+            yield chunk
+
+    def _adjust_concurrency(self, host: str, latency: float) -> None:
+        stats = self.latency.get(host)
+        if stats.count < 2:
+            return
+        self._limits[host].on_sample(latency, stats.floor)
 
     async def _request_with_retries(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host or ""
+        breaker = self._breakers[host]
         attempt = 0
+        throttled = 0
         while True:
+            if not breaker.allow():
+                raise WAFBlocked("circuit open")
             try:
                 resp = await self._request_once(method, url, **kwargs)
             except TimeoutError:
+                breaker.record(True)
                 if self._retry_budget["timeout"] <= 0:
                     raise RetryBudgetExceeded("timeout retry budget exhausted")
                 self._retry_budget["timeout"] -= 1
@@ -183,6 +332,7 @@ class HttpClient:
                 await asyncio.sleep(backoff)
                 continue
             except httpx.RequestError as exc:
+                breaker.record(True)
                 if self._retry_budget["network"] <= 0:
                     raise RetryBudgetExceeded("network retry budget exhausted") from exc
                 self._retry_budget["network"] -= 1
@@ -190,50 +340,163 @@ class HttpClient:
                 attempt += 1
                 await asyncio.sleep(backoff)
                 continue
+            except BaseException:
+                breaker.release()
+                raise
 
+            breaker.record(resp.status_code >= 500)
             if resp.status_code in (429, 403):
-                await asyncio.sleep(1.0)
+                self._throttle(host, resp, throttled)
+                throttled += 1
+                # the next attempt waits in the host's bucket until the pause
+                # ends, so other hosts keep their slots meanwhile
                 continue
             if resp.status_code >= 500:
                 if self._retry_budget["server"] <= 0:
                     raise RetryBudgetExceeded("server retry budget exhausted")
                 self._retry_budget["server"] -= 1
-                self._failures += 1
-                if self._failures >= 3:
-                    self._circuit_open_until = time.monotonic() + 1.0
-                    raise WAFBlocked("circuit open")
                 backoff = min(1, 0.1 * (2**attempt)) + random.uniform(0.1, 0.3)
                 attempt += 1
                 await asyncio.sleep(backoff)
                 continue
-            self._failures = 0
             return resp
 
-    def _compute_hedge_delay(self) -> float:
-        if len(self._latencies) < 5:
+    def _throttle(self, host: str, resp: httpx.Response, throttled: int) -> None:
+        """Pause ``host`` as the throttling response asks, or give up."""
+        policy = ratelimit.parse(resp.headers)
+        delay = policy.delay
+        if delay is None:
+            delay = min(self.settings.throttle_max_wait, 2.0**throttled) * random.uniform(0.5, 1.0)
+        if throttled >= self.settings.throttle_retries:
+            raise RateLimited(f"{host} still throttling (HTTP {resp.status_code})", delay)
+        if delay > self.settings.throttle_max_wait:
+            raise RateLimited(f"{host} asked to wait {delay:.0f}s", delay)
+        if policy.rate:
+            # the advertised rate holds for the current quota window only
+            expires = policy.reset or policy.window or self.settings.throttle_max_wait
+            self._limiter.learn(host, policy.rate, expires)
+        self._limiter.pause(host, delay)
+
+    def _compute_hedge_delay(self, host: str) -> float:
+        stats = self.latency.get(host)
+        if stats.count < 5:
             return self.settings.hedge_delay
-        latencies = sorted(self._latencies)
-        index = int(0.95 * (len(latencies) - 1))
-        p95 = latencies[index]
-        delay = p95 * 0.2
+        delay = stats.p95 * 0.2
         return max(0.02, min(0.15, delay))
 
     async def _hedged_request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host or ""
         first = asyncio.create_task(self._request_with_retries(method, url, **kwargs))
-        await asyncio.sleep(self._compute_hedge_delay())
-        second = asyncio.create_task(self._request_with_retries(method, url, **kwargs))
-        done, pending = await asyncio.wait({first, second}, return_when=asyncio.FIRST_COMPLETED)
-        for task in pending:
-            task.cancel()
-        return list(done)[0].result()
-
-    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
-        if time.monotonic() < self._circuit_open_until:
-            raise WAFBlocked("circuit open")
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self._compute_hedge_delay(host))
+            # a half-open breaker admits one probe only: never race it
+            if done or self._breakers[host].state != CLOSED:
+                return await first
+            second = asyncio.create_task(self._request_with_retries(method, url, **kwargs))
+            try:
+                done, _ = await asyncio.wait(
+                    {first, second}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if first not in done and isinstance(second.exception(), WAFBlocked):
+                    # the hedge was refused by the breaker, the primary is still running
+                    return await first
+                return (first if first in done else second).result()
+            finally:
+                second.cancel()
+        finally:
+            first.cancel()
+
+    @staticmethod
+    def _flight_key(method: str, url: str, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+        method = method.upper()
+        if method not in _COALESCE_METHODS:
+            return None
+        if any(kwargs.get(name) is not None for name in _NO_COALESCE_KWARGS):
+            return None
+        headers = tuple(
+            sorted((k.lower(), v) for k, v in dict(kwargs.get("headers") or {}).items())
+        )
+        params = str(httpx.QueryParams(kwargs.get("params") or {}))
+        body = hashlib.sha1()
+        for name in ("content", "data", "json"):
+            value = kwargs.get(name)
+            if value is not None:
+                body.update(value if isinstance(value, bytes) else repr(value).encode())
+        options = (repr(kwargs.get("timeout")), kwargs.get("follow_redirects"))
+        return (method, url, params, headers, body.hexdigest(), options)
+
+    async def request(
+        self, method: str, url: str, *, coalesce: bool = True, **kwargs
+    ) -> httpx.Response:
+        """Issue a request through rate limiting, retries and hedging.
+
+        Concurrent identical idempotent requests share one network call unless
+        ``coalesce`` is false or ``Settings.coalesce_requests`` is disabled;
+        timing probes that need independent samples should opt out, which also
+        keeps them from being answered by the HTTP cache.
+        """
+        key = None
+        if coalesce and self.settings.coalesce_requests:
+            key = self._flight_key(method, url, kwargs)
+        elif not coalesce and self.settings.http_cache_enabled:
+            # an independent sample must not be answered from the HTTP cache
+            headers = httpx.Headers(kwargs.get("headers"))
+            headers.setdefault("Cache-Control", "no-cache")
+            kwargs["headers"] = headers
+        if key is None:
+            return await self._request(method, url, **kwargs)
+        return await self._flight.do(key, lambda: self._request(method, url, **kwargs))
+
+    async def request_many(
+        self,
+        requests: Union[Iterable[Any], AsyncIterable[Any]],
+        *,
+        window: Optional[int] = None,
+        ordered: bool = False,
+        is_finding: Optional[Callable[[Any], bool]] = None,
+    ) -> AsyncIterator[Tuple[Any, Any]]:
+        """Stream results of many requests through a sliding window.
+
+        ``requests`` yields ``(method, url)`` or ``(method, url, kwargs)``
+        tuples and is consumed lazily.  Each ``(request, result)`` pair is
+        yielded as soon as it completes (or in input order with ``ordered``);
+        ``result`` is the response or the exception raised.  ``window``
+        defaults to ``Settings.concurrency``.  With
+        ``Settings.stop_after_first_finding`` the first response accepted by
+        ``is_finding`` (which never sees exceptions) cancels everything still
+        in flight; breaking out of the loop does the same.
+        """
+
+        async def send(req: Any) -> httpx.Response:
+            method, url, *rest = req
+            return await self.request(method, url, **(rest[0] if rest else {}))
+
+        stop = is_finding if self.settings.stop_after_first_finding else None
+        async for item in sliding_window(
+            requests,
+            send,
+            window=window or self.settings.concurrency,
+            ordered=ordered,
+            stop=stop,
+        ):
+            yield item
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of client-side counters."""
+        return {
+            "coalesce": self._flight.stats(),
+            "rate_limit": self._limiter.snapshot(),
+            "concurrency": {host: lim.snapshot() for host, lim in self._limits.items()},
+            "circuits": {host: br.snapshot() for host, br in self._breakers.items()},
+            "latency": self.latency.snapshot(),
+            "connect": self._resolving.backend.snapshot() if self._resolving else {},
+        }
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
         host = httpx.URL(url).host or ""
         self._req_counts[host] += 1
         ratio = self._hedge_counts[host] / max(1, self._req_counts[host])
-        if (self.settings.hedge_delay > 0 or len(self._latencies) >= 5) and (
+        if (self.settings.hedge_delay > 0 or self.latency.get(host).count >= 5) and (
             ratio < self.settings.hedge_max_ratio
         ):
             self._hedge_counts[host] += 1
@@ -242,21 +505,32 @@ class HttpClient:
 
     async def get(self, url: str, **kwargs) -> httpx.Response:
         if self.settings.range_fetch_kb > 0:
+            host = httpx.URL(url).host or ""
+            window = self.settings.range_fetch_kb * 1024
             headers = dict(kwargs.get("headers", {}))
-            if "Range" not in headers:
-                end = self.settings.range_fetch_kb * 1024 - 1
-                headers["Range"] = f"bytes=0-{end}"
+            probing = "Range" not in headers
+            if probing:
+                if not self.range_cache.should_range(host):
+                    return await self.request("GET", url, **kwargs)
+                headers["Range"] = f"bytes=0-{window - 1}"
             kwargs["headers"] = headers
             resp = await self.request("GET", url, **kwargs)
             ctype = resp.headers.get("Content-Type", "").split(";")[0]
-            if resp.status_code == 206 and resp.headers.get("Accept-Ranges") and ctype in {
-                "text/html",
-                "application/json",
-                "text/xml",
-                "application/xml",
-            }:
+            useful = (
+                resp.status_code == 206
+                and bool(resp.headers.get("Accept-Ranges"))
+                and ctype in _RANGE_CTYPES
+            )
+            if probing:
+                short = resp.status_code == 200 and len(resp.content) < window
+                self.range_cache.record(host, useful=useful, short=short)
+            # a 200 means Range was ignored and the full body is already here
+            if useful or resp.status_code == 200:
                 return resp
             headers.pop("Range", None)
             kwargs["headers"] = headers
             return await self.request("GET", url, **kwargs)
         return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
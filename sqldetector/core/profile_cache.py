@@ -0,0 +1,189 @@
+"""TTL cache for per-host and per-route target profiles.
+
+WAF detection, framework fingerprinting and behavioural baselines cost dozens
+of requests each, yet nearly every candidate URL of a scan shares the host --
+and most share a handful of route shapes.  :class:`ProfileCache` computes such
+a profile once per origin (:meth:`ProfileCache.for_host`) or once per
+normalised path template (:meth:`ProfileCache.for_route`, where
+``/item/42`` and ``/item/77`` are both ``/item/{int}``) and hands the same
+result to every candidate until ``ttl`` expires.  Concurrent requests for one
+profile share a single computation; failures are not cached.
+
+With ``persist=True`` JSON-serialisable profiles are written through
+:mod:`sqldetector.autopilot.store` on :meth:`ProfileCache.aclose` and are
+reused by later runs while they are younger than ``ttl``.  Cached profiles are
+shared and must not be mutated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from sqldetector.autopilot import store
+
+from .singleflight import SingleFlight
+
+_NUM = re.compile(r"^\d+$")
+_UUID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_HEX = re.compile(r"^[0-9a-f]{16,}$", re.I)
+# long identifiers with at least one digit (slugs with ids, tokens)
+_TOKEN = re.compile(r"^(?=.*\d)[\w-]{20,}$")
+
+
+def origin(url: str) -> str:
+    """``scheme://host[:port]`` of ``url``, lower-cased."""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def _segment(seg: str) -> str:
+    if _NUM.match(seg):
+        return "{int}"
+    if _UUID.match(seg):
+        return "{uuid}"
+    if _HEX.match(seg):
+        return "{hex}"
+    if _TOKEN.match(seg):
+        return "{token}"
+    return seg
+
+
+def route_template(url: str) -> str:
+    """Origin plus the path with id-like segments replaced by placeholders."""
+    path = urlsplit(url).path or "/"
+    return origin(url) + "/".join(_segment(seg) for seg in path.split("/"))
+
+
+class ProfileCache:
+    """Memoize profile coroutines by ``(kind, key)`` for ``ttl`` seconds."""
+
+    def __init__(
+        self,
+        ttl: float = 1800.0,
+        *,
+        max_entries: int = 1024,
+        persist: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # (kind, key) -> (computed_at, profile)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._loaded: Set[str] = set()
+        self._dirty: Dict[str, Dict[str, Any]] = {}
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def _domain(key: str) -> str:
+        return urlsplit(key).hostname or key
+
+    def _load(self, domain: str) -> None:
+        if not self.persist or domain in self._loaded:
+            return
+        self._loaded.add(domain)
+        now = self.clock()
+        for name, record in store.load_profiles(domain).items():
+            kind, _, key = name.partition(" ")
+            try:
+                ts, value = float(record["ts"]), record["value"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if now - ts < self.ttl and (kind, key) not in self._entries:
+                self._entries[(kind, key)] = (ts, value)
+
+    def _get(self, kind: str, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            return False, None
+        if self.clock() - entry[0] >= self.ttl:
+            del self._entries[(kind, key)]
+            return False, None
+        self._entries.move_to_end((kind, key))
+        return True, entry[1]
+
+    def _put(self, kind: str, key: str, value: Any) -> None:
+        now = self.clock()
+        self._entries[(kind, key)] = (now, value)
+        self._entries.move_to_end((kind, key))
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if not self.persist:
+            return
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            return  # kept in memory only
+        pending = self._dirty.setdefault(self._domain(key), {})
+        pending[f"{kind} {key}"] = {"ts": now, "value": value}
+
+    async def _compute(
+        self, kind: str, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = await compute()
+        self._put(kind, key, value)
+        return value
+
+    # --------------------------------------------------------------
+    async def get(self, kind: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the ``kind`` profile of ``key``, running ``compute`` on a miss."""
+        self._load(self._domain(key))
+        found, value = self._get(kind, key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return await self._flight.do((kind, key), lambda: self._compute(kind, key, compute))
+
+    async def for_host(self, kind: str, url: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Profile shared by every URL of ``url``'s origin."""
+        return await self.get(kind, origin(url), compute)
+
+    async def for_route(self, kind: str, url: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Profile shared by every URL with ``url``'s :func:`route_template`."""
+        return await self.get(kind, route_template(url), compute)
+
+    def invalidate(self, kind: Optional[str] = None, url: Optional[str] = None) -> None:
+        """Drop entries of ``kind`` and/or of ``url``'s host (all when both are None)."""
+        host = urlsplit(url).hostname if url is not None else None
+        for k in list(self._entries):
+            if kind is not None and k[0] != kind:
+                continue
+            if host is not None and self._domain(k[1]) != host:
+                continue
+            del self._entries[k]
+
+    def _write(self, dirty: Dict[str, Dict[str, Any]]) -> None:
+        for domain, profiles in dirty.items():
+            try:
+                store.save_profiles(domain, profiles)
+            except OSError:
+                pass
+
+    async def aclose(self) -> None:
+        """Persist profiles computed since the last call (``persist=True`` only)."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        await asyncio.to_thread(self._write, dirty)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self._flight.saved,
+        }
+
+
+__all__ = ["ProfileCache", "origin", "route_template"]
@@ -0,0 +1,64 @@
+"""Single-flight coalescing of concurrent identical calls.
+
+The first caller for a key starts the work in a background task; callers
+arriving while it is still running await the same task instead of starting
+their own.  Waiters are counted per key: cancelling one waiter does not cancel
+the result for the others, but once the last waiter is cancelled the shared
+task is cancelled too so abandoned work does not keep running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Keyed de-duplication of in-flight coroutines."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict["asyncio.Task[Any]", int] = {}
+        self.calls = 0
+        self.saved = 0
+
+    def __len__(self) -> int:  # pragma: no cover - trivial
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.calls += 1
+        else:
+            self.saved += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                # last waiter gone: new callers must not join the dying task
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                task.cancel()
+            raise
+        finally:
+            left = self._waiters.pop(task) - 1
+            if left:
+                self._waiters[task] = left
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter went away
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "saved": self.saved, "inflight": len(self._inflight)}
+
+
+__all__ = ["SingleFlight"]
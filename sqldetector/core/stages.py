@@ -0,0 +1,193 @@
+"""Staged asynchronous pipeline with bounded queues.
+
+Running every step of a candidate before starting the next one leaves the
+network idle during CPU phases and the CPU idle during network phases.  A
+:class:`StagedPipeline` gives each :class:`Stage` its own worker pool and
+connects consecutive stages with bounded queues, so many items are in flight
+at different stages at once while a slow stage applies back-pressure to the
+ones before it.  Synchronous, CPU-heavy stage functions can be run on a
+worker thread with ``offload=True``; ``per_host`` caps how many items of one
+host a stage processes concurrently.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .bulk import _JOB_ERRORS, _pull
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One pipeline step.
+
+    ``fn`` receives an item and returns the item for the next stage; ``None``
+    drops it.  With ``fan_out`` the return value is an iterable whose
+    elements are forwarded one by one.  ``queue`` bounds the stage's input
+    queue (default: twice ``workers``).
+    """
+
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    queue: int = 0
+    offload: bool = False
+    per_host: Optional[int] = None
+    fan_out: bool = False
+
+
+class StagedPipeline:
+    """Run items through ``stages``; :meth:`run` yields the last stage's outputs.
+
+    ``host_of`` maps an item to its host for ``per_host`` limits.  Items whose
+    stage function raises are dropped and recorded in :attr:`errors` (and
+    passed to ``on_error`` when given) without stopping the pipeline.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        *,
+        host_of: Optional[Callable[[Any], str]] = None,
+        on_error: Optional[Callable[[str, Any, BaseException], None]] = None,
+    ) -> None:
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.host_of = host_of
+        self.on_error = on_error
+        self.errors: List[Tuple[str, Any, BaseException]] = []
+        self.processed: Dict[str, int] = {s.name: 0 for s in stages}
+        self._host_slots: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+
+    def _slot(self, stage: Stage, item: Any) -> Optional[asyncio.Semaphore]:
+        if stage.per_host is None or self.host_of is None:
+            return None
+        key = (stage.name, self.host_of(item))
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(stage.per_host)
+        return slot
+
+    async def _call(self, stage: Stage, item: Any) -> Any:
+        if stage.offload:
+            result = await asyncio.to_thread(stage.fn, item)
+        else:
+            result = stage.fn(item)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    async def _apply(self, stage: Stage, item: Any) -> Any:
+        slot = self._slot(stage, item)
+        if slot is None:
+            return await self._call(stage, item)
+        async with slot:
+            return await self._call(stage, item)
+
+    def _failed(self, stage: Stage, item: Any, exc: BaseException) -> None:
+        self.errors.append((stage.name, item, exc))
+        if self.on_error is None:
+            return
+        try:
+            self.on_error(stage.name, item, exc)
+        except _JOB_ERRORS as hook_exc:
+            self.errors.append((stage.name, item, hook_exc))
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue) -> None:
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            try:
+                result = await self._apply(stage, item)
+                if result is not None:
+                    # a fan-out generator may fail part-way; what it yielded
+                    # before stays forwarded
+                    for out in result if stage.fan_out else (result,):
+                        await outbox.put(out)
+            except _JOB_ERRORS as exc:
+                self._failed(stage, item, exc)
+                continue
+            self.processed[stage.name] += 1
+
+    async def _stage(
+        self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue, after: int
+    ) -> None:
+        workers = [
+            asyncio.ensure_future(self._worker(stage, inbox, outbox))
+            for _ in range(max(1, stage.workers))
+        ]
+        cancelled = False
+        try:
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            for w in workers:
+                w.cancel()
+            # one end marker per worker of the next stage (or the consumer),
+            # also when a worker died, so downstream never waits forever
+            if not cancelled:
+                for _ in range(after):
+                    await outbox.put(_DONE)
+
+    async def _feed(
+        self, items: Union[Iterable[Any], AsyncIterable[Any]], inbox: asyncio.Queue
+    ) -> None:
+        error: Optional[BaseException] = None
+        try:
+            async for item in _pull(items):
+                await inbox.put(item)
+        except _JOB_ERRORS as exc:
+            error = exc
+        # end markers go out either way so the stages drain and finish
+        for _ in range(max(1, self.stages[0].workers)):
+            await inbox.put(_DONE)
+        if error is not None:
+            raise error
+
+    async def run(self, items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+        queues = [
+            asyncio.Queue(maxsize=s.queue or 2 * max(1, s.workers)) for s in self.stages
+        ]
+        output: asyncio.Queue = asyncio.Queue(maxsize=2 * max(1, self.stages[-1].workers))
+        queues.append(output)
+        tasks = [asyncio.ensure_future(self._feed(items, queues[0]))]
+        for i, stage in enumerate(self.stages):
+            after = max(1, self.stages[i + 1].workers) if i + 1 < len(self.stages) else 1
+            tasks.append(
+                asyncio.ensure_future(self._stage(stage, queues[i], queues[i + 1], after))
+            )
+        try:
+            while True:
+                item = await output.get()
+                if item is _DONE:
+                    break
+                yield item
+            # surface a failure of the feeder (e.g. a broken input iterator)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+__all__ = ["Stage", "StagedPipeline"]
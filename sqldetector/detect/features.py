@@ -0,0 +1,202 @@
+"""Single-parse response features, memoized by body hash.
+
+:func:`extract_features` parses a body once with lxml and derives everything
+the detectors need from that tree: the main-content text, a tag histogram,
+forms, script URLs, SQL error hits and the size.  Results are kept in an LRU
+keyed by the xxh3 digest of the body, so a baseline compared against hundreds
+of variants, or the same error page served for many payloads, is parsed only
+once.  Memoized :class:`ResponseFeatures` are shared and must not be mutated.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import xxhash
+from lxml import etree, html as lxml_html
+
+from .sql_errors import SQL_ERROR_RX
+
+# subtrees left out of the core text (navigation, code, embedded media)
+SKIP_TAGS = frozenset(
+    {"script", "style", "noscript", "nav", "header", "footer", "svg", "canvas", "meta", "link"}
+)
+_WS_RE = re.compile(r"\s+")
+# text bodies are re-encoded as UTF-8, whatever their <meta charset> says
+_UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+
+
+@dataclass(frozen=True)
+class ResponseFeatures:
+    digest: int
+    size: int
+    core_text: str = ""
+    tags: Dict[str, int] = field(default_factory=dict)
+    forms: List[Dict[str, Any]] = field(default_factory=list)
+    script_urls: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def tag_total(self) -> int:
+        return sum(self.tags.values())
+
+    @cached_property
+    def tag_profile(self) -> Dict[str, float]:
+        """Tag histogram normalised to frequencies."""
+        total = self.tag_total or 1
+        return {tag: count / total for tag, count in self.tags.items()}
+
+    @property
+    def sql_error(self) -> bool:
+        return bool(self.errors)
+
+
+def _core_text(target: Any) -> str:
+    # iterative walk: comments and SKIP_TAGS subtrees contribute only their tail
+    parts: List[str] = []
+    stack: List[Any] = [target]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        tag = item.tag
+        if not isinstance(tag, str) or tag in SKIP_TAGS:
+            continue
+        if item.text:
+            parts.append(item.text)
+        for child in reversed(item):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+    text = " ".join(p.strip() for p in parts if p.strip())
+    return _WS_RE.sub(" ", text).strip()
+
+
+def _form(el: Any) -> Dict[str, Any]:
+    inputs: Dict[str, str] = {}
+    for inp in el.iter("input", "select", "textarea"):
+        name = inp.get("name")
+        if name:
+            inputs[name] = inp.get("value") or ""
+    return {
+        "action": el.get("action") or "",
+        "method": (el.get("method") or "get").lower(),
+        "inputs": inputs,
+    }
+
+
+def _skipped(el: Any) -> bool:
+    return any(a.tag in SKIP_TAGS for a in el.iterancestors())
+
+
+def _parse(
+    data: bytes, text: Optional[str], digest: int, size: int, parser: Any = None
+) -> ResponseFeatures:
+    if text is None:
+        text = data.decode("utf-8", "replace")
+    errors = list(dict.fromkeys(m.group(0) for m in SQL_ERROR_RX.finditer(text)))
+    try:
+        root = lxml_html.document_fromstring(data, parser=parser)
+    except (etree.ParserError, ValueError):
+        return ResponseFeatures(digest, size, errors=errors)
+
+    tags: Dict[str, int] = {}
+    forms: List[Dict[str, Any]] = []
+    scripts: List[str] = []
+    main = None
+    body = None
+    for el in root.iter():
+        tag = el.tag
+        if not isinstance(tag, str):
+            continue
+        tags[tag] = tags.get(tag, 0) + 1
+        if tag == "form":
+            forms.append(_form(el))
+        elif tag == "script":
+            src = el.get("src")
+            if src:
+                scripts.append(src)
+        elif tag in ("main", "article") and main is None and not _skipped(el):
+            main = el
+        elif tag == "body" and body is None:
+            body = el
+    target = main if main is not None else body if body is not None else root
+    return ResponseFeatures(
+        digest,
+        size,
+        core_text=_core_text(target),
+        tags=tags,
+        forms=forms,
+        script_urls=scripts,
+        errors=errors,
+    )
+
+
+class FeatureCache:
+    """LRU of :class:`ResponseFeatures` keyed by the xxh3-64 body digest."""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[int, int, bool], ResponseFeatures]" = OrderedDict()
+
+    def get(self, body: Union[str, bytes, None]) -> ResponseFeatures:
+        if body is None:
+            body = b""
+        if isinstance(body, str):
+            text = body
+            data = body.encode("utf-8", "surrogatepass")
+            parser = _UTF8_PARSER
+        else:
+            data = body
+            text = None
+            parser = None
+        digest = xxhash.xxh3_64_intdigest(data)
+        # str and bytes bodies are parsed differently and sized in chars vs
+        # bytes, so the same digest must not share an entry across the two
+        key = (digest, len(data), text is not None)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = _parse(data, text, digest, len(body), parser)
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_CACHE = FeatureCache()
+
+
+def extract_features(body: Union[str, bytes, None]) -> ResponseFeatures:
+    """Return the (memoized) :class:`ResponseFeatures` of ``body``."""
+    return _CACHE.get(body)
+
+
+def profile_distance(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """L1 distance between two tag profiles."""
+    return sum(abs(a.get(k, 0) - b.get(k, 0)) for k in set(a) | set(b))
+
+
+__all__ = [
+    "FeatureCache",
+    "ResponseFeatures",
+    "SKIP_TAGS",
+    "extract_features",
+    "profile_distance",
+]
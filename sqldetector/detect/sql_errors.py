@@ -0,0 +1,16 @@
+"""Database error signatures leaked into HTTP responses."""
+
+from __future__ import annotations
+
+import re
+
+SQL_ERROR_RX = re.compile(
+    r"(SQL syntax.*MySQL|Warning.*mysql_|valid MySQL result|PostgreSQL.*ERROR|"
+    r"SQL Server|ODBC.*SQL Server|SQLite.*(?:error|Exception)|UNION.*SELECT|ORA-\d{5}|"
+    r"psql:|PG::|SequelizeDatabaseError|ActiveRecord::StatementInvalid|PDOException|"
+    r"MySqlException|DataSourceError|org\.hibernate|JDBCException|System\.Data\.SqlClient|"
+    r"sqlite3\.OperationalError)",
+    re.I,
+)
+
+__all__ = ["SQL_ERROR_RX"]
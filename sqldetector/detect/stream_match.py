@@ -0,0 +1,37 @@
+"""Incremental pattern matching over streamed response bodies."""
+
+from __future__ import annotations
+
+import codecs
+import re
+from typing import AsyncIterable, Optional, Pattern, Union
+
+
+async def first_match(
+    chunks: AsyncIterable[bytes],
+    pattern: Union[str, Pattern[str]],
+    *,
+    overlap: int = 256,
+    encoding: str = "utf-8",
+) -> Optional[re.Match]:
+    """Return the first match of ``pattern`` in a stream of body chunks.
+
+    Each chunk is searched together with the last ``overlap`` characters of the
+    previous one so matches spanning a chunk boundary are still found.  The
+    caller's iterator is abandoned as soon as a match is seen, which lets
+    :meth:`HttpClient.iter_body` stop downloading the rest of the body.
+    """
+
+    rx = re.compile(pattern) if isinstance(pattern, str) else pattern
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    tail = ""
+    async for chunk in chunks:
+        text = tail + decoder.decode(chunk)
+        m = rx.search(text)
+        if m:
+            return m
+        tail = text[-overlap:] if overlap else ""
+    return None
+
+
+__all__ = ["first_match"]
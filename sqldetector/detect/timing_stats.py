@@ -1,70 +1,150 @@
 """Timing-based statistical tests.
 
-This module implements a very small subset of the statistics that the real
-project would use.  The goal for the exercises is to provide lightweight and
-dependency free helpers that still capture the spirit of the recommendation
-"Timing-channel statistics" from the design document.
-
 ``evaluate_timing`` performs two calculations:
 
 * Mann–Whitney U test – a non‑parametric test that determines whether two
   independent samples come from the same distribution.  We return the ``U``
-  statistic and an approximated two‑sided ``p`` value using a normal
-  distribution.
+  statistic and a two‑sided ``p`` value from the normal approximation.  Tied
+  values get their average rank and the variance is tie-corrected, which
+  matters for timings quantised to milliseconds.
 * Cliff's delta – a non‑parametric effect size metric which expresses how often
-  values in ``variant`` are larger than those in ``control``.
-
-The function returns a dictionary containing the above metrics so callers can
-decide whether an observed timing difference is significant.
+  values in ``control`` are larger than those in ``variant`` (negative when
+  the variant is slower).  It is counted by merging the two sorted samples,
+  ``O(n log n)`` instead of comparing every pair.
+
+Sequential callers that add one sample at a time use
+:class:`OnlineMannWhitney`, which updates both statistics with two binary
+searches and one sorted insert (``O(n)`` element moves) per sample instead of
+recomputing them.  :func:`evaluate_timing_batch` evaluates many ``(control, variant)``
+pairs at once with NumPy when it is installed.
 """
 
 from __future__ import annotations
 
 import math
+from bisect import bisect_left, bisect_right, insort
 from typing import Any, Dict, Sequence
 
+try:  # optional dependency
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None
+
+_SQRT2 = math.sqrt(2)
+
+
+def _p_value(u1: float, n1: int, n2: int, tie_term: float) -> tuple[float, float]:
+    """Return ``min(U1, U2)`` and the tie-corrected two-sided p-value."""
+    u = min(u1, n1 * n2 - u1)
+    n = n1 + n2
+    if n1 == 0 or n2 == 0:
+        return u, 1.0
+    var = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var <= 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2) / math.sqrt(var)
+    return u, math.erfc(abs(z) / _SQRT2)
+
 
 def _mann_whitney_u(x: Sequence[float], y: Sequence[float]) -> tuple[float, float]:
     """Return the U statistic and a two-sided p-value.
 
-    The implementation follows the textbook algorithm and uses a normal
-    approximation for the p-value which is sufficient for small sample sizes
-    used in our unit tests.  Ties are ignored which keeps the function compact.
+    Tied values share the average of their ranks and the normal approximation
+    uses the tie-corrected variance.
     """
 
     n1, n2 = len(x), len(y)
     ranked = sorted([(v, 0) for v in x] + [(v, 1) for v in y])
-    ranks = [0.0] * (n1 + n2)
-    for i, (_, grp) in enumerate(ranked, 1):
-        ranks[i - 1] = i
-    r1 = sum(ranks[i] for i, (_, grp) in enumerate(ranked) if grp == 0)
+    r1 = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j < len(ranked) and ranked[j][0] == ranked[i][0]:
+            j += 1
+        t = j - i
+        avg = (i + 1 + j) / 2  # ranks i+1 .. j
+        r1 += avg * sum(1 for k in range(i, j) if ranked[k][1] == 0)
+        tie_term += t**3 - t
+        i = j
     u1 = r1 - n1 * (n1 + 1) / 2
-    u2 = n1 * n2 - u1
-    u = min(u1, u2)
-    mu = n1 * n2 / 2
-    sigma = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
-    if sigma == 0:
-        return u, 1.0
-    z = (u - mu) / sigma
-    # two sided normal distribution using error function
-    p = 2 * (1 - 0.5 * (1 + math.erf(abs(z) / math.sqrt(2))))
-    return u, p
+    return _p_value(u1, n1, n2, tie_term)
 
 
 def _cliffs_delta(x: Sequence[float], y: Sequence[float]) -> float:
-    gt = lt = 0
-    for a in x:
-        for b in y:
-            if a > b:
-                gt += 1
-            elif a < b:
-                lt += 1
     n1, n2 = len(x), len(y)
     if n1 * n2 == 0:
         return 0.0
+    xs, ys = sorted(x), sorted(y)
+    # walk both sorted samples once: for each a, ``lo`` values of y are < a
+    # and ``hi`` values are <= a
+    gt = lt = lo = hi = 0
+    for a in xs:
+        while lo < n2 and ys[lo] < a:
+            lo += 1
+        if hi < lo:
+            hi = lo
+        while hi < n2 and ys[hi] <= a:
+            hi += 1
+        gt += lo
+        lt += n2 - hi
     return (gt - lt) / (n1 * n2)
 
 
+class OnlineMannWhitney:
+    """Mann–Whitney U and Cliff's delta under one-sample-at-a-time updates.
+
+    Keeps both samples sorted and maintains the pair counts and the tie term.
+    Adding a sample costs two ``O(log n)`` binary searches plus an ``insort``,
+    which is ``O(n)`` because it shifts the list, and :meth:`result` is
+    ``O(1)``.
+    """
+
+    def __init__(self, control: Sequence[float] = (), variant: Sequence[float] = ()) -> None:
+        self.control: list[float] = []
+        self.variant: list[float] = []
+        self.gt = 0  # pairs with control > variant
+        self.lt = 0  # pairs with control < variant
+        self.tie_term = 0.0
+        self._counts: Dict[float, int] = {}
+        for v in control:
+            self.add_control(v)
+        for v in variant:
+            self.add_variant(v)
+
+    def _count(self, value: float) -> None:
+        c = self._counts.get(value, 0)
+        # (c+1)^3 - (c+1) - (c^3 - c)
+        self.tie_term += 3 * c * c + 3 * c
+        self._counts[value] = c + 1
+
+    def add_control(self, value: float) -> None:
+        ys = self.variant
+        self.gt += bisect_left(ys, value)
+        self.lt += len(ys) - bisect_right(ys, value)
+        insort(self.control, value)
+        self._count(value)
+
+    def add_variant(self, value: float) -> None:
+        xs = self.control
+        self.gt += len(xs) - bisect_right(xs, value)
+        self.lt += bisect_left(xs, value)
+        insort(self.variant, value)
+        self._count(value)
+
+    @property
+    def cliffs_delta(self) -> float:
+        pairs = len(self.control) * len(self.variant)
+        return (self.gt - self.lt) / pairs if pairs else 0.0
+
+    def result(self) -> Dict[str, Any]:
+        """The same dictionary :func:`evaluate_timing` returns."""
+        n1, n2 = len(self.control), len(self.variant)
+        ties = n1 * n2 - self.gt - self.lt
+        u, p = _p_value(self.gt + ties / 2, n1, n2, self.tie_term)
+        return {"u": u, "p": p, "cliffs_delta": self.cliffs_delta}
+
+
 def evaluate_timing(control: Sequence[float], variant: Sequence[float]) -> Dict[str, Any]:
     """Evaluate timing differences between two sample sets.
 
@@ -87,6 +167,60 @@ def evaluate_timing(control: Sequence[float], variant: Sequence[float]) -> Dict[
     return {"u": u, "p": p, "cliffs_delta": delta}
 
 
+def evaluate_timing_batch(control: Any, variant: Any) -> Dict[str, Any]:
+    """Evaluate ``k`` sample pairs at once.
+
+    ``control`` has shape ``(k, n1)`` and ``variant`` shape ``(k, n2)``; row
+    ``i`` of each is one pair.  Returns the keys of :func:`evaluate_timing`
+    with one value per pair -- NumPy arrays when NumPy is installed, lists
+    computed pair by pair otherwise.
+    """
+
+    if np is None:
+        results = [evaluate_timing(c, v) for c, v in zip(control, variant)]
+        return {key: [r[key] for r in results] for key in ("u", "p", "cliffs_delta")}
+
+    x = np.asarray(control, dtype=float)
+    y = np.asarray(variant, dtype=float)
+    if x.ndim != 2 or y.ndim != 2 or x.shape[0] != y.shape[0]:
+        raise ValueError("control and variant must be 2-D with one row per pair")
+    k, n1 = x.shape
+    n2 = y.shape[1]
+    n = n1 + n2
+    if k == 0 or n1 == 0 or n2 == 0:
+        zeros = np.zeros(k)
+        return {"u": zeros, "p": np.ones(k), "cliffs_delta": zeros.copy()}
+
+    # sort every row of the combined samples, then find tie groups per row
+    values = np.concatenate([x, y], axis=1)
+    order = np.argsort(values, axis=1, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=1)
+    starts = np.ones((k, n), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    flat_starts = starts.ravel()
+    group = np.cumsum(flat_starts) - 1
+    begin = np.flatnonzero(flat_starts)
+    end = np.append(begin[1:], k * n)
+    size = end - begin
+    # rank of a group = average of its 1-based positions within the row
+    position = begin % n
+    avg_rank = (position + 1 + position + size) / 2
+    ranks = avg_rank[group].reshape(k, n)
+
+    in_control = order < n1
+    r1 = np.where(in_control, ranks, 0.0).sum(axis=1)
+    u1 = r1 - n1 * (n1 + 1) / 2
+    u = np.minimum(u1, n1 * n2 - u1)
+    tie_term = np.bincount(begin // n, weights=size**3 - size, minlength=k)
+    var = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(var > 0, (u - n1 * n2 / 2) / np.sqrt(np.maximum(var, 0)), 0.0)
+    p = np.vectorize(math.erfc, otypes=[float])(np.abs(z) / _SQRT2)
+    # U1 counts control > variant pairs plus half the ties
+    delta = 2 * u1 / (n1 * n2) - 1
+    return {"u": u, "p": p, "cliffs_delta": delta}
+
+
 def sequential_test(control_fn, variant_fn, *, max_rounds: int = 7, alpha: float = 0.05):
     """Run a simple sequential test between two callables.
 
@@ -98,15 +232,21 @@ def sequential_test(control_fn, variant_fn, *, max_rounds: int = 7, alpha: float
     ``stats`` contains the last statistics plus the number of rounds executed.
     """
 
-    control: list[float] = []
-    variant: list[float] = []
+    state = OnlineMannWhitney()
     stats: Dict[str, Any] = {"u": 0.0, "p": 1.0, "cliffs_delta": 0.0, "rounds": 0}
     for round_ in range(1, max_rounds + 1):
-        control.append(control_fn())
-        variant.append(variant_fn())
-        stats = evaluate_timing(control, variant)
+        state.add_control(control_fn())
+        state.add_variant(variant_fn())
+        stats = state.result()
         stats["rounds"] = round_
         if stats["p"] < alpha:
             return True, stats
     return False, stats
 
+
+__all__ = [
+    "OnlineMannWhitney",
+    "evaluate_timing",
+    "evaluate_timing_batch",
+    "sequential_test",
+]
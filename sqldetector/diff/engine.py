@@ -0,0 +1,203 @@
+"""Pluggable content-similarity engines with a bounded-cost fast path.
+
+``difflib.SequenceMatcher`` is super-linear in the body size and, with its
+autojunk heuristic, can take seconds on a large page.  :class:`FastDiff`
+estimates the same ``2 * matches / total`` ratio in linear time:
+
+* bodies are cut into units (lines, with very long lines split before each
+  tag) and every unit is hashed with xxh3;
+* byte-identical bodies return ``1.0`` straight from their digests;
+* the common prefix and suffix of unit hashes are matched in one scan;
+* only the changed region in the middle is diffed exactly, and only while
+  its cost (``len(a) * len(b)``) stays under ``max_cost`` -- first character
+  by character, then unit by unit; beyond that the overlap of the two unit
+  multisets is used as an approximation.
+
+Fingerprints are memoized by body digest, so comparing one baseline against
+many variants with :meth:`DiffEngine.ratios` hashes the baseline once.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import xxhash
+
+_TAG_SPLIT = re.compile(r"(?=<)")
+
+
+@dataclass
+class Fingerprint:
+    digest: int
+    size: int
+    units: List[str]
+    hashes: List[int]
+    weights: List[int]
+    simhash: Optional[int] = None
+
+    @property
+    def total(self) -> int:
+        return sum(self.weights)
+
+
+def _units(text: str, max_unit: int) -> List[str]:
+    out: List[str] = []
+    for line in text.split("\n"):
+        if len(line) <= max_unit:
+            out.append(line)
+        else:
+            out.extend(part for part in _TAG_SPLIT.split(line) if part)
+    return out
+
+
+def _simhash(hashes: Iterable[int]) -> int:
+    weights = [0] * 64
+    for h in hashes:
+        for i in range(64):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    out = 0
+    for i, w in enumerate(weights):
+        if w > 0:
+            out |= 1 << i
+    return out
+
+
+class DiffEngine:
+    """Similarity ratio in ``[0, 1]`` between two bodies."""
+
+    name = "base"
+
+    def ratio(self, a: str, b: str) -> float:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def ratios(self, baseline: str, variants: Iterable[str]) -> List[float]:
+        """Compare one ``baseline`` against many ``variants``."""
+        return [self.ratio(baseline, v) for v in variants]
+
+
+class SequenceMatcherDiff(DiffEngine):
+    """Exact :class:`difflib.SequenceMatcher` ratio (the historic behaviour)."""
+
+    name = "difflib"
+
+    def ratio(self, a: str, b: str) -> float:
+        return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+class FastDiff(DiffEngine):
+    """Linear-time approximate ratio; exact only on small changed regions."""
+
+    name = "fast"
+
+    def __init__(
+        self,
+        max_cost: int = 4_000_000,
+        max_unit: int = 2048,
+        near_duplicate_exit: bool = False,
+        max_entries: int = 256,
+    ) -> None:
+        self.max_cost = max_cost
+        self.max_unit = max_unit
+        # treating simhash distance 0 as identical is fast but can hide a
+        # one-line change in a large page, so it is opt-in
+        self.near_duplicate_exit = near_duplicate_exit
+        self.max_entries = max_entries
+        self.exact = 0
+        self.approximate = 0
+        self._cache: "OrderedDict[Tuple[int, int], Fingerprint]" = OrderedDict()
+
+    def fingerprint(self, text: str) -> Fingerprint:
+        data = text.encode("utf-8", "surrogatepass")
+        key = (xxhash.xxh3_64_intdigest(data), len(data))
+        fp = self._cache.get(key)
+        if fp is not None:
+            self._cache.move_to_end(key)
+            return fp
+        units = _units(text, self.max_unit)
+        hashes = [xxhash.xxh3_64_intdigest(u.encode("utf-8", "surrogatepass")) for u in units]
+        fp = Fingerprint(key[0], key[1], units, hashes, [len(u) + 1 for u in units])
+        if self.near_duplicate_exit:
+            fp.simhash = _simhash(hashes)
+        self._cache[key] = fp
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return fp
+
+    def _middle(self, a: Fingerprint, b: Fingerprint, lo: int, ea: int, eb: int) -> int:
+        ua, ub = a.units[lo:ea], b.units[lo:eb]
+        if not ua or not ub:
+            return 0
+        wa, wb = sum(a.weights[lo:ea]), sum(b.weights[lo:eb])
+        if wa * wb <= self.max_cost:
+            self.exact += 1
+            sm = difflib.SequenceMatcher(None, "\n".join(ua), "\n".join(ub), autojunk=False)
+            return sum(block.size for block in sm.get_matching_blocks())
+        ha, hb = a.hashes[lo:ea], b.hashes[lo:eb]
+        if len(ha) * len(hb) <= self.max_cost:
+            self.exact += 1
+            sm = difflib.SequenceMatcher(None, ha, hb, autojunk=False)
+            weights = a.weights[lo:ea]
+            return sum(
+                sum(weights[blk.a : blk.a + blk.size]) for blk in sm.get_matching_blocks()
+            )
+        # too large to align: count units present on both sides
+        self.approximate += 1
+        weight_of: Dict[int, int] = dict(zip(ha, a.weights[lo:ea]))
+        common = Counter(ha) & Counter(hb)
+        return sum(weight_of[h] * n for h, n in common.items())
+
+    def compare(self, a: Fingerprint, b: Fingerprint) -> float:
+        if a.digest == b.digest and a.size == b.size:
+            return 1.0
+        if self.near_duplicate_exit and a.simhash is not None and a.simhash == b.simhash:
+            return 1.0
+        total = a.total + b.total
+        if not total:
+            return 1.0
+        ha, hb = a.hashes, b.hashes
+        n = min(len(ha), len(hb))
+        lo = 0
+        while lo < n and ha[lo] == hb[lo]:
+            lo += 1
+        tail = 0
+        while tail < n - lo and ha[-1 - tail] == hb[-1 - tail]:
+            tail += 1
+        ea, eb = len(ha) - tail, len(hb) - tail
+        matched = sum(a.weights[:lo]) + sum(a.weights[ea:])
+        matched += self._middle(a, b, lo, ea, eb)
+        return min(1.0, 2.0 * matched / total)
+
+    def ratio(self, a: str, b: str) -> float:
+        return self.compare(self.fingerprint(a), self.fingerprint(b))
+
+    def ratios(self, baseline: str, variants: Iterable[str]) -> List[float]:
+        base = self.fingerprint(baseline)
+        return [self.compare(base, self.fingerprint(v)) for v in variants]
+
+
+ENGINES: Dict[str, Callable[[], DiffEngine]] = {
+    "difflib": SequenceMatcherDiff,
+    "fast": FastDiff,
+}
+
+
+def get_engine(name: str = "fast") -> DiffEngine:
+    """Instantiate the engine registered as ``name``."""
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ValueError(f"unknown diff engine: {name!r}") from None
+
+
+__all__ = [
+    "DiffEngine",
+    "ENGINES",
+    "FastDiff",
+    "Fingerprint",
+    "SequenceMatcherDiff",
+    "get_engine",
+]
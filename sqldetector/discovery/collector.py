@@ -1,43 +1,48 @@
 """Endpoint discovery using Playwright.
 
-The implementation is intentionally lightweight: it launches a headless browser
-(using Playwright if available) and records all network requests triggered by the
-page.  Simple form auto-fill and submission is attempted to surface additional
-endpoints.  When Playwright is not installed the function returns an empty list.
+The implementation is intentionally lightweight: it borrows a page from a
+:class:`~sqldetector.smart.browser.pool.BrowserPool` (using Playwright if
+available) and records all network requests triggered by the page.  Simple
+form auto-fill and submission is attempted to surface additional endpoints.
+When Playwright is not installed the function returns an empty list.
 """
 from __future__ import annotations
 
-from typing import List, Set
+from typing import List, Optional, Set
 
-try:  # pragma: no cover - optional dependency
-    from playwright.async_api import async_playwright
-except Exception:  # pragma: no cover
-    async_playwright = None  # type: ignore
+from sqldetector.smart.browser.pool import BrowserPool, shared_pool
 
 
-async def collect(url: str) -> List[str]:
-    """Return a list of endpoints discovered while visiting ``url``."""
-    if async_playwright is None:  # pragma: no cover - fallback when dependency missing
+async def collect(url: str, pool: Optional[BrowserPool] = None) -> List[str]:
+    """Return a list of endpoints discovered while visiting ``url``.
+
+    Without ``pool`` the process-wide :func:`shared_pool` is used; closing it
+    is left to the owner of the event loop.
+    """
+    if pool is None:
+        pool = shared_pool()
+    if not pool.available:  # pragma: no cover - fallback when dependency missing
         return []
 
     endpoints: Set[str] = set()
-    async with async_playwright() as pw:  # type: ignore[func-returns-value]
-        browser = await pw.chromium.launch(headless=True)
-        page = await browser.new_page()
-        page.on("request", lambda req: endpoints.add(req.url))
-        await page.goto(url)
-        # try to submit forms with dummy data
-        for form in await page.query_selector_all("form"):
-            inputs = await form.query_selector_all("input[name]")
-            for inp in inputs:
-                try:
-                    await inp.fill("1")
-                except Exception:
-                    pass
+    async with pool.page() as page:
+        await _visit(page, url, endpoints)
+    return sorted(endpoints)
+
+
+async def _visit(page, url: str, endpoints: Set[str]) -> None:
+    page.on("request", lambda req: endpoints.add(req.url))
+    await page.goto(url)
+    # try to submit forms with dummy data
+    for form in await page.query_selector_all("form"):
+        inputs = await form.query_selector_all("input[name]")
+        for inp in inputs:
             try:
-                await form.evaluate("form => form.submit()")
-                await page.wait_for_timeout(50)
+                await inp.fill("1")
             except Exception:
                 pass
-        await browser.close()
-    return sorted(endpoints)
+        try:
+            await form.evaluate("form => form.submit()")
+            await page.wait_for_timeout(50)
+        except Exception:
+            pass
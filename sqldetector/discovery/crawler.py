@@ -0,0 +1,259 @@
+"""Concurrent headless-browser crawl driven by :class:`Frontier`.
+
+``pages`` workers each borrow a page from a
+:class:`~sqldetector.smart.browser.pool.BrowserPool`, pop the most promising
+URL from the frontier and visit it.  Instead of fixed sleeps a visit waits
+until the page's network has been idle for ``quiet`` seconds (capped at
+``max_wait``).  Links, forms and URLs embedded in inline scripts are extracted
+in the page with a single ``evaluate`` call, so the HTML is never serialised
+and re-parsed in Python.  Per-host politeness is a concurrency cap plus an
+optional navigation rate from :class:`HostRateLimiter`.  ``on_host`` is
+handed to the frontier and sees the first URL of every new origin, e.g.
+:meth:`~sqldetector.net.prewarm.Prewarmer.add`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Set
+from urllib.parse import urldefrag, urlsplit
+
+from sqldetector.core.config import Settings
+from sqldetector.discovery.frontier import Frontier
+from sqldetector.pacing.host_bucket import HostRateLimiter
+from sqldetector.smart.browser.pool import BrowserPool
+
+# runs in the page; ``markers`` is an optional case-insensitive regex source
+EXTRACT_JS = r"""
+(markers) => {
+  const abs = (u) => {
+    try { return new URL(u, document.baseURI).href; } catch (e) { return null; }
+  };
+  const out = {links: [], forms: [], scripts: [], markers: []};
+  for (const a of document.querySelectorAll('a[href]')) out.links.push(a.href);
+  for (const f of document.querySelectorAll('form')) {
+    const inputs = {};
+    for (const el of f.querySelectorAll('input, select, textarea')) {
+      const name = el.getAttribute('name');
+      if (name) inputs[name] = el.getAttribute('value') || '';
+    }
+    out.forms.push({
+      action: abs(f.getAttribute('action') || '') || location.href,
+      method: (f.getAttribute('method') || 'get').toLowerCase(),
+      inputs,
+    });
+  }
+  const rx = new RegExp([
+    String.raw`(["'])(https?:\/\/[^"']+)\1`,
+    String.raw`(?:fetch|axios\.(?:get|post)|open)\(\s*(["'])(\/[^"']+)\3`,
+  ].join('|'), 'gi');
+  const jrx = /["']url["']\s*:\s*["'](\/[^"']+)["']/g;
+  for (const s of document.querySelectorAll('script:not([src])')) {
+    const text = s.textContent || '';
+    for (const m of text.matchAll(rx)) out.scripts.push(m[2] || abs(m[4]));
+    for (const m of text.matchAll(jrx)) out.scripts.push(abs(m[1]));
+  }
+  if (markers) {
+    const found = document.documentElement.outerHTML.match(new RegExp(markers, 'gi')) || [];
+    out.markers = [...new Set(found.map((m) => m.toLowerCase()))];
+  }
+  return out;
+}
+"""
+
+
+class NetworkQuiet:
+    """Track in-flight requests of a page and wait for the network to settle."""
+
+    def __init__(self, page: Any) -> None:
+        self.inflight = 0
+        self.last = asyncio.get_running_loop().time()
+        self._changed = asyncio.Event()
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+
+    def _touch(self) -> None:
+        self.last = asyncio.get_running_loop().time()
+        self._changed.set()
+
+    def _started(self, _request: Any) -> None:
+        self.inflight += 1
+        self._touch()
+
+    def _finished(self, _request: Any) -> None:
+        self.inflight = max(0, self.inflight - 1)
+        self._touch()
+
+    async def wait(self, quiet: float, timeout: float) -> bool:
+        """Return once nothing was in flight for ``quiet`` seconds.
+
+        Gives up after ``timeout`` seconds (long-polling pages never settle)
+        and returns ``False`` in that case.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            now = loop.time()
+            left = deadline - now
+            if left <= 0:
+                return False
+            self._changed.clear()
+            if self.inflight == 0:
+                idle = now - self.last
+                if idle >= quiet:
+                    return True
+                delay = quiet - idle
+            else:
+                delay = left
+            try:
+                await asyncio.wait_for(self._changed.wait(), min(delay, left))
+            except asyncio.TimeoutError:
+                pass
+
+
+@dataclass
+class CrawlResult:
+    visited: Set[str] = field(default_factory=set)
+    requests: Set[str] = field(default_factory=set)
+    scripts: Set[str] = field(default_factory=set)
+    forms: List[Dict[str, Any]] = field(default_factory=list)
+    headers: Dict[str, str] = field(default_factory=dict)
+    markers: Set[str] = field(default_factory=set)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def urls(self) -> Set[str]:
+        """Visited pages plus in-scope network and script URLs."""
+        return {
+            u
+            for u in self.visited | self.requests | self.scripts
+            if u.startswith(("http://", "https://"))
+        }
+
+
+def same_site(start_url: str, include_subdomains: bool = True) -> Callable[[str], bool]:
+    """Scope predicate: ``start_url``'s host and, optionally, its subdomains."""
+    root = (urlsplit(start_url).hostname or "").lower()
+
+    def in_scope(url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        host = (parts.hostname or "").lower()
+        return host == root or (include_subdomains and host.endswith("." + root))
+
+    return in_scope
+
+
+class BrowserCrawler:
+    """Crawl with ``pages`` browser pages in parallel."""
+
+    def __init__(
+        self,
+        pool: BrowserPool,
+        *,
+        pages: int = 4,
+        max_pages: int = 2000,
+        per_host: Optional[int] = None,
+        rate: float = 0.0,
+        quiet: float = 0.25,
+        max_wait: float = 5.0,
+        timeout: float = 25.0,
+        in_scope: Optional[Callable[[str], bool]] = None,
+        markers: Optional[Pattern[str]] = None,
+        settings: Optional[Settings] = None,
+        on_host: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.pool = pool
+        self.pages = max(1, pages)
+        self.max_pages = max_pages
+        self.per_host = max(1, per_host or self.pages)
+        self.quiet = quiet
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.in_scope = in_scope
+        self.markers = markers.pattern if markers is not None else None
+        self.frontier = Frontier(settings or Settings(), on_host=on_host)
+        self.limiter = HostRateLimiter(rate)
+        self.result = CrawlResult()
+        self._seen: Set[str] = set()
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._started = 0
+        self._active = 0
+        self._wake = asyncio.Event()
+
+    def _scoped(self, url: str) -> bool:
+        return self.in_scope is None or self.in_scope(url)
+
+    def add(self, url: str) -> None:
+        url = urldefrag(url)[0]
+        if not url.startswith(("http://", "https://")):
+            return
+        if url in self._seen or not self._scoped(url):
+            return
+        self._seen.add(url)
+        self.frontier.add(url)
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    def _on_request(self, request: Any) -> None:
+        url = request.url
+        if url.startswith(("http://", "https://")) and self._scoped(url):
+            self.result.requests.add(url)
+
+    async def _visit(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        async with self._slot(host):
+            await self.limiter.acquire(host)
+            async with self.pool.page() as page:
+                quiet = NetworkQuiet(page)
+                page.on("request", self._on_request)
+                response = await page.goto(
+                    url, wait_until="domcontentloaded", timeout=self.timeout * 1000
+                )
+                await quiet.wait(self.quiet, self.max_wait)
+                data = await page.evaluate(EXTRACT_JS, self.markers)
+        if response is not None:
+            self.result.headers.update(
+                {k.lower(): v for k, v in response.headers.items()}
+            )
+        self.result.visited.add(url)
+        self.result.forms.extend(data.get("forms", []))
+        self.result.markers.update(data.get("markers", []))
+        for script_url in data.get("scripts", []):
+            if script_url:
+                self.result.scripts.add(script_url)
+        for link in data.get("links", []):
+            self.add(link)
+
+    async def _worker(self) -> None:
+        while True:
+            while not len(self.frontier) or self._started >= self.max_pages:
+                if self._active == 0 or self._started >= self.max_pages:
+                    return
+                self._wake.clear()
+                await self._wake.wait()
+            url = self.frontier.pop()
+            self._started += 1
+            self._active += 1
+            try:
+                await self._visit(url)
+            except Exception as exc:
+                self.result.errors[url] = str(exc)
+            finally:
+                self._active -= 1
+                self._wake.set()
+
+    async def crawl(self, seeds: Iterable[str]) -> CrawlResult:
+        for url in seeds:
+            self.add(url)
+        await asyncio.gather(*(self._worker() for _ in range(self.pages)))
+        return self.result
+
+
+__all__ = ["BrowserCrawler", "CrawlResult", "EXTRACT_JS", "NetworkQuiet", "same_site"]
@@ -3,18 +3,27 @@
 from __future__ import annotations
 
 from heapq import heappush, heappop
-from typing import Set, Tuple
+from typing import Callable, Optional, Set, Tuple
+from urllib.parse import urlsplit
 
 from sqldetector.core.config import Settings
 
 
 class Frontier:
-    """Simple priority queue respecting preset weights."""
+    """Simple priority queue respecting preset weights.
 
-    def __init__(self, settings: Settings) -> None:
+    ``on_host`` is called with the first URL seen for every new origin, e.g.
+    to warm connections before the origin's first request is popped.
+    """
+
+    def __init__(
+        self, settings: Settings, on_host: Optional[Callable[[str], None]] = None
+    ) -> None:
         self.settings = settings
+        self.on_host = on_host
         self._heap: list[Tuple[int, int, str]] = []
         self._seen: Set[str] = set()
+        self._hosts: Set[str] = set()
         self._counter = 0
 
     # --------------------------------------------------------------
@@ -34,6 +43,12 @@ class Frontier:
         if (self.settings.simhash_enabled or self.settings.bloom_enabled) and url in self._seen:
             return
         self._seen.add(url)
+        if self.on_host is not None:
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            if origin not in self._hosts:
+                self._hosts.add(origin)
+                self.on_host(url)
         heappush(self._heap, (self._priority(url), self._counter, url))
         self._counter += 1
 
@@ -0,0 +1,105 @@
+"""Per-host memory of ``Range`` request support.
+
+Hosts that ignore ``Range`` (answering ``200``), only honour it for binary
+content, or serve bodies that fit inside the window anyway gain nothing from a
+ranged request; an unusable ``206`` even costs a second full fetch.  After
+``probes`` such outcomes without a single useful ``206`` the host is marked and
+callers send a plain request straight away.  The table is persisted next to the DNS cache so
+later runs start warm; entries older than ``ttl`` seconds are forgotten so a
+host that starts honouring ``Range`` is probed again.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqldetector.net.dns_cache import CACHE_PATH as DNS_CACHE_PATH
+
+CACHE_PATH = DNS_CACHE_PATH.with_name("range.json")
+
+
+class RangeSupportCache:
+    """Track ranged-fetch outcomes per host."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = CACHE_PATH,
+        probes: int = 2,
+        *,
+        ttl: float = 86400.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.probes = probes
+        self.ttl = ttl
+        self.clock = clock
+        # host -> {"ts": first outcome, "useful"/"ignored"/"short": counts}
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._load()
+
+    # --------------------------------------------------------------
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                data = json.load(f)
+            self.hosts = {host: entry for host, entry in data.items() if self._fresh(entry)}
+        except Exception:
+            pass
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf8") as f:
+                json.dump(self.hosts, f)
+            self._dirty = False
+        except Exception:
+            pass
+
+    # --------------------------------------------------------------
+    def _fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.clock() - float(entry.get("ts", 0)) < self.ttl
+
+    def _get(self, host: str) -> Optional[Dict[str, Any]]:
+        entry = self.hosts.get(host)
+        if entry is not None and not self._fresh(entry):
+            del self.hosts[host]
+            self._dirty = True
+            return None
+        return entry
+
+    def should_range(self, host: str) -> bool:
+        """Return ``False`` once ``host`` is known not to benefit from Range."""
+        entry = self._get(host)
+        if not entry or entry["useful"]:
+            return True
+        return entry["ignored"] + entry["short"] < self.probes
+
+    def record(self, host: str, *, useful: bool, short: bool = False) -> None:
+        """Record one ranged fetch.
+
+        ``useful`` means the server answered ``206`` with a partial body that
+        could be used as-is; ``short`` means the full body already fit within
+        the window.
+        """
+        entry = self._get(host)
+        if entry is None:
+            entry = {"ts": self.clock(), "useful": 0, "ignored": 0, "short": 0}
+            self.hosts[host] = entry
+        if useful:
+            entry["useful"] += 1
+        elif short:
+            entry["short"] += 1
+        else:
+            entry["ignored"] += 1
+        self._dirty = True
+
+
+__all__ = ["RangeSupportCache", "CACHE_PATH"]
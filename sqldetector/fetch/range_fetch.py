@@ -2,28 +2,53 @@ from __future__ import annotations
 
 """Helpers for partial HTTP fetches."""
 
+from typing import Optional
+
 import httpx
 
+from .range_cache import RangeSupportCache
+
 
-async def probe_range(session: httpx.AsyncClient, url: str, kb: int):
+async def probe_range(
+    session: httpx.AsyncClient,
+    url: str,
+    kb: int,
+    cache: Optional[RangeSupportCache] = None,
+):
     """Fetch up to ``kb`` kilobytes from ``url``.
 
     A ``HEAD`` request is issued first to check for ``Accept-Ranges`` support
     and to obtain the full size.  If the body is larger than ``kb`` kilobytes a
     ranged ``GET`` is performed.  Otherwise the function falls back to a normal
     ``GET``.
+
+    ``cache`` (defaulting to ``session.range_cache`` when ``session`` is an
+    :class:`~sqldetector.core.http_async.HttpClient`) remembers hosts without
+    usable Range support; for those the ``HEAD`` probe is skipped entirely.
     """
 
     if kb <= 0:
         resp = await session.get(url)
         return resp.content, resp.headers
 
+    cache = cache if cache is not None else getattr(session, "range_cache", None)
+    host = httpx.URL(url).host or ""
+    if cache is not None and not cache.should_range(host):
+        resp = await session.get(url)
+        return resp.content, resp.headers
+
     head = await session.head(url)
     if head.headers.get("accept-ranges") and head.headers.get("content-length"):
         size = int(head.headers["content-length"])
         if size > kb * 1024:
             headers = {"Range": f"bytes=0-{kb * 1024 - 1}"}
             resp = await session.get(url, headers=headers)
+            if cache is not None:
+                cache.record(host, useful=resp.status_code == 206)
             return resp.content, resp.headers
+        if cache is not None:
+            cache.record(host, useful=False, short=True)
+    elif cache is not None:
+        cache.record(host, useful=False)
     resp = await session.get(url)
     return resp.content, resp.headers
@@ -4,17 +4,36 @@ from __future__ import annotations
 
 from typing import Dict
 
+import httpx
+
+from sqldetector.timing.latency import LatencyRegistry
+
 THRESHOLD_SEC = 5.0
+# a URL is only judged against its host's distribution once this many samples
+# were seen; before that the static threshold applies
+MIN_SAMPLES = 20
 
 
 class HoneypotGuard:
-    def __init__(self) -> None:
+    def __init__(self, factor: float = 3.0) -> None:
+        self.factor = factor
         self.latencies: Dict[str, float] = {}
         self.blacklist: set[str] = set()
+        self.hosts = LatencyRegistry()
+
+    def threshold(self, host: str) -> float:
+        """Latency above which a URL on ``host`` is treated as a tarpit."""
+        stats = self.hosts.get(host)
+        if stats.count < MIN_SAMPLES:
+            return THRESHOLD_SEC
+        return max(THRESHOLD_SEC, stats.p95 * self.factor)
 
     def record(self, url: str, latency: float) -> None:
+        host = httpx.URL(url).host or ""
+        limit = self.threshold(host)
+        self.hosts.record(host, latency)
         self.latencies[url] = latency
-        if latency > THRESHOLD_SEC:
+        if latency > limit:
             self.blacklist.add(url)
 
     def is_blacklisted(self, url: str) -> bool:
@@ -1,17 +1,118 @@
 """Rate limit intelligence helpers."""
-from typing import Dict
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
 
+# reset values above this are absolute epoch seconds (GitHub style) rather
+# than a delta
+_EPOCH_CUTOFF = 1_000_000_000
 
-def learn(headers: Dict[str, str]) -> int:
+
+@dataclass
+class RateLimitPolicy:
+    """Throttling hints carried by a response.
+
+    ``retry_after`` and ``reset`` are delays in seconds from now; ``window`` is
+    the quota period from ``RateLimit-Policy`` (``100;w=60``).
+    """
+
+    retry_after: Optional[float] = None
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset: Optional[float] = None
+    window: Optional[float] = None
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before the host accepts requests again."""
+        if self.retry_after is not None:
+            return self.retry_after
+        if self.remaining == 0 and self.reset is not None:
+            return self.reset
+        return None
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Requests per second the server is willing to sustain."""
+        if self.limit and self.window:
+            return self.limit / self.window
+        if self.remaining and self.reset:
+            return self.remaining / self.reset
+        return None
+
+
+def parse_retry_after(value: str, now: Optional[float] = None) -> Optional[float]:
+    """Parse ``Retry-After`` given as delta-seconds or an HTTP-date."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        # RateLimit-Limit may list several policies: "100, 100;w=60"
+        return float(value.split(",")[0].split(";")[0].strip())
+    except ValueError:
+        return None
+
+
+def _reset(value: Optional[str], now: float) -> Optional[float]:
+    reset = _number(value)
+    if reset is None:
+        return None
+    if reset > _EPOCH_CUTOFF:
+        reset -= now
+    return max(0.0, reset)
+
+
+def parse(headers: Mapping[str, str], now: Optional[float] = None) -> RateLimitPolicy:
+    """Collect ``Retry-After``, ``RateLimit-*`` and ``X-RateLimit-*`` hints."""
+    now = time.time() if now is None else now
+    h = {k.lower(): v for k, v in headers.items()}
+    policy = RateLimitPolicy()
+    if "retry-after" in h:
+        policy.retry_after = parse_retry_after(h["retry-after"], now)
+    # structured form: RateLimit: limit=100, remaining=0, reset=30
+    fields = {}
+    for item in h.get("ratelimit", "").split(","):
+        key, _, val = item.partition("=")
+        if val:
+            fields[key.strip().lower()] = val.strip()
+    for prefix in ("ratelimit-", "x-ratelimit-"):
+        for name in ("limit", "remaining", "reset"):
+            if name not in fields and prefix + name in h:
+                fields[name] = h[prefix + name]
+    limit = _number(fields.get("limit"))
+    remaining = _number(fields.get("remaining"))
+    policy.limit = int(limit) if limit is not None else None
+    policy.remaining = int(remaining) if remaining is not None else None
+    policy.reset = _reset(fields.get("reset"), now)
+    if "ratelimit-policy" in h:
+        quota = _number(h["ratelimit-policy"])
+        if policy.limit is None and quota is not None:
+            policy.limit = int(quota)
+        for part in h["ratelimit-policy"].split(",")[0].split(";")[1:]:
+            key, _, val = part.partition("=")
+            if key.strip() == "w":
+                policy.window = _number(val)
+    return policy
+
+
+def learn(headers: Mapping[str, str]) -> int:
     """Derive a safe requests-per-second window from HTTP headers."""
-    if "Retry-After" in headers:
-        try:
-            return max(1, int(1 / int(headers["Retry-After"])))
-        except Exception:
-            return 1
-    if "X-RateLimit-Limit" in headers:
-        try:
-            return max(1, int(headers["X-RateLimit-Limit"]))
-        except Exception:
-            return 1
+    policy = parse(headers)
+    if policy.rate:
+        return max(1, int(policy.rate))
+    if policy.limit:
+        return max(1, policy.limit)
     return 1
@@ -1,8 +1,14 @@
 """Per-route timing calibration stub."""
 from statistics import median
-from typing import List
+from typing import List, Union
 
-def threshold(samples: List[float]) -> float:
+from sqldetector.timing.latency import LatencyStats
+
+
+def threshold(samples: Union[List[float], LatencyStats]) -> float:
+    if isinstance(samples, LatencyStats):
+        return samples.p50 * 1.5 if samples.count else 0.0
     if not samples:
         return 0.0
     return median(samples) * 1.5
+
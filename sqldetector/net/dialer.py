@@ -3,32 +3,110 @@ from __future__ import annotations
 """Happy Eyeballs v2 dialer used by custom transports."""
 
 import asyncio
+import ipaddress
 import socket
-from typing import Tuple
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# RFC 8305 §5 recommended "Connection Attempt Delay"
+ATTEMPT_DELAY = 0.25
+
+
+def family(addr: str) -> str:
+    try:
+        return "ipv6" if ipaddress.ip_address(addr).version == 6 else "ipv4"
+    except ValueError:
+        return "ipv4"
+
+
+def interleave(addrs: Iterable[str]) -> List[str]:
+    """Order addresses per RFC 8305 §4: IPv6 first, then alternate families."""
+    seen = set()
+    v6: List[str] = []
+    v4: List[str] = []
+    for addr in addrs:
+        if addr in seen:
+            continue
+        seen.add(addr)
+        (v6 if family(addr) == "ipv6" else v4).append(addr)
+    out: List[str] = []
+    for i in range(max(len(v6), len(v4))):
+        out.extend(group[i] for group in (v6, v4) if i < len(group))
+    return out
+
+
+async def race(
+    targets: Iterable[Any],
+    connect: Callable[[Any], Awaitable[T]],
+    *,
+    delay: Optional[float] = ATTEMPT_DELAY,
+    close: Optional[Callable[[T], Awaitable[None]]] = None,
+) -> T:
+    """Staggered connection race (RFC 8305 §5).
+
+    A new attempt starts every ``delay`` seconds (``None``: only once the
+    previous one failed) or as soon as the previous one fails; the first
+    success wins and every other attempt is cancelled (or closed with
+    ``close`` if it connected at the same moment).  When all
+    attempts fail the last error is raised.
+    """
+
+    it = iter(targets)
+    pending: set = set()
+    winner: Optional["asyncio.Future[T]"] = None
+    error: Optional[BaseException] = None
+    try:
+        while winner is None:
+            target = next(it, None)
+            if target is not None:
+                pending.add(asyncio.ensure_future(connect(target)))
+            elif not pending:
+                raise error or OSError("no addresses to connect to")
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=delay if target is not None else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for fut in done:
+                pending.discard(fut)
+                if fut.exception() is not None:
+                    error = fut.exception()
+                elif winner is None:
+                    winner = fut
+                elif close is not None:
+                    await close(fut.result())
+        return winner.result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        if pending:
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            for result in results:
+                if close is not None and not isinstance(result, BaseException):
+                    await close(result)
 
 
 async def _open(host: str, port: int, family: int):
     return await asyncio.open_connection(host, port, family=family)
 
 
+async def _close_streams(streams: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+    streams[1].close()
+
+
 async def create_socket(host: str, port: int) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
     """Race IPv6/IPv4 connection attempts and return the first winner."""
 
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
-    v6 = [info for info in infos if info[0] == socket.AF_INET6]
-    v4 = [info for info in infos if info[0] == socket.AF_INET]
-
-    tasks = []
-    if v6:
-        host6 = v6[0][4][0]
-        tasks.append(asyncio.create_task(_open(host6, port, socket.AF_INET6)))
-    if v4:
-        host4 = v4[0][4][0]
-        tasks.append(asyncio.create_task(_open(host4, port, socket.AF_INET)))
-    if len(tasks) == 2:
-        await asyncio.sleep(0.25)  # stagger
-    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-    for t in pending:
-        t.cancel()
-    return list(done)[0].result()
+    addrs = interleave(info[4][0] for info in infos)
+
+    async def attempt(addr: str):
+        fam = socket.AF_INET6 if family(addr) == "ipv6" else socket.AF_INET
+        return await _open(addr, port, fam)
+
+    return await race(addrs, attempt, close=_close_streams)
+
+
+__all__ = ["ATTEMPT_DELAY", "create_socket", "family", "interleave", "race"]
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-"""Lightweight async DNS resolver with in-memory + on-disk cache."""
+"""Lightweight async DNS resolver with in-memory + on-disk cache.
+
+Entries expire lazily when they are looked up; the table is an LRU bounded by
+``max_size``.  Concurrent lookups of one host share a single query, failed
+lookups are remembered for ``negative_ttl`` seconds and one ``aiodns``
+resolver (when installed) serves every query.  Writes to ``cache/dns.json``
+are deferred: a flush is scheduled ``flush_interval`` seconds after the first
+change and :meth:`aclose` writes whatever is still pending.
+"""
 
 import asyncio
 import json
@@ -9,7 +17,10 @@ import time
 from collections import OrderedDict
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqldetector.core.bulk import sliding_window
+from sqldetector.core.singleflight import SingleFlight
 
 CACHE_PATH = Path("cache/dns.json")
 
@@ -22,78 +33,149 @@ except Exception:  # pragma: no cover
 class DNSCache:
     """Simple TTL-aware LRU cache fronting asyncio DNS calls."""
 
-    def __init__(self, ttl: int = 900, max_size: int = 1024) -> None:
+    def __init__(
+        self,
+        ttl: int = 900,
+        max_size: int = 1024,
+        *,
+        negative_ttl: int = 30,
+        timeout: float = 2.0,
+        flush_interval: float = 5.0,
+        path: Optional[Path] = CACHE_PATH,
+    ) -> None:
         self.ttl = ttl
         self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.flush_interval = flush_interval
+        self.path = path
+        # host -> (expires_at, addresses); an empty list is a negative entry
         self.cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._resolver: Any = None
+        self._flush: Optional["asyncio.Task[None]"] = None
+        self._dirty = False
         self._load()
 
     # --------------------------------------------------------------
     def _load(self) -> None:
+        if self.path is None:
+            return
         try:
-            with open(CACHE_PATH, "r", encoding="utf8") as f:
+            with open(self.path, "r", encoding="utf8") as f:
                 data = json.load(f)
             now = time.time()
             for host, (ts, addrs) in data.items():
-                if now - ts < self.ttl:
-                    self.cache[host] = (ts, addrs)
+                if addrs and now - ts < self.ttl:
+                    self.cache[host] = (ts + self.ttl, addrs)
         except Exception:
             pass
 
-    def _save(self) -> None:
+    def _snapshot(self) -> Dict[str, Tuple[int, List[str]]]:
+        # persisted as {host: [resolved_at, addrs]}; negatives are not kept
+        return {
+            host: (int(expires - self.ttl), addrs)
+            for host, (expires, addrs) in self.cache.items()
+            if addrs
+        }
+
+    def _write(self, data: Dict[str, Tuple[int, List[str]]]) -> None:
+        assert self.path is not None
         try:
-            CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-            with open(CACHE_PATH, "w", encoding="utf8") as f:
-                json.dump(self.cache, f)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            tmp.replace(self.path)
         except Exception:
             pass
 
+    async def flush(self) -> None:
+        """Persist the cache now if it changed."""
+        if self.path is None or not self._dirty:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self._write, self._snapshot())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush = None
+        await self.flush()
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self.path is not None and self._flush is None:
+            self._flush = asyncio.ensure_future(self._flush_later())
+
+    async def aclose(self) -> None:
+        """Cancel the pending flush and write outstanding changes."""
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        await self.flush()
+
     # --------------------------------------------------------------
-    async def resolve(self, host: str) -> List[str]:
-        now = time.time()
-        for h, (ts, _) in list(self.cache.items()):
-            if now - ts >= self.ttl:
-                self.cache.pop(h, None)
-        if host in self.cache and now - self.cache[host][0] < self.ttl:
-            ts, cached = self.cache.pop(host)
-            self.cache[host] = (ts, cached)
-            return list(cached)
+    def _get(self, host: str) -> Optional[List[str]]:
+        entry = self.cache.get(host)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self.cache[host]
+            return None
+        self.cache.move_to_end(host)
+        return entry[1]
+
+    def _put(self, host: str, addrs: List[str]) -> None:
+        ttl = self.ttl if addrs else self.negative_ttl
+        self.cache[host] = (time.time() + ttl, addrs)
+        self.cache.move_to_end(host)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        if addrs:
+            self._mark_dirty()
+
+    async def _query_aiodns(self, host: str) -> List[str]:
+        if self._resolver is None:
+            self._resolver = aiodns.DNSResolver(timeout=self.timeout, tries=1)
+        addrs: List[str] = []
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(self._resolver.query(host, qtype), self.timeout)
+                for qtype in ("AAAA", "A")
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if not isinstance(result, BaseException):
+                addrs.extend(r.host for r in result)
+        return addrs
 
+    async def _lookup(self, host: str) -> List[str]:
         addrs: List[str] = []
         if aiodns is not None:
-            resolver = aiodns.DNSResolver()
-            try:
-                result = await resolver.query(host, "A")
-                addrs = [r.host for r in result]
-            except Exception:
-                pass
+            addrs = await self._query_aiodns(host)
         if not addrs:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             try:
-                infos = await loop.getaddrinfo(host, None)
-                addrs = [info[4][0] for info in infos]
-            except socket.gaierror:
+                infos = await asyncio.wait_for(
+                    loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout
+                )
+                addrs = list(dict.fromkeys(info[4][0] for info in infos))
+            except (socket.gaierror, asyncio.TimeoutError, OSError):
                 addrs = []
-        self.cache[host] = (now, addrs)
-        self.cache.move_to_end(host)
-        if len(self.cache) > self.max_size:
-            self.cache.popitem(last=False)
-        self._save()
+        self._put(host, addrs)
         return addrs
 
+    async def resolve(self, host: str) -> List[str]:
+        cached = self._get(host)
+        if cached is not None:
+            return list(cached)
+        return list(await self._flight.do(host, lambda: self._lookup(host)))
+
     async def warmup(self, hosts: Iterable[str], batch: int = 8) -> None:
-        """Pre-resolve a batch of hosts concurrently."""
-        it = iter(hosts)
-        while True:
-            chunk = list()
-            try:
-                for _ in range(batch):
-                    chunk.append(next(it))
-            except StopIteration:
-                pass
-            if not chunk:
-                break
-            await asyncio.gather(*(self.resolve(h) for h in chunk))
+        """Pre-resolve hosts keeping at most ``batch`` lookups in flight."""
+        async for _ in sliding_window(hosts, self.resolve, window=batch):
+            pass
 
     # synchronous fallback for libraries expecting getaddrinfo
     @lru_cache(maxsize=256)
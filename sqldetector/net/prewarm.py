@@ -1,13 +1,25 @@
-from __future__ import annotations
-
 """Connection pre-warmer for HTTP/2 clients."""
 
+from __future__ import annotations
+
 import asyncio
-from typing import Iterable
+from typing import Any, Iterable, Optional, Set
 
 import httpx
 
 
+def _origin(url: str) -> Optional[str]:
+    if not url.startswith("http"):
+        url = f"https://{url}"
+    try:
+        u = httpx.URL(url)
+    except Exception:
+        return None
+    if not u.host:
+        return None
+    return str(u.copy_with(path="/", query=None, fragment=None))
+
+
 async def prewarm_connections(hosts: Iterable[str], client: httpx.AsyncClient) -> None:
     """Open idle connections to ``hosts`` using the provided client.
 
@@ -17,6 +29,69 @@ async def prewarm_connections(hosts: Iterable[str], client: httpx.AsyncClient) -
 
     tasks = []
     for host in hosts:
-        url = host if host.startswith("http") else f"https://{host}"
-        tasks.append(client.get(url, timeout=1.0))
+        origin = _origin(host)
+        if origin:
+            tasks.append(client.head(origin, timeout=1.0))
     await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class Prewarmer:
+    """Warm pooled connections to each new origin in the background.
+
+    ``client`` is the raw :class:`httpx.AsyncClient` underneath an
+    :class:`~sqldetector.core.http_async.HttpClient` (its ``_client``): warm-ups
+    share its connection pool but bypass rate limiting, retries, breakers and
+    latency statistics, so they never delay or skew real requests.  Any client
+    with an async ``head(url, timeout=...)`` works, e.g. the legacy CLI's
+    :class:`~sqldetector.net.scraper_pool.ScraperPool`.  Each
+    origin receives a ``HEAD /``; on HTTP/1.1 up to ``per_host`` of them are
+    sent concurrently so that many connections sit idle in the pool, while a
+    single multiplexed HTTP/2 session needs just one.  ``per_host`` should not
+    exceed the pool's ``max_keepalive_connections`` or the extra connections
+    are simply closed.
+    """
+
+    def __init__(self, client: Any, per_host: int = 1, timeout: float = 2.0) -> None:
+        self.client = client
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.origins: Set[str] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    def add(self, url: str) -> None:
+        """Schedule warming for ``url``'s origin unless already done."""
+        origin = _origin(url)
+        if origin is None or origin in self.origins:
+            return
+        self.origins.add(origin)
+        task = asyncio.ensure_future(self._warm(origin))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _head(self, origin: str) -> Optional[Any]:
+        try:
+            return await self.client.head(origin, timeout=self.timeout)
+        except Exception:  # best effort: any client's transport errors
+            return None
+
+    async def _warm(self, origin: str) -> None:
+        first = await self._head(origin)
+        version = getattr(first, "http_version", None)
+        if first is None or version == "HTTP/2" or self.per_host == 1:
+            return
+        # HTTP/1.1: a burst of concurrent HEADs leaves one idle connection each
+        await asyncio.gather(*(self._head(origin) for _ in range(self.per_host)))
+
+    async def wait(self) -> None:
+        """Wait for scheduled warm-ups to finish."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def aclose(self) -> None:
+        """Cancel warm-ups still in flight."""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.wait()
+
+
+__all__ = ["Prewarmer", "prewarm_connections"]
@@ -0,0 +1,140 @@
+"""Per-host pool of blocking HTTP sessions driven from asyncio.
+
+``cloudscraper`` (and ``requests`` underneath it) is synchronous.  Calling it
+from a coroutine freezes the event loop for the whole request, so
+``asyncio.gather`` over such calls runs them one after another.  The pool runs
+every call on a bounded thread pool instead and keeps up to ``per_host``
+sessions per host.  A session is checked out by one request at a time, so
+challenge cookies and keep-alive connections are reused without sharing a
+``requests.Session`` between threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def _default_factory() -> Any:
+    import cloudscraper
+
+    return cloudscraper.create_scraper()
+
+
+@dataclass
+class _HostSlot:
+    sem: asyncio.Semaphore
+    idle: List[Any] = field(default_factory=list)
+    created: int = 0
+
+
+class ScraperPool:
+    """Run ``session.request`` calls off the event loop, ``per_host`` at a time.
+
+    ``factory`` builds a new session (default: ``cloudscraper.create_scraper``)
+    and runs on a worker thread as well, since solving the first challenge can
+    be slow.  ``max_workers`` bounds the number of requests in flight across
+    all hosts.
+    """
+
+    def __init__(
+        self,
+        per_host: int = 8,
+        max_workers: int = 32,
+        factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.per_host = max(1, per_host)
+        self.max_workers = max(1, max_workers)
+        self.factory = factory or _default_factory
+        self._slots: Dict[str, _HostSlot] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _slot(self, host: str) -> _HostSlot:
+        slot = self._slots.get(host)
+        if slot is None:
+            slot = self._slots[host] = _HostSlot(asyncio.Semaphore(self.per_host))
+        return slot
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="scraper"
+            )
+        return self._executor
+
+    def _call(
+        self, session: Any, method: str, url: str, kwargs: Dict[str, Any]
+    ) -> Tuple[Any, Any]:
+        # runs on a worker thread; the session travels back with the result so
+        # it can be returned to the pool even when the request failed
+        if session is None:
+            session = self.factory()
+        try:
+            return session, session.request(method, url, **kwargs)
+        except Exception as exc:
+            return session, exc
+
+    def _release(self, slot: _HostSlot, fut: "asyncio.Future[Tuple[Any, Any]]") -> None:
+        if not fut.cancelled() and fut.exception() is None:
+            slot.idle.append(fut.result()[0])
+        else:
+            slot.created -= 1
+        slot.sem.release()
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Perform ``session.request(method, url, **kwargs)`` on a worker thread."""
+        slot = self._slot(urlsplit(url).netloc.lower())
+        await slot.sem.acquire()
+        try:
+            session = slot.idle.pop() if slot.idle else None
+            if session is None:
+                slot.created += 1
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(
+                self._pool(), self._call, session, method, url, kwargs
+            )
+        except BaseException:
+            slot.sem.release()
+            raise
+        # the slot is released once the thread is done, even if we are cancelled
+        fut.add_done_callback(lambda f: self._release(slot, f))
+        _, result = await asyncio.shield(fut)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def get(self, url: str, **kwargs: Any) -> Any:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> Any:
+        return await self.request("POST", url, **kwargs)
+
+    async def head(self, url: str, **kwargs: Any) -> Any:
+        return await self.request("HEAD", url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            host: {"sessions": slot.created, "idle": len(slot.idle)}
+            for host, slot in self._slots.items()
+        }
+
+    def close(self) -> None:
+        """Shut the worker threads down and close idle sessions."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for slot in self._slots.values():
+            for session in slot.idle:
+                try:
+                    session.close()
+                except Exception:
+                    pass
+            slot.idle.clear()
+            slot.created = 0
+        self._slots.clear()
+
+
+__all__ = ["ScraperPool"]
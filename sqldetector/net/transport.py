@@ -0,0 +1,134 @@
+"""httpx transport that dials through :class:`DNSCache` and Happy Eyeballs.
+
+Only the TCP connect step is replaced: httpcore still performs TLS with the
+origin host name (SNI) and requests keep their original ``Host`` header, so
+connecting to a cached IP address is invisible to the server.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpcore
+import httpx
+
+from sqldetector.net.dialer import ATTEMPT_DELAY, family, interleave, race
+from sqldetector.net.dns_cache import DNSCache
+from sqldetector.timing.latency import LatencyRegistry
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class ResolvingBackend(httpcore.AsyncNetworkBackend):
+    """Network backend connecting to addresses from a :class:`DNSCache`."""
+
+    def __init__(
+        self,
+        dns: DNSCache,
+        happy_eyeballs: bool = True,
+        delay: float = ATTEMPT_DELAY,
+        backend: Optional[httpcore.AsyncNetworkBackend] = None,
+    ) -> None:
+        self.dns = dns
+        self.happy_eyeballs = happy_eyeballs
+        self.delay = delay
+        self._backend = backend or httpcore.AnyIOBackend()
+        self.connect_times = LatencyRegistry()
+        self.failures: Dict[str, int] = defaultdict(int)
+
+    async def _addresses(self, host: str) -> List[str]:
+        if _is_ip(host):
+            return [host]
+        addrs = await self.dns.resolve(host)
+        if self.happy_eyeballs:
+            return interleave(addrs)
+        return list(dict.fromkeys(addrs))
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:
+        addrs = await self._addresses(host)
+        if not addrs:
+            return await self._backend.connect_tcp(
+                host, port, timeout, local_address, socket_options
+            )
+
+        async def attempt(addr: str) -> httpcore.AsyncNetworkStream:
+            fam = family(addr)
+            start = time.monotonic()
+            try:
+                stream = await self._backend.connect_tcp(
+                    addr, port, timeout, local_address, socket_options
+                )
+            except Exception:
+                self.failures[fam] += 1
+                raise
+            self.connect_times.record(fam, time.monotonic() - start)
+            return stream
+
+        async def close(stream: httpcore.AsyncNetworkStream) -> None:
+            await stream.aclose()
+
+        # without Happy Eyeballs an attempt only starts once the previous failed
+        delay = self.delay if self.happy_eyeballs else None
+        return await race(addrs, attempt, delay=delay, close=close)
+
+    async def connect_unix_socket(
+        self,
+        path: str,
+        timeout: Optional[float] = None,
+        socket_options: Optional[Iterable[Any]] = None,
+    ) -> httpcore.AsyncNetworkStream:  # pragma: no cover - not used for scans
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Connect latency and failure counts per address family."""
+        snap = self.connect_times.snapshot()
+        for fam, count in self.failures.items():
+            snap.setdefault(fam, {})["failures"] = count
+        return snap
+
+
+class ResolvingTransport(httpx.AsyncHTTPTransport):
+    """:class:`httpx.AsyncHTTPTransport` whose pool dials via :class:`ResolvingBackend`."""
+
+    def __init__(
+        self,
+        dns: DNSCache,
+        *,
+        happy_eyeballs: bool = True,
+        verify: Any = True,
+        http2: bool = False,
+        limits: httpx.Limits = httpx.Limits(),
+    ) -> None:
+        # the base initialiser only builds ``_pool``; build it once, here
+        self.backend = ResolvingBackend(dns, happy_eyeballs)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=self.backend,
+        )
+
+
+__all__ = ["ResolvingBackend", "ResolvingTransport"]
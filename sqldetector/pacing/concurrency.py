@@ -0,0 +1,115 @@
+"""Gradient-based adaptive concurrency limit.
+
+The controller follows the "gradient" family of TCP-Vegas style limiters: the
+ratio between the no-load RTT (minimum over a recent window) and the latest
+sample tells whether requests are queueing at the origin.  While the ratio
+stays within ``tolerance`` the limit grows by roughly ``sqrt(limit)``; once
+latency inflates the limit is scaled down by the gradient.  Explicit overload
+signals (429/503/timeouts) cut the limit multiplicatively.
+
+Unlike a resized :class:`asyncio.Semaphore` the limit is checked every time a
+slot is handed out, so releases of requests started under a higher limit can
+never push capacity back up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+class GradientLimiter:
+    """Per-host concurrency limit with a FIFO waiter queue."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        *,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial)
+        self.limit = float(max(self.min_limit, min(self.max_limit, initial)))
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.inflight = 0
+        self.drops = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    # --------------------------------------------------------------
+    @property
+    def capacity(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.inflight < self.capacity and not self._waiters:
+            self.inflight += 1
+            return
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # slot was granted right before cancellation: hand it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:  # pragma: no cover - already popped
+                    pass
+            raise
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < self.capacity:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    def _set(self, value: float) -> None:
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), value))
+        self._wake()
+
+    # --------------------------------------------------------------
+    def on_sample(self, rtt: float, min_rtt: float) -> None:
+        """Update the limit from a successful request's latency."""
+        if rtt <= 0 or min_rtt <= 0:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * min_rtt / rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        if target > self.limit and self.inflight * 2 < self.limit:
+            # not saturated: growing would only inflate an unused limit
+            return
+        self._set(self.limit * (1 - self.smoothing) + target * self.smoothing)
+
+    def on_drop(self) -> None:
+        """React to an overload signal such as 429, 503 or a timeout."""
+        self.drops += 1
+        self._set(self.limit * self.backoff)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "drops": self.drops,
+        }
+
+
+__all__ = ["GradientLimiter"]
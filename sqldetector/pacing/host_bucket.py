@@ -0,0 +1,331 @@
+"""Per-host token buckets with FIFO slot reservations."""
+
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import hashlib
+import multiprocessing
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+
+class TokenBucket:
+    """Token bucket handing out tokens in arrival order.
+
+    Rather than letting every waiter poll the bucket, :meth:`acquire` reserves
+    the next free slot and sleeps exactly until it is due.  The bucket may go
+    into debt (negative tokens) which forms an implicit waiter queue: later
+    callers line up behind earlier ones and nobody wakes up just to sleep
+    again.  A rate of ``0`` disables limiting.
+
+    :meth:`pause` closes the bucket until a point in time (e.g. from a
+    ``Retry-After`` header); reservations made meanwhile are scheduled after
+    the pause in the same FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+
+    def _refill(self, now: float) -> None:
+        if now > self._last:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+    def reserve(self) -> float:
+        """Take one token and return the delay before it may be spent."""
+        now = time.monotonic()
+        paused = max(0.0, self.paused_until - now)
+        if self.rate <= 0:
+            return paused
+        self._refill(now)
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return paused
+        # tokens accrue again from ``_last`` which a pause moves forward
+        return max(0.0, self._last - now) + -self._tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next ``seconds``."""
+        now = time.monotonic()
+        until = now + seconds
+        if until <= self.paused_until:
+            return
+        self._refill(now)
+        self.paused_until = until
+        if self.rate > 0:
+            self._tokens = min(self._tokens, 1.0)
+            self._last = max(self._last, until)
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None) -> None:
+        """Change the refill rate, keeping tokens accrued so far.
+
+        The burst shrinks with a lower rate unless ``capacity`` is given.
+        """
+        self._refill(time.monotonic())
+        self.rate = float(rate)
+        if capacity:
+            self.capacity = float(capacity)
+        else:
+            self.capacity = min(self.capacity, max(1.0, self.rate))
+        self._tokens = min(self._tokens, self.capacity)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay <= 0:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # give the slot back so the queue behind us is not delayed
+            self._refund()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _refund(self) -> None:
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+
+class HostRateLimiter:
+    """Lazily created :class:`TokenBucket` per host.
+
+    ``overrides`` maps host names or glob patterns (``*.example.com``) to a
+    requests-per-second rate.  Buckets of unrelated hosts never interact so the
+    aggregate throughput of a multi-host scan is the sum of per-host limits.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        overrides: Optional[Mapping[str, float]] = None,
+    ) -> None:
+        self.rate = float(rate)
+        self.burst = burst
+        self.overrides = dict(overrides or {})
+        self._buckets: Dict[str, TokenBucket] = {}
+        # host -> monotonic time at which a learned rate gives way again
+        self._learned_until: Dict[str, float] = {}
+
+    def _rate_for(self, host: str) -> float:
+        if host in self.overrides:
+            return float(self.overrides[host])
+        for pattern, rate in self.overrides.items():
+            if fnmatch.fnmatch(host, pattern):
+                return float(rate)
+        return self.rate
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self._rate_for(host), self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def acquire(self, host: str) -> None:
+        bucket = self.bucket(host)
+        until = self._learned_until.get(host)
+        if until is not None and time.monotonic() >= until:
+            del self._learned_until[host]
+            rate = self._rate_for(host)
+            bucket.set_rate(rate, self.burst or max(1.0, rate))
+        await bucket.acquire()
+
+    def pause(self, host: str, seconds: float) -> None:
+        """Stop handing out tokens for ``host`` only."""
+        self.bucket(host).pause(seconds)
+
+    def learn(self, host: str, rate: float, expires: Optional[float] = None) -> None:
+        """Adopt a server-advertised rate, never above the configured one.
+
+        A later hint may raise the rate again up to the configured limit; with
+        ``expires`` (seconds, e.g. until the quota window resets) the configured
+        rate is restored after that time.
+        """
+        if rate <= 0:
+            return
+        configured = self._rate_for(host)
+        if configured > 0:
+            rate = min(rate, configured)
+        self.bucket(host).set_rate(rate)
+        if expires is not None and rate != configured:
+            self._learned_until[host] = time.monotonic() + expires
+        else:
+            self._learned_until.pop(host, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return current rate, available tokens, waiters and pause per host."""
+        now = time.monotonic()
+        return {
+            host: {
+                "rate": b.rate,
+                "tokens": round(b.tokens, 3),
+                "waiting": b.waiting,
+                "paused": round(max(0.0, b.paused_until - now), 3),
+            }
+            for host, b in self._buckets.items()
+        }
+
+
+def _shared_field(index: int) -> property:
+    def get(self: "SharedTokenBucket") -> float:
+        return self._state[index]
+
+    def set(self: "SharedTokenBucket", value: float) -> None:
+        self._state[index] = value
+
+    return property(get, set)
+
+
+class SharedTokenBucket(TokenBucket):
+    """:class:`TokenBucket` whose state lives in shared memory.
+
+    Created by a parent process and handed to worker processes at spawn time,
+    every copy reserves slots from the same budget.  ``time.monotonic`` is
+    system-wide so timestamps are comparable across processes.
+    """
+
+    rate = _shared_field(0)
+    capacity = _shared_field(1)
+    _tokens = _shared_field(2)
+    _last = _shared_field(3)
+    paused_until = _shared_field(4)
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, ctx: Any = None) -> None:
+        self._state = (ctx or multiprocessing.get_context()).Array("d", 5)
+        super().__init__(rate, capacity)
+
+    def reserve(self) -> float:
+        with self._state.get_lock():
+            return super().reserve()
+
+    def pause(self, seconds: float) -> None:
+        with self._state.get_lock():
+            super().pause(seconds)
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None) -> None:
+        with self._state.get_lock():
+            super().set_rate(rate, capacity)
+
+    def _refund(self) -> None:
+        with self._state.get_lock():
+            super()._refund()
+
+
+def _host_key(host: str) -> int:
+    """Non-zero 63-bit key of ``host``, equal in every process."""
+    digest = hashlib.blake2b(host.encode("utf8"), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") >> 1) or 1
+
+
+class SharedRateLimiter(HostRateLimiter):
+    """:class:`HostRateLimiter` whose buckets live in shared memory.
+
+    Used by the sharded scan mode where several worker processes scan the
+    same hosts and must stay within each host's budget together.  Shared
+    memory cannot be created after the workers are spawned, so the parent
+    creates one :class:`SharedTokenBucket` per host in ``hosts``, one per
+    ``overrides`` pattern (shared by every host matching it) and ``spare``
+    unassigned buckets.  A host first seen in a worker claims a spare bucket
+    through a shared open-addressing table, so every process maps it to the
+    same bucket; a host of a pattern moves to a bucket of its own once it is
+    throttled (:meth:`learn`, :meth:`pause`) so the others are not slowed
+    down.  Only when the spares run out do hosts fall back to one shared
+    default bucket, whose rate is never lowered by a learned hint.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        overrides: Optional[Mapping[str, float]] = None,
+        hosts: Iterable[str] = (),
+        ctx: Any = None,
+        spare: int = 64,
+    ) -> None:
+        super().__init__(rate, burst, overrides)
+        ctx = ctx or multiprocessing.get_context()
+        for host in hosts:
+            if host not in self._buckets:
+                self._buckets[host] = SharedTokenBucket(self._rate_for(host), burst, ctx)
+        self._patterns: Dict[str, TokenBucket] = {
+            pattern: SharedTokenBucket(float(limit), burst, ctx)
+            for pattern, limit in self.overrides.items()
+            if pattern not in self._buckets
+        }
+        self._default = SharedTokenBucket(self.rate, burst, ctx)
+        self._spares = [SharedTokenBucket(self.rate, burst, ctx) for _ in range(spare)]
+        # slot i of the table holds the key of the host owning spare i (0: free)
+        self._owners = ctx.Array("q", max(1, spare))
+
+    def _spare(self, host: str, claim: bool) -> Optional[TokenBucket]:
+        """The spare bucket owned by ``host``, claiming a free one if asked."""
+        if not self._spares:
+            return None
+        key = _host_key(host)
+        size = len(self._spares)
+        with self._owners.get_lock():
+            for i in range(size):
+                slot = (key + i) % size
+                owner = self._owners[slot]
+                if owner == key:
+                    bucket = self._spares[slot]
+                    break
+                if owner == 0:
+                    if not claim:
+                        return None
+                    self._owners[slot] = key
+                    bucket = self._spares[slot]
+                    rate = self._rate_for(host)
+                    bucket.set_rate(rate, self.burst or max(1.0, rate))
+                    break
+            else:
+                return None
+        self._buckets[host] = bucket
+        return bucket
+
+    def _pattern(self, host: str) -> Optional[TokenBucket]:
+        for pattern, shared in self._patterns.items():
+            if host == pattern or fnmatch.fnmatch(host, pattern):
+                return shared
+        return None
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is not None:
+            return bucket
+        pattern = self._pattern(host)
+        if pattern is not None:
+            # a throttled pattern host may own a spare claimed by another process
+            return self._spare(host, claim=False) or pattern
+        return self._spare(host, claim=True) or self._default
+
+    def _own(self, host: str) -> None:
+        if host not in self._buckets:
+            self._spare(host, claim=True)
+
+    def learn(self, host: str, rate: float, expires: Optional[float] = None) -> None:
+        self._own(host)
+        if host not in self._buckets:
+            # out of spares: a shared bucket keeps the configured rate
+            return
+        super().learn(host, rate, expires)
+
+    def pause(self, host: str, seconds: float) -> None:
+        self._own(host)
+        super().pause(host, seconds)
+
+
+__all__ = ["TokenBucket", "HostRateLimiter", "SharedTokenBucket", "SharedRateLimiter"]
@@ -0,0 +1,164 @@
+"""Lazy, de-duplicated request variants per parameter.
+
+Expanding every payload through every encoding (and every encoding through
+every mutation) multiplies into tens of thousands of requests per parameter,
+most of which put identical bytes on the wire.  :class:`VariantGenerator`
+instead walks the ``payload x transform-chain`` grid best-first by expected
+value -- payloads decay with their rank, chains carry a prior weight -- and
+yields variants one at a time.  A value is only emitted if its URL-encoded
+wire form has not been sent for that parameter yet, and each parameter stops
+after ``budget`` unique values.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from itertools import permutations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, quote_plus, urlencode, urlparse, urlunparse
+
+
+@dataclass(frozen=True)
+class Transform:
+    name: str
+    fn: Callable[[str], str]
+    weight: float
+
+
+def _case(p: str) -> str:
+    return p.replace("OR", "oR").replace("AND", "aNd").replace("SELECT", "SeLeCt")
+
+
+_FULLWIDTH = str.maketrans({"'": "\uff07", '"': "\uff02", " ": "\u00a0"})
+
+# priors: how likely a transform is to matter, relative to the raw payload
+TRANSFORMS: Tuple[Transform, ...] = (
+    Transform("comment_space", lambda p: p.replace(" ", "/**/"), 0.7),
+    Transform("url", lambda p: p.replace("'", "%27").replace('"', "%22"), 0.6),
+    Transform("case", _case, 0.5),
+    Transform("comment_or", lambda p: p.replace("OR", "O/**/R").replace("or", "o/**/r"), 0.5),
+    Transform("double_url", lambda p: p.replace("'", "%2527").replace('"', "%2522"), 0.5),
+    Transform("plus_space", lambda p: p.replace(" ", "+"), 0.4),
+    Transform("html_entity", lambda p: p.replace("'", "&#39;").replace('"', "&#34;"), 0.3),
+    Transform("nbsp", lambda p: p.replace(" ", "\u00a0"), 0.3),
+    Transform("eq_encoded", lambda p: p.replace("1=1", "1%3D1"), 0.3),
+    Transform("fullwidth", lambda p: p.translate(_FULLWIDTH), 0.3),
+    Transform("em_space", lambda p: p.replace(" ", "\u2003"), 0.2),
+    Transform("hex", lambda p: "".join(f"%{ord(c):02x}" for c in p), 0.2),
+    Transform("zwsp", lambda p: "\u200b".join(p), 0.1),
+    Transform("zwnj", lambda p: "\u200c".join(p), 0.05),
+)
+
+
+def wire_form(value: str) -> str:
+    """The value as it appears URL-encoded in a query string or form body."""
+    return quote_plus(value, safe=":/@")
+
+
+Chain = Tuple[float, Tuple[Transform, ...]]
+
+
+def _chains(transforms: Sequence[Transform], depth: int) -> List[Chain]:
+    chains: List[Chain] = [(1.0, ())]
+    for n in range(1, depth + 1):
+        for combo in permutations(transforms, n):
+            weight = 1.0
+            for t in combo:
+                weight *= t.weight
+            chains.append((weight, combo))
+    chains.sort(key=lambda c: -c[0])
+    return chains
+
+
+class VariantGenerator:
+    """Yield unique payload encodings per parameter, most promising first.
+
+    ``budget`` caps the number of unique values per parameter (each is sent
+    once per entry of ``headersets``); ``depth`` is the longest transform
+    chain; ``decay`` is the weight ratio between consecutive payloads, so the
+    caller's payload order expresses its expected value.  ``max_attempts``
+    bounds the grid walk when most candidates turn out to be duplicates.
+    """
+
+    def __init__(
+        self,
+        transforms: Sequence[Transform] = TRANSFORMS,
+        *,
+        budget: int = 120,
+        depth: int = 2,
+        decay: float = 0.9,
+        headersets: Sequence[Optional[Dict[str, str]]] = (None,),
+        max_attempts: Optional[int] = None,
+    ) -> None:
+        self.chains = _chains(transforms, depth)
+        self.budget = budget
+        self.decay = decay
+        self.headersets = list(headersets) or [None]
+        self.max_attempts = max_attempts or budget * 8
+        self.generated = 0
+        self.duplicates = 0
+
+    def values(self, payloads: Sequence[str], prefix: str = "") -> Iterator[Tuple[str, str]]:
+        """Yield ``(value, label)`` with ``value = prefix + chain(payload)``."""
+        payloads = list(dict.fromkeys(payloads))
+        if not payloads:
+            return
+        chains = self.chains
+        seen: Set[str] = set()
+        visited: Set[Tuple[int, int]] = {(0, 0)}
+        heap: List[Tuple[float, int, int]] = [(-chains[0][0], 0, 0)]
+        emitted = attempts = 0
+        while heap and emitted < self.budget and attempts < self.max_attempts:
+            _, i, j = heapq.heappop(heap)
+            # the grid is sorted on both axes, so successors never score higher
+            for ni, nj in ((i + 1, j), (i, j + 1)):
+                if ni < len(payloads) and nj < len(chains) and (ni, nj) not in visited:
+                    visited.add((ni, nj))
+                    heapq.heappush(heap, (-(self.decay ** ni) * chains[nj][0], ni, nj))
+            attempts += 1
+            value = payloads[i]
+            for t in chains[j][1]:
+                value = t.fn(value)
+            value = prefix + value
+            key = wire_form(value)
+            if key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(key)
+            emitted += 1
+            self.generated += 1
+            yield value, "+".join(t.name for t in chains[j][1]) or "raw"
+
+    def for_query(
+        self, url: str, param: str, payloads: Sequence[str]
+    ) -> Iterator[Tuple[str, str, str, Dict[str, Any], Optional[Dict[str, str]]]]:
+        """GET variants of ``url`` with ``param`` carrying each value."""
+        parsed = urlparse(url)
+        qs = parse_qs(parsed.query, keep_blank_values=True)
+        original = qs.get(param, [""])[0]
+        for value, _ in self.values(payloads, original):
+            qsm = dict(qs)
+            qsm[param] = [value]
+            query = urlencode(qsm, doseq=True, safe=":/@")
+            target = urlunparse(parsed._replace(query=query))
+            for headers in self.headersets:
+                yield ("GET", target, param, {}, headers)
+
+    def for_form(
+        self, form: Dict[str, Any], param: str, payloads: Sequence[str]
+    ) -> Iterator[Tuple[str, str, str, Dict[str, Any], Optional[Dict[str, str]]]]:
+        """POST variants of ``form`` with ``param`` carrying each value."""
+        base = dict(form.get("inputs") or {})
+        original = str(base.get(param, ""))
+        for value, _ in self.values(payloads, original):
+            data = dict(base)
+            data[param] = value
+            for headers in self.headersets:
+                yield ("POST", form["action"], param, data, headers)
+
+    def stats(self) -> Dict[str, int]:
+        return {"generated": self.generated, "duplicates": self.duplicates}
+
+
+__all__ = ["TRANSFORMS", "Transform", "VariantGenerator", "wire_form"]
@@ -55,34 +55,46 @@ def run(
             getattr(settings, "trace_compress", None),
         )
         trace.append_jsonl({"event": "pipeline_start", "url": url})
-        async with HttpClient(settings) as client:
-            from sqldetector.net.dns_cache import DNSCache
+        from sqldetector.net.dns_cache import DNSCache
 
-            host = httpx.URL(url).host or ""
-            dns = DNSCache(settings.dns_cache_ttl_sec)
-            await dns.warmup([host], settings.dns_warmup_batch)
-            if settings.prewarm_connections:
+        host = httpx.URL(url).host or ""
+        dns = DNSCache(settings.dns_cache_ttl_sec)
+        await dns.warmup([host], settings.dns_warmup_batch)
+        try:
+            async with HttpClient(settings, dns=dns) as client:
+                warm = None
+                if settings.prewarm_connections:
+                    from sqldetector.net.prewarm import Prewarmer
+
+                    # raw transport: no rate-limit tokens, retries or stats;
+                    # the seed's connections are open before the first request
+                    warm = Prewarmer(
+                        client._client,
+                        min(settings.concurrency, settings.max_keepalive_connections),
+                    )
+                    warm.add(url)
+                    await warm.wait()
                 try:
-                    await client.get(str(httpx.URL(url).copy_with(path="/robots.txt")), timeout=1.0)
-                except Exception:
-                    pass
-            try:
-                resp = await client.get(url)
-                status = resp.status_code
-            except WAFBlocked:
-                if progress:
-                    progress(50.0)
-                narrator.note("WAF engeli aşılıyor")
-                import cloudscraper
+                    resp = await client.get(url)
+                    status = resp.status_code
+                except WAFBlocked:
+                    if progress:
+                        progress(50.0)
+                    narrator.note("WAF engeli aşılıyor")
+                    import cloudscraper
 
-                scraper = cloudscraper.create_scraper()
-                resp = await asyncio.to_thread(scraper.get, url)
-                status = resp.status_code
-            if progress:
-                progress(100.0)
-            trace.append_jsonl({"event": "request", "status": status})
-            await trace.aclose()
-            return [{"status": status}]
+                    scraper = cloudscraper.create_scraper()
+                    resp = await asyncio.to_thread(scraper.get, url)
+                    status = resp.status_code
+                if warm is not None:
+                    await warm.aclose()
+                if progress:
+                    progress(100.0)
+                trace.append_jsonl({"event": "request", "status": status})
+                await trace.aclose()
+                return [{"status": status}]
+        finally:
+            await dns.aclose()
 
     result = asyncio.run(_run())
     narrator.ok("Tamamlandı")
@@ -0,0 +1,184 @@
+"""Multi-process sharded scan runner.
+
+The parent process splits a scan into shards -- one endpoint × parameter unit
+of its injection and analysis work each -- and feeds them through a queue to
+``workers`` processes.  Each worker runs its own event loop and hands the
+shard stream to ``worker``, the scan's own per-shard code, which reports
+findings and finished shards back as it goes.  Parsing, feature extraction
+and diffing of the responses therefore happen in the workers, one core each.
+All workers draw request slots from the per-host buckets of one
+:class:`SharedRateLimiter` owned by the parent, so adding processes adds CPU
+without raising any host's request rate.
+
+``worker`` must be importable by the spawned processes (a module-level
+coroutine function)::
+
+    async def worker(shards, limiter, report, *args):
+        async for shard in shards:
+            ...
+            report("finding", finding)
+            report("done", shard)
+
+Every shard must be reported ``"done"`` exactly once, whether it produced
+findings, was dropped or failed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import queue
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from sqldetector.pacing.host_bucket import SharedRateLimiter
+
+Shard = Tuple[str, str]
+Report = Callable[[str, Any], None]
+
+# spawned workers start from a clean interpreter on every platform
+CONTEXT = multiprocessing.get_context("spawn")
+
+
+def shards_for(urls: Iterable[str]) -> List[Shard]:
+    """Return one ``(url, parameter)`` shard per query parameter."""
+    out: List[Shard] = []
+    seen = set()
+    for url in urls:
+        for name, _ in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+            if (url, name) not in seen:
+                seen.add((url, name))
+                out.append((url, name))
+    return out
+
+
+def resolve_workers(workers: int) -> int:
+    """``workers`` with ``0`` meaning one per spare core."""
+    if workers > 0:
+        return workers
+    from sqldetector.autopilot.system import detect_system
+
+    return detect_system()["workers"]
+
+
+# ----------------------------------------------------------------------
+# worker side
+
+
+async def _pull(tasks: Any, stop: Any) -> AsyncIterator[Any]:
+    while not stop.is_set():
+        shard = await asyncio.to_thread(tasks.get)
+        if shard is None or stop.is_set():
+            return
+        yield shard
+
+
+def _worker_main(
+    worker: Callable[..., Any],
+    limiter: SharedRateLimiter,
+    args: Sequence[Any],
+    tasks: Any,
+    results: Any,
+    stop: Any,
+) -> None:
+    def report(kind: str, payload: Any) -> None:
+        results.put((kind, payload))
+
+    try:
+        asyncio.run(worker(_pull(tasks, stop), limiter, report, *args))
+    except Exception as exc:
+        results.put(("crash", repr(exc)))
+    finally:
+        results.put(("exit", os.getpid()))
+
+
+# ----------------------------------------------------------------------
+# parent side
+
+
+async def run_sharded(
+    shards: Sequence[Any],
+    worker: Callable[..., Any],
+    *,
+    workers: int,
+    args: Sequence[Any] = (),
+    rate: float = 0.0,
+    burst: Optional[float] = None,
+    overrides: Optional[dict] = None,
+    hosts: Iterable[str] = (),
+    progress: Optional[Callable[[float], None]] = None,
+    on_finding: Optional[Callable[[Any], None]] = None,
+    stop_after_first: bool = False,
+) -> List[Any]:
+    """Run ``worker`` over ``shards`` in ``workers`` processes.
+
+    ``rate``, ``burst`` and ``overrides`` configure the shared per-host
+    buckets; ``hosts`` are the hosts known up front (others claim a bucket
+    when first seen).  ``args`` are passed to every worker and must be
+    picklable.  Returns the findings in the order they arrived.
+    """
+    if not shards:
+        return []
+    workers = max(1, min(resolve_workers(workers), len(shards)))
+    tasks = CONTEXT.Queue()
+    results = CONTEXT.Queue()
+    stop = CONTEXT.Event()
+    limiter = SharedRateLimiter(rate, burst, overrides, hosts=hosts, ctx=CONTEXT)
+    for shard in shards:
+        tasks.put(shard)
+    for _ in range(workers):
+        tasks.put(None)
+    procs = [
+        CONTEXT.Process(
+            target=_worker_main,
+            args=(worker, limiter, tuple(args), tasks, results, stop),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    def next_event() -> Optional[Tuple[str, Any]]:
+        while True:
+            try:
+                return results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    return None
+
+    findings: List[Any] = []
+    done = exited = 0
+    try:
+        while exited < workers:
+            event = await asyncio.to_thread(next_event)
+            if event is None:  # pragma: no cover - workers killed
+                break
+            kind, payload = event
+            if kind == "exit":
+                exited += 1
+            elif kind == "crash":
+                raise RuntimeError(f"sharded worker failed: {payload}")
+            elif kind == "finding":
+                findings.append(payload)
+                if on_finding:
+                    on_finding(payload)
+                if stop_after_first:
+                    stop.set()
+            elif kind == "done":
+                done += 1
+                if progress:
+                    progress(100.0 * done / len(shards))
+    finally:
+        stop.set()
+        # shards left behind after an early stop must not block interpreter exit
+        tasks.cancel_join_thread()
+        for p in procs:
+            await asyncio.to_thread(p.join, 5)
+            if p.is_alive():  # pragma: no cover - stuck worker
+                p.terminate()
+    return findings
+
+
+__all__ = ["CONTEXT", "Report", "Shard", "resolve_workers", "run_sharded", "shards_for"]
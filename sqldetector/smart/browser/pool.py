@@ -0,0 +1,190 @@
+"""Shared headless browser with a bounded pool of recyclable contexts.
+
+Launching Chromium costs one to two seconds and a few hundred megabytes, so
+callers borrow a page from one long-lived browser instead::
+
+    async with pool.page() as page:
+        await page.goto(url)
+
+At most ``size`` contexts are checked out at once.  A context serves
+``max_uses`` pages and is then closed so cookies, caches and leaked memory do
+not accumulate; every page is fresh, so listeners registered by one caller
+never fire for the next.  Requests for images, fonts and media are aborted by
+route interception.  The browser is started lazily on first checkout and
+relaunched if it disconnects.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, Iterable, List, Optional
+
+try:  # pragma: no cover - optional dependency
+    from playwright.async_api import async_playwright
+except Exception:  # pragma: no cover
+    async_playwright = None  # type: ignore
+
+BLOCKED_RESOURCES: FrozenSet[str] = frozenset({"image", "font", "media"})
+LAUNCH_ARGS = ("--disable-web-security", "--no-sandbox")
+
+
+@dataclass
+class _Lease:
+    browser: Any
+    context: Any
+    uses: int = 0
+
+
+class BrowserPool:
+    """Bounded pool of browser contexts on one long-lived browser."""
+
+    def __init__(
+        self,
+        size: int = 4,
+        max_uses: int = 50,
+        *,
+        headless: bool = True,
+        block: Iterable[str] = BLOCKED_RESOURCES,
+        args: Iterable[str] = LAUNCH_ARGS,
+        context_options: Optional[Dict[str, Any]] = None,
+        launcher: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.block = frozenset(block)
+        self.args = list(args)
+        self.context_options = {"ignore_https_errors": True, **(context_options or {})}
+        self.launcher = launcher or async_playwright
+        self.launches = 0
+        self.contexts = 0
+        self.aborted = 0
+        self._sem = asyncio.Semaphore(self.size)
+        self._lock = asyncio.Lock()
+        self._idle: List[_Lease] = []
+        self._pw: Any = None
+        self._browser: Any = None
+
+    @property
+    def available(self) -> bool:
+        """Whether Playwright is importable."""
+        return self.launcher is not None
+
+    async def _ensure_browser(self) -> Any:
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self.launcher is None:
+                raise RuntimeError("playwright is not installed")
+            if self._pw is None:
+                self._pw = await self.launcher().start()
+            self._browser = await self._pw.chromium.launch(
+                headless=self.headless, args=self.args
+            )
+            self.launches += 1
+            return self._browser
+
+    async def _route(self, route: Any) -> None:
+        if route.request.resource_type in self.block:
+            self.aborted += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _checkout(self) -> _Lease:
+        browser = await self._ensure_browser()
+        while self._idle:
+            lease = self._idle.pop()
+            if lease.browser is browser:
+                return lease
+        context = await browser.new_context(**self.context_options)
+        if self.block:
+            await context.route("**/*", self._route)
+        self.contexts += 1
+        return _Lease(browser, context)
+
+    async def _checkin(self, lease: _Lease, healthy: bool) -> None:
+        if (
+            healthy
+            and lease.uses < self.max_uses
+            and lease.browser is self._browser
+            and lease.browser.is_connected()
+        ):
+            self._idle.append(lease)
+            return
+        try:
+            await lease.context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Any]:
+        """Check out a fresh page; it is closed and its context returned on exit."""
+        async with self._sem:
+            lease = await self._checkout()
+            page = None
+            healthy = False
+            try:
+                page = await lease.context.new_page()
+                yield page
+            finally:
+                lease.uses += 1
+                if page is not None:
+                    try:
+                        await page.close()
+                        healthy = True
+                    except Exception:
+                        pass
+                await self._checkin(lease, healthy)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "launches": self.launches,
+            "contexts": self.contexts,
+            "idle": len(self._idle),
+            "aborted": self.aborted,
+        }
+
+    async def aclose(self) -> None:
+        """Close idle contexts, the browser and the Playwright driver."""
+        idle, self._idle = self._idle, []
+        for lease in idle:
+            try:
+                await lease.context.close()
+            except Exception:
+                pass
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._pw is not None:
+            try:
+                await self._pw.stop()
+            except Exception:
+                pass
+            self._pw = None
+
+
+_shared: Optional[BrowserPool] = None
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def shared_pool(**kwargs: Any) -> BrowserPool:
+    """Process-wide pool for the running event loop.
+
+    ``kwargs`` are only used when the pool is created; the owner of the event
+    loop is responsible for calling :meth:`BrowserPool.aclose`.
+    """
+    global _shared, _shared_loop
+    loop = asyncio.get_running_loop()
+    if _shared is None or _shared_loop is not loop:
+        _shared = BrowserPool(**kwargs)
+        _shared_loop = loop
+    return _shared
+
+
+__all__ = ["BLOCKED_RESOURCES", "BrowserPool", "shared_pool"]
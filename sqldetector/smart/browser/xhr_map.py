@@ -1,30 +1,46 @@
 from __future__ import annotations
 
-from typing import List, Dict
+import asyncio
+from typing import Dict, List, Optional
 
-try:  # pragma: no cover - optional dependency
-    from playwright.sync_api import sync_playwright  # type: ignore
-except Exception:  # pragma: no cover - if playwright missing
-    sync_playwright = None  # type: ignore
+from .pool import BrowserPool, shared_pool
 
 
-def discover_xhr(url: str) -> List[Dict[str, str]]:
-    """Headless browser run to map XHR/fetch calls.
+async def map_xhr(url: str, pool: Optional[BrowserPool] = None) -> List[Dict[str, str]]:
+    """Visit ``url`` on a pooled page and record every request it makes.
 
-    The implementation intentionally does a best effort: if Playwright is not
-    available an empty list is returned.
+    Without ``pool`` the process-wide :func:`~.pool.shared_pool` is used;
+    closing it is left to the owner of the event loop.  An empty list is
+    returned if Playwright is missing.
     """
 
-    if not sync_playwright:
+    if pool is None:
+        pool = shared_pool()
+    if not pool.available:
         return []
     items: List[Dict[str, str]] = []
-    with sync_playwright() as p:  # pragma: no cover - heavy dependency
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    async with pool.page() as page:  # pragma: no cover - heavy dependency
         page.on(
             "request",
             lambda req: items.append({"url": req.url, "method": req.method}),
         )
-        page.goto(url)
-        browser.close()
+        await page.goto(url)
     return items
+
+
+def discover_xhr(url: str) -> List[Dict[str, str]]:
+    """Headless browser run to map XHR/fetch calls.
+
+    The implementation intentionally does a best effort: if Playwright is not
+    available an empty list is returned.  Async callers should use
+    :func:`map_xhr` with a shared :class:`BrowserPool` instead.
+    """
+
+    async def run() -> List[Dict[str, str]]:
+        pool = shared_pool()
+        try:
+            return await map_xhr(url, pool)
+        finally:
+            await pool.aclose()
+
+    return asyncio.run(run())
@@ -0,0 +1,152 @@
+"""Streaming latency statistics.
+
+Quantiles are tracked with the P² algorithm (Jain & Chlamtac, 1985) which
+keeps five markers per quantile and updates them in O(1) per sample, so hot
+paths such as hedge-delay computation never sort sample windows.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Dict, List
+
+
+class P2Quantile:
+    """O(1) memory/update estimator of a single quantile ``p``."""
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.count = 0
+        self._q: List[float] = []
+        self._n = [0, 1, 2, 3, 4]
+        self._np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+        n = self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+        for i in (1, 2, 3):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                qp = self._parabolic(i, step)
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = qp
+                n[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> float:
+        if not self._q:
+            return 0.0
+        if self.count <= 5:
+            idx = min(len(self._q) - 1, int(round(self.p * (len(self._q) - 1))))
+            return self._q[idx]
+        return self._q[2]
+
+
+class LatencyStats:
+    """p50/p95/p99, a windowed minimum and a sample count for one stream.
+
+    ``floor`` is the smallest sample of the current and the previous window of
+    ``floor_window`` samples.  Queuing delay never raises it while a fast
+    sample is still in the window, yet it adapts within two windows when a
+    route permanently becomes slower.
+    """
+
+    def __init__(self, floor_window: int = 100) -> None:
+        self.count = 0
+        self.max = 0.0
+        self.floor_window = max(1, floor_window)
+        self._min = math.inf
+        self._prev_min = math.inf
+        self._in_window = 0
+        self._p50 = P2Quantile(0.5)
+        self._p95 = P2Quantile(0.95)
+        self._p99 = P2Quantile(0.99)
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        self._min = min(self._min, x)
+        self._in_window += 1
+        if self._in_window >= self.floor_window:
+            self._prev_min, self._min = self._min, math.inf
+            self._in_window = 0
+        self.max = max(self.max, x)
+        self._p50.add(x)
+        self._p95.add(x)
+        self._p99.add(x)
+
+    @property
+    def floor(self) -> float:
+        low = min(self._min, self._prev_min)
+        return 0.0 if low == math.inf else low
+
+    @property
+    def p50(self) -> float:
+        return self._p50.value()
+
+    @property
+    def p95(self) -> float:
+        return self._p95.value()
+
+    @property
+    def p99(self) -> float:
+        return self._p99.value()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "floor": round(self.floor, 6),
+            "p50": round(self.p50, 6),
+            "p95": round(self.p95, 6),
+            "p99": round(self.p99, 6),
+            "max": round(self.max, 6),
+        }
+
+
+class LatencyRegistry:
+    """Per-key (usually per-host) :class:`LatencyStats`."""
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+
+    def record(self, key: str, latency: float) -> LatencyStats:
+        stats = self._stats[key]
+        stats.add(latency)
+        return stats
+
+    def get(self, key: str) -> LatencyStats:
+        return self._stats[key]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {key: stats.snapshot() for key, stats in self._stats.items()}
+
+
+__all__ = ["P2Quantile", "LatencyStats", "LatencyRegistry"]
@@ -0,0 +1,242 @@
+"""Asynchronous sequential timing tests.
+
+A time-based check asks whether a variant request is reliably slower than the
+control request.  Taking a fixed number of samples of each, one after another,
+wastes requests on clear cases and is easily fooled by network drift.
+:class:`SequentialTimingEngine` instead samples in interleaved A/B/A' rounds
+(see :func:`~sqldetector.timing.twin_sampler.interleaved`) -- chained so
+that the closing control of one round opens the next, i.e. two requests per
+round -- re-evaluates the evidence after every round and stops as soon as it
+is conclusive:
+
+* ``method="sprt"`` (default) -- Wald's sequential probability ratio test on
+  the per-round outcome "the variant was slower than both surrounding
+  controls".  Without an effect that happens with probability 1/3 (``p0``
+  defaults to 0.4 to absorb the dependence between chained rounds), with a
+  real delay with probability ``p1``.  Null payloads typically stop after
+  three or four rounds.
+* ``method="mann-whitney"`` -- a one-sided Mann–Whitney test of all variant
+  against all control samples after every round, with the overall ``alpha``
+  spread over the looks by a Pocock-type spending function so that repeated
+  testing does not inflate the false-positive rate.
+
+Independent variants run concurrently; every request goes through a
+per-host concurrency cap and, when given, a
+:class:`~sqldetector.pacing.host_bucket.HostRateLimiter`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sqldetector.detect.timing_stats import OnlineMannWhitney
+from sqldetector.pacing.host_bucket import HostRateLimiter
+
+from .twin_sampler import interleaved
+
+METHODS = ("sprt", "mann-whitney")
+
+
+class SPRT:
+    """Wald's SPRT for a Bernoulli success rate ``p0`` against ``p1``.
+
+    :meth:`update` returns ``True`` once ``p1`` is accepted, ``False`` once
+    ``p0`` is accepted and ``None`` while undecided.
+    """
+
+    def __init__(self, p0: float, p1: float, alpha: float = 0.01, beta: float = 0.05) -> None:
+        if not 0 < p0 < p1 < 1:
+            raise ValueError("SPRT needs 0 < p0 < p1 < 1")
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self._hit = math.log(p1 / p0)
+        self._miss = math.log((1 - p1) / (1 - p0))
+        self.llr = 0.0
+
+    def update(self, success: bool) -> Optional[bool]:
+        self.llr += self._hit if success else self._miss
+        if self.llr >= self.upper:
+            return True
+        if self.llr <= self.lower:
+            return False
+        return None
+
+
+def alpha_spent(t: float, alpha: float) -> float:
+    """Pocock-type Lan–DeMets spending: cumulative alpha at information ``t``."""
+    t = min(max(t, 0.0), 1.0)
+    return alpha * math.log(1 + (math.e - 1) * t)
+
+
+@dataclass
+class TimingVerdict:
+    """Outcome of one control/variant comparison."""
+
+    variant: Any
+    detected: bool = False
+    decided: bool = False
+    rounds: int = 0
+    requests: int = 0
+    errors: int = 0
+    control_times: List[float] = field(default_factory=list)
+    variant_times: List[float] = field(default_factory=list)
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def shift(self) -> float:
+        """Median slowdown of the variant over the control, in seconds."""
+        if not self.control_times or not self.variant_times:
+            return 0.0
+        return statistics.median(self.variant_times) - statistics.median(self.control_times)
+
+
+class SequentialTimingEngine:
+    """Run sequential timing tests with ``send`` as the request coroutine.
+
+    ``send(request)`` is awaited and timed; requests are whatever ``send``
+    accepts (URLs by default, which ``host_of`` maps to their host).  A round
+    only counts as a success for the SPRT when the variant is slower than both
+    controls by more than ``min_shift`` seconds.  Rounds with a failed request
+    are discarded; after ``max_errors`` of them the test gives up undecided.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Any], Awaitable[Any]],
+        *,
+        method: str = "sprt",
+        alpha: float = 0.01,
+        beta: float = 0.05,
+        p0: float = 0.4,
+        p1: float = 0.9,
+        min_rounds: int = 3,
+        max_rounds: int = 10,
+        min_shift: float = 0.0,
+        max_errors: int = 3,
+        per_host: int = 4,
+        limiter: Optional[HostRateLimiter] = None,
+        host_of: Optional[Callable[[Any], str]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        if method not in METHODS:
+            raise ValueError(f"unknown sequential method: {method!r}")
+        self.send = send
+        self.method = method
+        self.alpha = alpha
+        self.beta = beta
+        self.p0 = p0
+        self.p1 = p1
+        self.min_rounds = max(1, min_rounds)
+        self.max_rounds = max(self.min_rounds, max_rounds)
+        self.min_shift = min_shift
+        self.max_errors = max_errors
+        self.per_host = max(1, per_host)
+        self.limiter = limiter
+        self.host_of = host_of or (lambda request: urlsplit(str(request)).netloc)
+        self.clock = clock
+        self.requests = 0
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def _timed(self, request: Any) -> float:
+        host = self.host_of(request)
+        async with self._slot(host):
+            if self.limiter is not None:
+                await self.limiter.acquire(host)
+            self.requests += 1
+            start = self.clock()
+            await self.send(request)
+            return self.clock() - start
+
+    def _mann_whitney(
+        self, verdict: TimingVerdict, state: OnlineMannWhitney, spent: float
+    ) -> Tuple[Optional[bool], float]:
+        stats = state.result()
+        # the test is two-sided; a negative delta means a slower variant
+        slower = stats["cliffs_delta"] < 0
+        p = stats["p"] / 2 if slower else 1 - stats["p"] / 2
+        stats["p_one_sided"] = p
+        verdict.stats = stats
+        if verdict.rounds < self.min_rounds:
+            return None, spent
+        total = alpha_spent(verdict.rounds / self.max_rounds, self.alpha)
+        level, spent = total - spent, total
+        if p < level and verdict.shift > self.min_shift:
+            return True, spent
+        if not slower:
+            return False, spent  # futility: the variant is not even slower
+        return None, spent
+
+    async def test(self, control: Any, variant: Any) -> TimingVerdict:
+        """Compare ``variant`` against ``control`` until the test decides."""
+        verdict = TimingVerdict(variant)
+        sprt = SPRT(self.p0, self.p1, self.alpha, self.beta)
+        state = OnlineMannWhitney()
+        spent = 0.0
+
+        async def probe(request: Any) -> float:
+            verdict.requests += 1
+            return await self._timed(request)
+
+        previous: Optional[float] = None
+        while verdict.rounds < self.max_rounds:
+            try:
+                if previous is None:
+                    a, b, a_prime = await interleaved(
+                        lambda: probe(control), lambda: probe(variant)
+                    )
+                    verdict.control_times.append(a)
+                    state.add_control(a)
+                else:
+                    # chain rounds: the closing control of one round opens the next
+                    a = previous
+                    b = await probe(variant)
+                    a_prime = await probe(control)
+            except Exception:
+                previous = None
+                verdict.errors += 1
+                if verdict.errors >= self.max_errors:
+                    break
+                continue
+            previous = a_prime
+            verdict.rounds += 1
+            verdict.control_times.append(a_prime)
+            state.add_control(a_prime)
+            verdict.variant_times.append(b)
+            state.add_variant(b)
+            if self.method == "sprt":
+                decision = sprt.update(b - max(a, a_prime) > self.min_shift)
+                verdict.stats = {"llr": sprt.llr}
+                if decision and verdict.rounds < self.min_rounds:
+                    decision = None  # never flag a payload on fewer rounds
+            else:
+                decision, spent = self._mann_whitney(verdict, state, spent)
+            if decision is not None:
+                verdict.detected = decision
+                verdict.decided = True
+                break
+        return verdict
+
+    async def test_many(self, control: Any, variants: Iterable[Any]) -> List[TimingVerdict]:
+        """Test every variant against ``control`` concurrently, in input order."""
+        return list(await asyncio.gather(*(self.test(control, v) for v in variants)))
+
+
+__all__ = [
+    "METHODS",
+    "SPRT",
+    "SequentialTimingEngine",
+    "TimingVerdict",
+    "alpha_spent",
+]
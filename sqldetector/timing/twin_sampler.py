@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import statistics
-from typing import Callable, List
+import time
+from typing import Any, Awaitable, Callable, List, Tuple
 
 
 def sample(ping: Callable[[], float]) -> float:
@@ -11,4 +12,29 @@ def sample(ping: Callable[[], float]) -> float:
     return statistics.median(samples)
 
 
-__all__ = ["sample"]
+async def interleaved(
+    control: Callable[[], Awaitable[float]], variant: Callable[[], Awaitable[float]]
+) -> Tuple[float, float, float]:
+    """One A/B/A' round: control, variant, then control again.
+
+    Bracketing the variant between two controls means slow drift of the
+    server or the network affects both sides of the comparison alike.
+    """
+    a = await control()
+    b = await variant()
+    a_prime = await control()
+    return a, b, a_prime
+
+
+async def timed_fetch(client: Any, url: str, method: str = "GET", **kwargs: Any) -> float:
+    """Seconds one request to ``url`` takes through an ``HttpClient``.
+
+    Timing samples are never coalesced: a caller sharing another request's
+    in-flight response would measure the wrong request.
+    """
+    start = time.perf_counter()
+    await client.request(method, url, coalesce=False, **kwargs)
+    return time.perf_counter() - start
+
+
+__all__ = ["interleaved", "sample", "timed_fetch"]
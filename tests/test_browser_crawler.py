@@ -0,0 +1,116 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from sqldetector.discovery.crawler import BrowserCrawler, NetworkQuiet, same_site
+
+SITE = {
+    "http://x/": {"links": ["http://x/a", "http://x/b#top", "http://evil/", "javascript:void(0)"]},
+    "http://x/a": {
+        "links": ["http://x/", "http://sub.x/c"],
+        "forms": [{"action": "http://x/login", "method": "post", "inputs": {"u": ""}}],
+    },
+    "http://x/b": {
+        "links": ["http://x/a"],
+        "scripts": ["http://x/api/items"],
+        "markers": ["django"],
+    },
+    "http://sub.x/c": {"links": []},
+}
+
+
+class SitePage:
+    def __init__(self, pool):
+        self.pool = pool
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def _emit(self, event, url):
+        for handler in self.handlers.get(event, []):
+            handler(SimpleNamespace(url=url))
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.pool.active += 1
+        self.pool.peak = max(self.pool.peak, self.pool.active)
+        self.url = url
+        self._emit("request", url + "xhr")
+        await asyncio.sleep(0.02)
+        self._emit("requestfinished", url + "xhr")
+        self.pool.active -= 1
+        return SimpleNamespace(headers={"Server": "test"})
+
+    async def evaluate(self, script, markers):
+        data = SITE[self.url]
+        return {k: data.get(k, []) for k in ("links", "forms", "scripts", "markers")}
+
+
+class SitePool:
+    def __init__(self):
+        self.active = self.peak = 0
+
+    @asynccontextmanager
+    async def page(self):
+        yield SitePage(self)
+
+
+@pytest.mark.asyncio
+async def test_crawl_visits_scoped_pages_in_parallel():
+    pool = SitePool()
+    crawler = BrowserCrawler(
+        pool, pages=3, quiet=0.01, in_scope=same_site("http://x/"), markers=re.compile("django")
+    )
+    result = await crawler.crawl(["http://x/"])
+    assert result.visited == set(SITE)
+    assert result.forms[0]["action"] == "http://x/login"
+    assert "http://x/api/items" in result.urls()
+    assert "http://x/xhr" in result.requests
+    assert result.markers == {"django"}
+    assert result.headers == {"server": "test"}
+    assert pool.peak > 1
+
+
+@pytest.mark.asyncio
+async def test_crawl_limits_pages_and_per_host_concurrency():
+    pool = SitePool()
+    crawler = BrowserCrawler(
+        pool, pages=4, per_host=1, max_pages=2, quiet=0.01, in_scope=same_site("http://x/", False)
+    )
+    result = await crawler.crawl(["http://x/"])
+    assert len(result.visited) == 2
+    assert not result.errors
+    assert pool.peak == 1
+
+
+@pytest.mark.asyncio
+async def test_network_quiet_waits_for_idle():
+    page = SitePage(SitePool())
+    quiet = NetworkQuiet(page)
+    page._emit("request", "http://x/slow")
+
+    async def finish():
+        await asyncio.sleep(0.05)
+        page._emit("requestfinished", "http://x/slow")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    task = asyncio.ensure_future(finish())
+    assert await quiet.wait(0.02, 1.0)
+    assert loop.time() - start >= 0.07
+    await task
+    page._emit("request", "http://x/poll")
+    assert not await quiet.wait(0.02, 0.05)
+
+
+@pytest.mark.asyncio
+async def test_crawl_reports_new_origins():
+    origins = []
+    crawler = BrowserCrawler(
+        SitePool(), pages=2, quiet=0.01, in_scope=same_site("http://x/"), on_host=origins.append
+    )
+    await crawler.crawl(["http://x/"])
+    assert origins == ["http://x/", "http://sub.x/c"]
@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+from sqldetector.smart.browser.pool import BrowserPool
+
+sys.path.append(str(Path(__file__).resolve().parent / "utils"))
+from fake_playwright import FakePage, FakePlaywright  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_one_browser_and_recycled_contexts():
+    pw = FakePlaywright()
+    pool = BrowserPool(size=2, max_uses=3, launcher=lambda: pw)
+    for _ in range(7):
+        async with pool.page() as page:
+            await page.goto("http://x")
+        assert page.closed
+    assert len(pw.browsers) == 1
+    contexts = pw.browsers[0].contexts
+    # contexts are closed after three pages each
+    assert [c.pages for c in contexts] == [3, 3, 1]
+    assert [c.closed for c in contexts] == [True, True, False]
+    await pool.aclose()
+    assert contexts[-1].closed and pw.stopped
+
+
+@pytest.mark.asyncio
+async def test_checkout_is_bounded():
+    pw = FakePlaywright()
+    pool = BrowserPool(size=2, launcher=lambda: pw)
+    active = peak = 0
+
+    async def use():
+        nonlocal active, peak
+        async with pool.page():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(use() for _ in range(6)))
+    assert peak == 2
+    assert pool.stats()["contexts"] == 2
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_heavy_resources_are_aborted(monkeypatch):
+    monkeypatch.setattr(
+        FakePage,
+        "subresources",
+        [("/", "document"), ("/a.png", "image"), ("/f.woff2", "font"), ("/app.js", "script")],
+    )
+    pw = FakePlaywright()
+    pool = BrowserPool(launcher=lambda: pw)
+    async with pool.page() as page:
+        await page.goto("http://x")
+    assert pw.browsers[0].routed == [
+        ("continue", "http://x/"),
+        ("abort", "http://x/a.png"),
+        ("abort", "http://x/f.woff2"),
+        ("continue", "http://x/app.js"),
+    ]
+    assert pool.stats()["aborted"] == 2
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_relaunches_disconnected_browser():
+    pw = FakePlaywright()
+    pool = BrowserPool(launcher=lambda: pw)
+    async with pool.page():
+        pass
+    pw.browsers[0].connected = False
+    async with pool.page():
+        pass
+    assert len(pw.browsers) == 2
+    assert len(pw.browsers[1].contexts) == 1
+    await pool.aclose()
@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+
+from sqldetector.core.bulk import sliding_window
+from sqldetector.core.config import Settings
+from sqldetector.core.http_async import HttpClient
+
+
+@pytest.mark.asyncio
+async def test_window_has_no_batch_barrier():
+    running = peak = 0
+
+    async def job(delay):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        return delay
+
+    delays = [0.2] + [0.01] * 20
+    start = asyncio.get_running_loop().time()
+    out = [r async for _, r in sliding_window(delays, job, window=4)]
+    # the slow first job overlaps all the fast ones instead of gating batches
+    assert asyncio.get_running_loop().time() - start < 0.3
+    assert peak == 4
+    assert out[-1] == 0.2
+
+
+@pytest.mark.asyncio
+async def test_ordered_results_and_errors():
+    async def job(i):
+        await asyncio.sleep(0.01 * (5 - i))
+        if i == 2:
+            raise ValueError(i)
+        return i
+
+    out = [(i, r) async for i, r in sliding_window(range(5), job, window=3, ordered=True)]
+    assert [i for i, _ in out] == [0, 1, 2, 3, 4]
+    assert isinstance(out[2][1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_producer_is_pulled_lazily():
+    pulled = 0
+
+    async def produce():
+        nonlocal pulled
+        for i in range(100):
+            pulled += 1
+            yield i
+
+    async def job(i):
+        return i
+
+    async for _, r in sliding_window(produce(), job, window=2):
+        if r == 3:
+            break
+    assert pulled <= 6
+
+
+@pytest.mark.asyncio
+async def test_request_many_stops_at_first_finding():
+    seen = []
+
+    async def handler(request):
+        seen.append(request.url.path)
+        if request.url.path == "/vuln":
+            return httpx.Response(200, text="SQL syntax error")
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, text="ok")
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=0, stop_after_first_finding=True)
+    reqs = [("GET", "http://t/vuln")] + [("GET", f"http://t/{i}") for i in range(10)]
+    async with HttpClient(settings) as client:
+        out = [
+            r
+            async for _, r in client.request_many(
+                reqs, window=3, is_finding=lambda r: "SQL" in r.text
+            )
+        ]
+    assert len(out) == 1 and out[0].text == "SQL syntax error"
+    assert len(seen) == 3
+
+
+@pytest.mark.asyncio
+async def test_stop_never_sees_exceptions():
+    async def job(i):
+        if i < 3:
+            raise ConnectionError(i)
+        return i
+
+    checked = []
+
+    def stop(result):
+        checked.append(result)
+        return result == 4
+
+    out = [r async for _, r in sliding_window(range(10), job, window=1, ordered=True, stop=stop)]
+    assert [type(r) for r in out[:3]] == [ConnectionError] * 3
+    assert out[3:] == [3, 4] and checked == [3, 4]
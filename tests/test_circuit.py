@@ -0,0 +1,31 @@
+import time
+
+from sqldetector.core.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_trips_on_error_rate_and_probes_once():
+    br = CircuitBreaker(window=10, min_calls=4, error_rate=0.5, cooldown=0.01)
+    for failure in (False, True, False, True):
+        assert br.allow()
+        br.record(failure)
+    assert br.state == OPEN
+    assert not br.allow()
+    time.sleep(0.02)
+    assert br.allow()
+    assert br.state == HALF_OPEN
+    assert not br.allow()  # only a single probe in flight
+    br.record(False)
+    assert br.state == CLOSED
+    assert br.allow()
+
+
+def test_failed_probe_backs_off_longer():
+    br = CircuitBreaker(min_calls=1, error_rate=1.0, cooldown=0.01)
+    br.allow()
+    br.record(True)
+    time.sleep(0.02)
+    assert br.allow()
+    br.record(True)
+    assert br.state == OPEN
+    assert br.trips == 2
+    assert not br.allow()
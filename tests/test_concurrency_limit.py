@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from sqldetector.pacing.concurrency import GradientLimiter
+
+
+@pytest.mark.asyncio
+async def test_shrink_is_not_undone_by_releases():
+    limit = GradientLimiter(4, max_limit=8)
+    for _ in range(4):
+        await limit.acquire()
+    waiter = asyncio.ensure_future(limit.acquire())
+    await asyncio.sleep(0)
+    assert limit.queued == 1
+    for _ in range(4):
+        limit.on_drop()
+    assert limit.capacity == 2
+    limit.release()
+    limit.release()
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    limit.release()
+    await asyncio.sleep(0)
+    assert waiter.done()
+    assert limit.inflight == 2
+
+
+def test_grows_while_saturated_and_rtt_flat():
+    limit = GradientLimiter(4, max_limit=32)
+    limit.inflight = 4
+    for _ in range(20):
+        limit.on_sample(0.1, 0.1)
+    assert limit.limit > 8
+
+
+def test_latency_inflation_reduces_limit():
+    limit = GradientLimiter(20, max_limit=32)
+    limit.inflight = 20
+    for _ in range(30):
+        limit.on_sample(1.0, 0.1)
+    assert limit.limit < 8
+    assert limit.snapshot()["drops"] == 0
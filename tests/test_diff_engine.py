@@ -0,0 +1,67 @@
+import difflib
+import time
+
+import pytest
+
+from sqldetector.diff.engine import FastDiff, SequenceMatcherDiff, get_engine
+
+PAGE = "\n".join(f"<tr><td>row {i}</td><td>{i * 7}</td></tr>" for i in range(400))
+
+
+def _exact(a, b):
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def test_identical_and_disjoint():
+    fast = FastDiff()
+    assert fast.ratio(PAGE, PAGE) == 1.0
+    assert fast.ratio("", "") == 1.0
+    assert fast.ratio("aaaa\nbbbb", "") == 0.0
+
+
+def test_close_to_difflib_on_local_change():
+    fast = FastDiff()
+    changed = PAGE.replace("row 200<", "row 200 You have an error in your SQL syntax<")
+    assert abs(fast.ratio(PAGE, changed) - _exact(PAGE, changed)) < 0.01
+    assert fast.exact == 1 and fast.approximate == 0
+
+
+def test_cost_cap_falls_back_to_unit_overlap():
+    fast = FastDiff(max_cost=10)
+    shuffled = "\n".join(reversed(PAGE.split("\n")))
+    ratio = fast.ratio(PAGE, shuffled)
+    assert fast.approximate == 1
+    assert ratio > 0.99  # same lines, different order
+
+
+def test_large_minified_page_is_fast():
+    big = "".join(f"<div class=c{i % 13}>item {i}</div>" for i in range(20000))
+    variant = big.replace("item 10000<", "item 10000' OR 1=1<")
+    fast = FastDiff()
+    start = time.perf_counter()
+    ratio = fast.ratio(big, variant)
+    assert time.perf_counter() - start < 1.0
+    assert 0.99 < ratio < 1.0
+
+
+def test_batch_reuses_baseline_fingerprint():
+    fast = FastDiff()
+    variants = [PAGE, PAGE + "\nx", "other"]
+    ratios = fast.ratios(PAGE, variants)
+    assert ratios[0] == 1.0 and ratios[1] > 0.99 and ratios[2] < 0.1
+    assert len(fast._cache) == 3
+
+
+def test_near_duplicate_exit_is_opt_in():
+    a = PAGE
+    b = PAGE + "\nextra"
+    assert FastDiff().ratio(a, b) < 1.0
+    fp = FastDiff(near_duplicate_exit=True)
+    assert fp.fingerprint(a).simhash is not None
+
+
+def test_registry():
+    assert isinstance(get_engine("difflib"), SequenceMatcherDiff)
+    assert get_engine().name == "fast"
+    with pytest.raises(ValueError):
+        get_engine("nope")
@@ -1,59 +1,30 @@
+import sys
+from pathlib import Path
+
 import pytest
 from sqldetector.discovery import collector
+from sqldetector.smart.browser.pool import BrowserPool, shared_pool
 
+sys.path.append(str(Path(__file__).resolve().parent / "utils"))
+from fake_playwright import FakePlaywright  # noqa: E402
 
-class DummyRequest:
-    def __init__(self, url):
-        self.url = url
-
-
-class DummyPage:
-    def __init__(self):
-        self.handlers = {}
-
-    def on(self, event, handler):
-        self.handlers[event] = handler
-
-    async def goto(self, url):
-        self.handlers["request"](DummyRequest(url + "/api"))
-
-    async def query_selector_all(self, selector):
-        return []
-
-    async def wait_for_timeout(self, ms):
-        pass
-
-
-class DummyBrowser:
-    async def new_page(self):
-        return DummyPage()
-
-    async def close(self):
-        pass
 
-
-class DummyPW:
-    def __init__(self):
-        self.chromium = self
-
-    async def launch(self, headless=True):
-        return DummyBrowser()
-
-
-class DummyContext:
-    async def __aenter__(self):
-        return DummyPW()
-
-    async def __aexit__(self, exc_type, exc, tb):
-        pass
-
-
-def fake_async_playwright():
-    return DummyContext()
+@pytest.mark.asyncio
+async def test_collect_captures_requests():
+    pw = FakePlaywright()
+    pool = BrowserPool(launcher=lambda: pw)
+    result = await collector.collect("http://example.com", pool=pool)
+    assert result == ["http://example.com/api"]
+    await pool.aclose()
 
 
 @pytest.mark.asyncio
-async def test_collect_captures_requests(monkeypatch):
-    monkeypatch.setattr(collector, "async_playwright", fake_async_playwright)
-    result = await collector.collect("http://example.com")
-    assert result == ["http://example.com/api"]
+async def test_collect_defaults_to_shared_pool():
+    pw = FakePlaywright()
+    pool = shared_pool(launcher=lambda: pw)
+    try:
+        assert await collector.collect("http://example.com") == ["http://example.com/api"]
+        assert await collector.collect("http://example.com") == ["http://example.com/api"]
+        assert pool.launches == 1
+    finally:
+        await pool.aclose()
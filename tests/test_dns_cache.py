@@ -0,0 +1,61 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from sqldetector.net import dns_cache
+from sqldetector.net.dns_cache import DNSCache
+
+
+def _fake_dns(monkeypatch):
+    monkeypatch.setattr(dns_cache, "aiodns", None)
+    calls = []
+
+    async def getaddrinfo(host, port, type=0):
+        calls.append(host)
+        await asyncio.sleep(0.01)
+        if host.startswith("missing"):
+            raise socket.gaierror("nxdomain")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", 0))]
+
+    loop = asyncio.get_running_loop()
+    monkeypatch.setattr(loop, "getaddrinfo", getaddrinfo)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query(monkeypatch, tmp_path):
+    fake_dns = _fake_dns(monkeypatch)
+    cache = DNSCache(path=tmp_path / "dns.json")
+    results = await asyncio.gather(*(cache.resolve("a.test") for _ in range(10)))
+    assert all(r == ["10.0.0.1"] for r in results)
+    assert fake_dns == ["a.test"]
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_negative_entries_and_lazy_expiry(monkeypatch, tmp_path):
+    fake_dns = _fake_dns(monkeypatch)
+    cache = DNSCache(ttl=60, negative_ttl=60, path=tmp_path / "dns.json")
+    assert await cache.resolve("missing.test") == []
+    assert await cache.resolve("missing.test") == []
+    assert fake_dns == ["missing.test"]
+    await cache.resolve("b.test")
+    cache.cache["b.test"] = (0.0, ["10.0.0.1"])  # expired
+    await cache.resolve("b.test")
+    assert fake_dns.count("b.test") == 2
+    await cache.aclose()
+
+
+@pytest.mark.asyncio
+async def test_writes_are_deferred_until_close(monkeypatch, tmp_path):
+    _fake_dns(monkeypatch)
+    path = tmp_path / "dns.json"
+    cache = DNSCache(path=path, flush_interval=60)
+    await cache.warmup([f"h{i}.test" for i in range(50)] + ["missing.test"], batch=4)
+    assert not path.exists()
+    await cache.aclose()
+    data = json.loads(path.read_text())
+    assert len(data) == 50 and "missing.test" not in data
+    assert len(DNSCache(path=path).cache) == 50
@@ -12,3 +12,11 @@ def test_frontier_priority_order():
     assert "form" in order[0]
     assert "/api" in order[1]
     assert "json" in order[2]
+
+
+def test_frontier_reports_new_origins_once():
+    hosts = []
+    f = Frontier(Settings(), on_host=hosts.append)
+    for url in ("http://x/a", "http://x/b", "https://x/c", "http://y:8080/d"):
+        f.add(url)
+    assert hosts == ["http://x/a", "https://x/c", "http://y:8080/d"]
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from sqldetector.pacing.host_bucket import HostRateLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_bucket_serves_waiters_in_order():
+    bucket = TokenBucket(rate=50, capacity=1)
+    order = []
+
+    async def worker(i):
+        await bucket.acquire()
+        order.append(i)
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(5)))
+    assert order == [0, 1, 2, 3, 4]
+    # first token is free, four more at 50/s
+    assert time.monotonic() - start >= 0.07
+
+
+@pytest.mark.asyncio
+async def test_hosts_do_not_throttle_each_other():
+    limiter = HostRateLimiter(rate=1, overrides={"fast.test": 100})
+    await limiter.acquire("slow.test")
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire(f"h{i}.test") for i in range(20)))
+    assert time.monotonic() - start < 0.1
+    assert limiter.bucket("fast.test").rate == 100
+    assert limiter.snapshot()["slow.test"]["rate"] == 1
+
+
+def test_glob_override():
+    limiter = HostRateLimiter(rate=5, burst=3, overrides={"*.example.com": 20})
+    bucket = limiter.bucket("api.example.com")
+    assert bucket.rate == 20
+    assert bucket.capacity == 3
+    assert limiter.bucket("other.test").rate == 5
+
+
+def test_pause_delays_next_reservation():
+    bucket = TokenBucket(rate=100, capacity=5)
+    bucket.pause(0.5)
+    assert 0.45 < bucket.reserve() <= 0.5
+    assert 0.5 < bucket.reserve() < 0.52
+    unlimited = TokenBucket(rate=0)
+    unlimited.pause(0.5)
+    assert unlimited.reserve() > 0.45
+
+
+def test_learn_only_lowers_rate():
+    limiter = HostRateLimiter(rate=10)
+    limiter.learn("a.test", 50)
+    assert limiter.bucket("a.test").rate == 10
+    limiter.learn("a.test", 2)
+    assert limiter.bucket("a.test").rate == 2
+
+
+@pytest.mark.asyncio
+async def test_learned_rate_rises_and_expires():
+    limiter = HostRateLimiter(rate=10)
+    limiter.learn("a.test", 0.5)
+    limiter.learn("a.test", 4)
+    assert limiter.bucket("a.test").rate == 4
+    limiter.learn("a.test", 0.5, expires=0.01)
+    await asyncio.sleep(0.02)
+    await limiter.acquire("a.test")
+    bucket = limiter.bucket("a.test")
+    assert bucket.rate == 10 and bucket.capacity == 10
@@ -14,7 +14,8 @@ def test_http_cache(tmp_path, monkeypatch):
         calls["count"] += 1
         if calls["count"] == 1:
             assert "If-None-Match" not in request.headers
-            return httpx.Response(200, headers={"ETag": "abc", "Content-Type": "text/plain"}, text="hello")
+            headers = {"ETag": "abc", "Content-Type": "text/plain"}
+            return httpx.Response(200, headers=headers, text="hello")
         assert request.headers.get("If-None-Match") == "abc"
         return httpx.Response(304)
 
@@ -30,3 +31,149 @@ def test_http_cache(tmp_path, monkeypatch):
 
     asyncio.run(run())
 
+
+
+def test_http_cache_dedupes_bodies_and_respects_vary(tmp_path):
+    from sqldetector.core.cache_transport import CacheTransport
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "If-None-Match" in request.headers:
+            return httpx.Response(304)
+        lang = request.headers.get("Accept-Language", "en")
+        body = "shared" if request.url.path != "/i18n" else f"hello-{lang}"
+        headers = {"ETag": f"{lang}", "Vary": "Accept-Language"}
+        return httpx.Response(200, headers=headers, text=body)
+
+    async def run() -> None:
+        transport = CacheTransport(httpx.MockTransport(handler), cache_dir=tmp_path)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://t/a")
+            await client.get("http://t/b")
+            assert len(list((tmp_path / "blobs").rglob("*"))) == 2  # one dir + one blob
+            r_en = await client.get("http://t/i18n", headers={"Accept-Language": "en"})
+            r_de = await client.get("http://t/i18n", headers={"Accept-Language": "de"})
+            again = await client.get("http://t/i18n", headers={"Accept-Language": "de"})
+            assert (r_en.text, r_de.text) == ("hello-en", "hello-de")
+            assert again.text == "hello-de" and again.extensions.get("from_cache")
+
+    asyncio.run(run())
+
+
+def test_http_cache_evicts_lru(tmp_path):
+    from sqldetector.core.cache_transport import CacheTransport
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"ETag": "x"}, content=request.url.path.encode() * 100)
+
+    async def run() -> None:
+        transport = CacheTransport(httpx.MockTransport(handler), cache_dir=tmp_path, max_bytes=500)
+        async with httpx.AsyncClient(transport=transport) as client:
+            for path in ("/a", "/b", "/c", "/d"):
+                await client.get(f"http://t{path}")
+            assert transport.store.total_bytes <= 500
+            assert await transport.store.lookup("http://t/a", {}) is None
+            assert await transport.store.lookup("http://t/d", {}) is not None
+
+    asyncio.run(run())
+
+
+def test_http_cache_forgets_the_size_of_a_missing_blob(tmp_path):
+    from sqldetector.core.cache_transport import CacheTransport
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"ETag": "x"}, content=b"a" * 100)
+
+    async def run() -> None:
+        transport = CacheTransport(httpx.MockTransport(handler), cache_dir=tmp_path)
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://t/a")
+            assert transport.store.total_bytes == 100
+            entry = await transport.store.lookup("http://t/a", {})
+            for blob in (tmp_path / "blobs").rglob("*"):
+                if blob.is_file():
+                    blob.unlink()
+            assert await transport.store.read(entry) is None
+            assert transport.store.total_bytes == 0
+
+    asyncio.run(run())
+
+
+def test_http_cache_skips_oversized_and_binary_bodies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        ctype = "image/png" if request.url.path == "/logo" else "text/html"
+        body = b"x" * (4096 if request.url.path == "/big" else 10)
+        headers = {"ETag": "e", "Cache-Control": "max-age=300", "Content-Type": ctype}
+        return httpx.Response(200, headers=headers, content=body)
+
+    settings = Settings(
+        http_cache_enabled=True, transport=httpx.MockTransport(handler), max_body_kb=1
+    )
+
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            for _ in range(2):
+                big = await client.get("http://t/big")
+                assert len(big.content) == 1024 and big.extensions["body_truncated"]
+                assert (await client.get("http://t/logo")).extensions["body_skipped"]
+                assert len((await client.get("http://t/small")).content) == 10
+
+    asyncio.run(run())
+    assert sorted(calls) == ["/big", "/big", "/logo", "/logo", "/small"]
+
+
+def test_hot_tier_skips_fresh_revalidation_and_caches_404(tmp_path):
+    from sqldetector.core.cache_transport import CacheTransport
+
+    calls = {"/robots.txt": 0, "/missing": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls[request.url.path] += 1
+        if request.url.path == "/missing":
+            return httpx.Response(404, text="nope")
+        return httpx.Response(
+            200, headers={"ETag": "r1", "Cache-Control": "max-age=300"}, text="User-agent: *"
+        )
+
+    async def run() -> None:
+        transport = CacheTransport(
+            httpx.MockTransport(handler), cache_dir=tmp_path, fresh_sec=10, negative_sec=10
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            for _ in range(5):
+                assert (await client.get("http://t/robots.txt")).text == "User-agent: *"
+                assert (await client.get("http://t/missing")).status_code == 404
+        assert calls == {"/robots.txt": 1, "/missing": 1}
+
+    asyncio.run(run())
+
+
+def test_no_cache_requests_and_timing_samples_skip_the_cache(tmp_path, monkeypatch):
+    from sqldetector.timing.twin_sampler import timed_fetch
+
+    monkeypatch.chdir(tmp_path)
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("If-None-Match"))
+        return httpx.Response(200, headers={"ETag": "e", "Cache-Control": "max-age=300"})
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(http_cache_enabled=True, transport=transport, rate_limit=100)
+
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            await client.get("http://t/")
+            assert (await client.get("http://t/")).extensions.get("from_cache")
+            for headers in ({"Cache-Control": "no-cache"}, {"Pragma": "no-cache"}):
+                r = await client.get("http://t/", headers=headers)
+                assert not r.extensions.get("from_cache")
+            await timed_fetch(client, "http://t/")
+            await client.get("http://t/", coalesce=False)
+
+    asyncio.run(run())
+    # every request after the cached one reached the server without validators
+    assert len(seen) >= 5 and not any(seen)
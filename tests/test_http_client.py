@@ -6,7 +6,7 @@ import importlib.util
 from typing import Any
 
 from sqldetector.core.config import Settings
-from sqldetector.core.errors import RetryBudgetExceeded, WAFBlocked
+from sqldetector.core.errors import RateLimited, RetryBudgetExceeded, WAFBlocked
 from sqldetector.core.http_async import HttpClient
 
 
@@ -81,6 +81,28 @@ async def test_hedged_request_returns_fastest():
     assert calls >= 2
 
 
+@pytest.mark.asyncio
+async def test_hedge_never_races_a_half_open_probe():
+    from sqldetector.core.circuit import CLOSED, OPEN
+
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, text="probe")
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, hedge_delay=0.01)
+    async with HttpClient(settings) as client:
+        breaker = client._breakers["test"]
+        breaker.state = OPEN  # cool-down already over: the next call is the probe
+        resp = await client.get("http://test/")
+        assert resp.text == "probe" and calls == 1
+        assert breaker.state == CLOSED
+
+
 @pytest.mark.asyncio
 async def test_client_configures_timeouts_and_limits(monkeypatch):
     captured: dict[str, Any] = {}
@@ -122,3 +144,174 @@ async def test_client_configures_timeouts_and_limits(monkeypatch):
         assert "br" in encs
     if importlib.util.find_spec("zstandard"):
         assert "zstd" in encs
+
+
+@pytest.mark.asyncio
+async def test_identical_gets_are_coalesced():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text="shared")
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100)
+    async with HttpClient(settings) as client:
+        resps = await asyncio.gather(*(client.get("http://test/") for _ in range(5)))
+        assert {r.text for r in resps} == {"shared"}
+        assert calls == 1
+        assert client.metrics()["coalesce"]["saved"] == 4
+        await asyncio.gather(*(client.get("http://test/", coalesce=False) for _ in range(3)))
+        assert calls == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelling_every_waiter_cancels_the_shared_request():
+    started, finished, cancelled = 0, 0, 0
+
+    async def handler(request):
+        nonlocal started, finished, cancelled
+        started += 1
+        try:
+            await asyncio.sleep(0.2)
+        except asyncio.CancelledError:
+            cancelled += 1
+            raise
+        finished += 1
+        return httpx.Response(200)
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100)
+    async with HttpClient(settings) as client:
+        waiters = [asyncio.ensure_future(client.get("http://test/")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        waiters[0].cancel()
+        # one waiter left: the shared request keeps running for it
+        assert (await waiters[1]).status_code == 200
+        assert (started, finished, cancelled) == (1, 1, 0)
+        waiters = [asyncio.ensure_future(client.get("http://test/")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        for w in waiters:
+            w.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert (started, finished, cancelled) == (2, 1, 1)
+        assert client.metrics()["coalesce"]["inflight"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Setting per-request cookies:DeprecationWarning")
+async def test_requests_with_credentials_or_options_are_not_merged():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text=request.headers.get("cookie", ""))
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100)
+    async with HttpClient(settings) as client:
+        resps = await asyncio.gather(
+            client.get("http://test/", cookies={"s": "alice"}),
+            client.get("http://test/", cookies={"s": "bob"}),
+            client.get("http://test/", auth=("u", "p")),
+        )
+        assert [r.text for r in resps[:2]] == ["s=alice", "s=bob"]
+        assert calls == 3
+        await asyncio.gather(
+            client.get("http://test/", timeout=1.0), client.get("http://test/", timeout=2.0)
+        )
+        assert calls == 5
+        assert client.metrics()["coalesce"]["saved"] == 0
+
+
+@pytest.mark.asyncio
+async def test_timing_samples_are_never_coalesced():
+    from sqldetector.timing.twin_sampler import timed_fetch
+
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return httpx.Response(200)
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100)
+    async with HttpClient(settings) as client:
+        times = await asyncio.gather(*(timed_fetch(client, "http://test/") for _ in range(3)))
+        assert calls == 3 and min(times) >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_circuit_is_per_host():
+    def handler(request):
+        if request.url.host == "broken":
+            return httpx.Response(500)
+        return httpx.Response(200)
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, retry_budget=10, rate_limit=100)
+    async with HttpClient(settings) as client:
+        with pytest.raises(WAFBlocked):
+            await client.get("http://broken/")
+        resp = await client.get("http://healthy/")
+        assert resp.status_code == 200
+        assert client.metrics()["circuits"]["broken"]["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_only_throttled_host():
+    calls = 0
+
+    def handler(request):
+        nonlocal calls
+        if request.url.host == "busy":
+            calls += 1
+            if calls == 1:
+                return httpx.Response(
+                    429, headers={"Retry-After": "0.3", "RateLimit-Policy": "2;w=1"}
+                )
+        return httpx.Response(200)
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100, coalesce_requests=False)
+    async with HttpClient(settings) as client:
+        busy = asyncio.create_task(client.get("http://busy/"))
+        await asyncio.sleep(0.05)
+        start = asyncio.get_running_loop().time()
+        assert (await client.get("http://idle/")).status_code == 200
+        assert asyncio.get_running_loop().time() - start < 0.1
+        assert not busy.done()
+        assert (await busy).status_code == 200
+        assert client.metrics()["rate_limit"]["busy"]["rate"] == 2
+
+
+@pytest.mark.asyncio
+async def test_throttling_retries_are_bounded():
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100, throttle_retries=2)
+    async with HttpClient(settings) as client:
+        with pytest.raises(RateLimited):
+            await client.get("http://test/")
+
+
+@pytest.mark.asyncio
+async def test_excessive_retry_after_fails_fast():
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "3600"})
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(transport=transport, rate_limit=100)
+    async with HttpClient(settings) as client:
+        with pytest.raises(RateLimited) as exc:
+            await client.get("http://test/")
+    assert exc.value.retry_after == 3600
@@ -0,0 +1,56 @@
+import random
+
+from sqldetector.guard.honeypot import HoneypotGuard
+from sqldetector.timing.latency import LatencyRegistry, LatencyStats, P2Quantile
+
+
+def test_p2_tracks_exact_quantiles():
+    rng = random.Random(7)
+    data = [rng.expovariate(10) for _ in range(5000)]
+    est = P2Quantile(0.95)
+    for x in data:
+        est.add(x)
+    exact = sorted(data)[int(0.95 * (len(data) - 1))]
+    assert abs(est.value() - exact) / exact < 0.05
+
+
+def test_small_samples_use_exact_order_statistics():
+    stats = LatencyStats()
+    for x in (0.3, 0.2, 0.1):
+        stats.add(x)
+    assert stats.p50 == 0.2
+    assert stats.floor == 0.1
+    assert stats.snapshot()["count"] == 3
+
+
+def test_floor_is_a_windowed_minimum():
+    stats = LatencyStats(floor_window=10)
+    stats.add(0.05)
+    # queuing delay does not pull the floor up while the fast sample is recent
+    for _ in range(15):
+        stats.add(0.5)
+    assert stats.floor == 0.05
+    # a route that stays slower is adopted within two windows
+    for _ in range(5):
+        stats.add(0.5)
+    assert stats.floor == 0.5
+
+
+def test_registry_is_per_host():
+    reg = LatencyRegistry()
+    for _ in range(10):
+        reg.record("a", 0.01)
+        reg.record("b", 1.0)
+    snap = reg.snapshot()
+    assert snap["a"]["p95"] < 0.02 < snap["b"]["p50"]
+
+
+def test_honeypot_threshold_adapts_to_host():
+    guard = HoneypotGuard()
+    for i in range(30):
+        guard.record(f"http://slow/{i}", 4.0)
+    assert guard.threshold("slow") == 12.0
+    guard.record("http://slow/tarpit", 6.0)
+    assert not guard.is_blacklisted("http://slow/tarpit")
+    guard.record("http://fast/tarpit", 6.0)
+    assert guard.is_blacklisted("http://fast/tarpit")
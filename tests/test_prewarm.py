@@ -0,0 +1,67 @@
+import httpx
+import pytest
+
+from sqldetector.core.config import Settings
+from sqldetector.core.http_async import HttpClient
+from sqldetector.net.prewarm import Prewarmer
+
+
+@pytest.mark.asyncio
+async def test_prewarmer_heads_each_origin_once():
+    seen = []
+
+    async def handler(request):
+        seen.append((request.method, request.url.host))
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as raw:
+        warm = Prewarmer(raw, per_host=3)
+        for url in ("https://a.test/x?id=1", "https://a.test/y", "b.test"):
+            warm.add(url)
+        await warm.wait()
+    assert {m for m, _ in seen} == {"HEAD"}
+    # HTTP/1.1 origins get a burst of per_host extra HEADs after the first
+    assert sum(1 for _, h in seen if h == "a.test") == 4
+    assert sum(1 for _, h in seen if h == "b.test") == 4
+
+
+@pytest.mark.asyncio
+async def test_prewarm_bypasses_client_limits_and_stats():
+    async def handler(request):
+        return httpx.Response(200)
+
+    settings = Settings(transport=httpx.MockTransport(handler), rate_limit=1)
+    async with HttpClient(settings) as client:
+        await client.get("https://a.test/")
+        warm = Prewarmer(client._client, per_host=2)
+        warm.add("https://b.test/")
+        await warm.wait()
+        assert warm.origins == {"https://b.test/"}
+        assert "b.test" not in client.latency.snapshot()
+        assert "b.test" not in client._limiter.snapshot()
+
+
+class _Session:
+    def request(self, method, url, **kwargs):
+        if "down" in url:
+            raise ConnectionError("refused")
+        return method
+
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_prewarmer_warms_scraper_sessions():
+    from sqldetector.net.scraper_pool import ScraperPool
+
+    pool = ScraperPool(per_host=2, factory=_Session)
+    try:
+        warm = Prewarmer(pool, per_host=pool.per_host)
+        warm.add("http://a.test/x?id=1")
+        warm.add("http://down.test/")
+        await warm.wait()
+        # the first HEAD and a burst of two leave two reusable sessions
+        assert pool.stats()["a.test"] == {"sessions": 2, "idle": 2}
+    finally:
+        pool.close()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from sqldetector.autopilot import store
+from sqldetector.core.profile_cache import ProfileCache, route_template
+
+
+def _counter():
+    calls = []
+
+    def make(value):
+        async def compute():
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return {"value": value}
+
+        return compute
+
+    return calls, make
+
+
+def test_route_template_normalises_ids():
+    assert route_template("https://Shop.test/item/42?x=1") == "https://shop.test/item/{int}"
+    assert route_template(
+        "https://shop.test/u/3f2a9c1e-5b7d-4e8f-9a0b-1c2d3e4f5a6b/orders"
+    ) == "https://shop.test/u/{uuid}/orders"
+    assert (
+        route_template("https://shop.test/blob/deadbeefdeadbeef00")
+        == "https://shop.test/blob/{hex}"
+    )
+    assert route_template("https://shop.test/about-us") == "https://shop.test/about-us"
+
+
+@pytest.mark.asyncio
+async def test_host_profiles_are_shared_and_coalesced():
+    calls, make = _counter()
+    cache = ProfileCache()
+    urls = [f"https://a.test/p/{i}?id={i}" for i in range(10)]
+    results = await asyncio.gather(*(cache.for_host("waf", u, make(u)) for u in urls))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    await cache.for_host("waf", "https://b.test/", make("b"))
+    assert len(calls) == 2
+    assert cache.stats()["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_route_profiles_expire_and_failures_are_not_cached():
+    now = [1000.0]
+    calls, make = _counter()
+    cache = ProfileCache(ttl=60, clock=lambda: now[0])
+    await cache.for_route("behaviour", "https://a.test/item/1", make(1))
+    await cache.for_route("behaviour", "https://a.test/item/2", make(2))
+    await cache.for_route("behaviour", "https://a.test/cart", make(3))
+    assert calls == [1, 3]
+    now[0] += 61
+    await cache.for_route("behaviour", "https://a.test/item/2", make(4))
+    assert calls == [1, 3, 4]
+
+    async def broken():
+        raise RuntimeError("timeout")
+
+    with pytest.raises(RuntimeError):
+        await cache.for_host("waf", "https://a.test/", broken)
+    assert (await cache.for_host("waf", "https://a.test/", make(5))) == {"value": 5}
+
+
+@pytest.mark.asyncio
+async def test_profiles_persist_through_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(store, "STORE_PATH", tmp_path / "store.json")
+    store.save("a.test", {"latency": 1}, "turbo")
+    calls, make = _counter()
+    cache = ProfileCache(persist=True)
+    await cache.for_host("waf", "https://a.test/x", make("waf"))
+    await cache.for_host("opaque", "https://a.test/x", lambda: asyncio.sleep(0, object()))
+    await cache.aclose()
+    assert store.load("a.test")["chosen_preset"] == "turbo"
+    assert list(store.load_profiles("a.test")) == ["waf https://a.test"]
+
+    fresh = ProfileCache(persist=True)
+    assert await fresh.for_host("waf", "https://a.test/y", make("again")) == {"value": "waf"}
+    assert calls == ["waf"]
+    expired = ProfileCache(ttl=60, persist=True, clock=lambda: 1e12)
+    await expired.for_host("waf", "https://a.test/y", make("again"))
+    assert calls == ["waf", "again"]
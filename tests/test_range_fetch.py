@@ -4,6 +4,7 @@ import httpx
 
 from sqldetector.core.config import Settings
 from sqldetector.core.http_async import HttpClient
+from sqldetector.fetch.range_cache import RangeSupportCache
 
 
 def test_range_fetch_supported():
@@ -12,7 +13,8 @@ def test_range_fetch_supported():
     def handler(request: httpx.Request) -> httpx.Response:
         calls.append(request.headers.get("Range"))
         assert calls[0] is not None
-        return httpx.Response(206, headers={"Accept-Ranges": "bytes", "Content-Type": "text/html"}, text="part")
+        headers = {"Accept-Ranges": "bytes", "Content-Type": "text/html"}
+        return httpx.Response(206, headers=headers, text="part")
 
     transport = httpx.MockTransport(handler)
     settings = Settings(range_fetch_kb=1, transport=transport)
@@ -26,23 +28,79 @@ def test_range_fetch_supported():
     assert calls == ["bytes=0-1023"]
 
 
-def test_range_fetch_fallback():
+def test_range_ignored_reuses_full_body():
     calls: list[str | None] = []
 
     def handler(request: httpx.Request) -> httpx.Response:
         calls.append(request.headers.get("Range"))
-        if len(calls) == 1:
-            return httpx.Response(200, headers={"Content-Type": "text/html"}, text="full")
         return httpx.Response(200, headers={"Content-Type": "text/html"}, text="full")
 
     transport = httpx.MockTransport(handler)
     settings = Settings(range_fetch_kb=1, transport=transport)
 
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            resp = await client.get("http://test/")
+            assert resp.status_code == 200 and resp.text == "full"
+
+    asyncio.run(run())
+    assert calls == ["bytes=0-1023"]
+
+
+def test_range_fetch_fallback():
+    calls: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers.get("Range"))
+        if request.headers.get("Range"):
+            # partial binary content is of no use to the detectors
+            headers = {"Accept-Ranges": "bytes", "Content-Type": "image/png"}
+            return httpx.Response(206, headers=headers, content=b"part")
+        return httpx.Response(200, headers={"Content-Type": "image/png"}, content=b"full")
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(range_fetch_kb=1, transport=transport)
+
     async def run() -> None:
         async with HttpClient(settings) as client:
             resp = await client.get("http://test/")
             assert resp.status_code == 200
 
     asyncio.run(run())
-    assert calls[0] == "bytes=0-1023" and calls[1] is None
+    assert calls == ["bytes=0-1023", None]
+
+
+def test_range_support_is_remembered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.headers.get("Range"))
+        return httpx.Response(200, headers={"Content-Type": "text/html"}, text="x" * 2048)
+
+    transport = httpx.MockTransport(handler)
+    settings = Settings(range_fetch_kb=1, transport=transport)
+
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            for _ in range(4):
+                await client.get("http://test/")
+
+    asyncio.run(run())
+    # two probes reuse the full body, afterwards no Range header is sent
+    assert calls == ["bytes=0-1023", "bytes=0-1023", None, None]
+    assert (tmp_path / "cache" / "range.json").exists()
+
 
+def test_range_cache_entries_expire(tmp_path):
+    now = [1000.0]
+    path = tmp_path / "range.json"
+    cache = RangeSupportCache(path, ttl=60, clock=lambda: now[0])
+    for _ in range(2):
+        cache.record("a.test", useful=False)
+    assert not cache.should_range("a.test")
+    cache.save()
+    assert not RangeSupportCache(path, ttl=60, clock=lambda: now[0]).should_range("a.test")
+    now[0] += 61
+    assert RangeSupportCache(path, ttl=60, clock=lambda: now[0]).hosts == {}
+    assert cache.should_range("a.test")
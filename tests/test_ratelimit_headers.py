@@ -0,0 +1,26 @@
+from email.utils import formatdate
+
+from sqldetector.modules.pacing.ratelimit import learn, parse, parse_retry_after
+
+
+def test_retry_after_forms():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after(formatdate(1000.0 + 30, usegmt=True), now=1000.0) == 30
+    assert parse_retry_after("soon") is None
+
+
+def test_ratelimit_headers():
+    policy = parse({"RateLimit-Limit": "100", "RateLimit-Remaining": "0", "RateLimit-Reset": "12",
+                    "RateLimit-Policy": "100;w=60"})
+    assert policy.delay == 12
+    assert abs(policy.rate - 100 / 60) < 1e-9
+    structured = parse({"RateLimit": "limit=10, remaining=5, reset=5"})
+    assert structured.rate == 1
+
+
+def test_x_ratelimit_epoch_reset():
+    policy = parse(
+        {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1700000060"}, now=1_700_000_000
+    )
+    assert policy.delay == 60
+    assert learn({"X-RateLimit-Limit": "20"}) == 20
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from sqldetector.net.dialer import interleave, race
+from sqldetector.net.transport import ResolvingBackend, ResolvingTransport
+
+
+class FakeDNS:
+    def __init__(self, addrs):
+        self.addrs = addrs
+        self.calls = 0
+
+    async def resolve(self, host):
+        self.calls += 1
+        return list(self.addrs)
+
+
+class FakeStream:
+    def __init__(self, addr):
+        self.addr = addr
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeBackend:
+    """IPv6 hangs, IPv4 connects after a short delay."""
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if ":" in host:
+            await asyncio.sleep(10)
+        await asyncio.sleep(0.01)
+        return FakeStream(host)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+def test_interleave_prefers_ipv6_and_alternates():
+    addrs = ["1.1.1.1", "2.2.2.2", "::1", "1.1.1.1", "::2"]
+    assert interleave(addrs) == ["::1", "1.1.1.1", "::2", "2.2.2.2"]
+
+
+@pytest.mark.asyncio
+async def test_race_falls_back_to_ipv4_after_delay():
+    backend = ResolvingBackend(FakeDNS(["::1", "10.0.0.1"]), delay=0.05, backend=FakeBackend())
+    start = asyncio.get_running_loop().time()
+    stream = await backend.connect_tcp("example.test", 443)
+    assert stream.addr == "10.0.0.1"
+    assert asyncio.get_running_loop().time() - start < 0.5
+    assert backend.snapshot()["ipv4"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_race_raises_last_error_when_all_fail():
+    async def connect(target):
+        raise ConnectionRefusedError(target)
+
+    with pytest.raises(ConnectionRefusedError):
+        await race(["a", "b"], connect, delay=0.01)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.headers["Host"].encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_transport_dials_cached_address_with_original_host():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    dns = FakeDNS(["127.0.0.1"])
+    port = server.server_port
+    try:
+        async with httpx.AsyncClient(transport=ResolvingTransport(dns)) as client:
+            resp = await client.get(f"http://scan-target.invalid:{port}/")
+    finally:
+        server.shutdown()
+    assert resp.text == f"scan-target.invalid:{port}"
+    assert dns.calls == 1
+
+
+def test_transport_builds_one_pool(monkeypatch):
+    contexts = []
+    create = httpx.create_ssl_context
+
+    def counting(**kwargs):
+        contexts.append(kwargs)
+        return create(**kwargs)
+
+    monkeypatch.setattr(httpx, "create_ssl_context", counting)
+    monkeypatch.setattr(httpx._transports.default, "create_ssl_context", counting)
+    transport = ResolvingTransport(FakeDNS([]))
+    assert len(contexts) == 1
+    assert transport._pool._network_backend is transport.backend
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:`verify=<str>` is deprecated:DeprecationWarning")
+async def test_client_keeps_env_proxies(monkeypatch):
+    from sqldetector.core.config import Settings
+    from sqldetector.core.http_async import HttpClient
+
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    async with HttpClient(Settings(), dns=FakeDNS(["127.0.0.1"])) as client:
+        assert client._resolving is not None
+    monkeypatch.setenv("HTTPS_PROXY", "http://127.0.0.1:3128")
+    async with HttpClient(Settings(), dns=FakeDNS(["127.0.0.1"])) as client:
+        # the proxy resolves target names, httpx mounts its proxy transport
+        assert client._resolving is None
+        assert any(t is not None for t in client._client._mounts.values())
@@ -0,0 +1,51 @@
+from sqldetector.detect.features import FeatureCache, extract_features, profile_distance
+
+PAGE = """<html><head><title>Shop</title><script src="/app.js"></script></head>
+<body><nav>Home | Cart</nav>
+<main><h1>Item</h1><p>Price <b>10</b><!-- promo -->EUR</p><style>p{}</style></main>
+<form action="/search" method="POST"><input name="q" value="x"><textarea name="t"></textarea></form>
+</body></html>"""
+
+
+def test_single_pass_features():
+    f = extract_features(PAGE)
+    assert f.core_text == "Item Price 10 EUR"
+    assert f.tags["p"] == 1 and f.tags["input"] == 1
+    assert f.forms == [{"action": "/search", "method": "post", "inputs": {"q": "x", "t": ""}}]
+    assert f.script_urls == ["/app.js"]
+    assert f.size == len(PAGE)
+    assert not f.sql_error
+    assert abs(sum(f.tag_profile.values()) - 1.0) < 1e-9
+
+
+def test_error_hits_and_empty_bodies():
+    f = extract_features("<p>Warning: mysql_fetch_array() expects</p>")
+    assert f.sql_error and f.errors == ["Warning: mysql_"]
+    assert extract_features("<pre>DataSourceError: bad query</pre>").sql_error
+    empty = extract_features("")
+    assert empty.core_text == "" and empty.tags == {} and empty.size == 0
+
+
+def test_memoized_by_body_digest():
+    cache = FeatureCache(max_entries=2)
+    a = cache.get(PAGE)
+    assert cache.get(PAGE) is a
+    cache.get("<p>b</p>")
+    cache.get("<p>c</p>")
+    assert cache.get(PAGE) is not a  # evicted
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 4}
+
+
+def test_str_and_bytes_bodies_are_cached_apart():
+    cache = FeatureCache()
+    text = "<p>caf\u00e9</p>"
+    as_bytes = cache.get(text.encode())
+    as_text = cache.get(text)
+    assert as_bytes is not as_text
+    assert (as_text.size, as_bytes.size) == (len(text), len(text.encode()))
+
+
+def test_profile_distance():
+    a = extract_features("<p>a</p>").tag_profile
+    assert profile_distance(a, a) == 0
+    assert profile_distance(a, extract_features("<div>a</div>").tag_profile) > 0
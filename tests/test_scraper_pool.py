@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from sqldetector.net.scraper_pool import ScraperPool
+
+
+class FakeSession:
+    created = 0
+    lock = threading.Lock()
+    active = {}
+    peak = {}
+
+    def __init__(self):
+        with FakeSession.lock:
+            FakeSession.created += 1
+
+    def request(self, method, url, **kwargs):
+        host = url.split("/")[2]
+        with FakeSession.lock:
+            FakeSession.active[host] = FakeSession.active.get(host, 0) + 1
+            FakeSession.peak[host] = max(FakeSession.peak.get(host, 0), FakeSession.active[host])
+        time.sleep(0.05)
+        with FakeSession.lock:
+            FakeSession.active[host] -= 1
+        if "fail" in url:
+            raise ConnectionError("boom")
+        return (method, url, id(self))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    FakeSession.created = 0
+    FakeSession.active = {}
+    FakeSession.peak = {}
+
+
+@pytest.mark.asyncio
+async def test_requests_run_concurrently_within_host_limit():
+    pool = ScraperPool(per_host=2, max_workers=8, factory=FakeSession)
+    start = time.monotonic()
+    urls = [f"http://{h}/{i}" for h in ("a", "b") for i in range(4)]
+    results = await asyncio.gather(*(pool.get(u) for u in urls))
+    elapsed = time.monotonic() - start
+    pool.close()
+    assert [r[1] for r in results] == urls
+    # 4 requests per host, 2 at a time -> two rounds, hosts in parallel
+    assert elapsed < 0.35
+    assert FakeSession.peak == {"a": 2, "b": 2}
+    assert FakeSession.created == 4
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_reused_and_errors_propagate():
+    pool = ScraperPool(per_host=1, factory=FakeSession)
+    first = await pool.get("http://a/x")
+    with pytest.raises(ConnectionError):
+        await pool.post("http://a/fail")
+    second = await pool.get("http://a/y")
+    assert first[2] == second[2]
+    assert pool.stats() == {"a": {"sessions": 1, "idle": 1}}
+    pool.close()
@@ -0,0 +1,84 @@
+import asyncio
+import random
+
+import pytest
+
+from sqldetector.timing.sequential import SPRT, SequentialTimingEngine, alpha_spent
+
+
+def _fake_server(delays, seed=0):
+    """``send`` advancing a virtual clock by the delay of each URL plus jitter."""
+    rng = random.Random(seed)
+    now = [0.0]
+    sent = []
+
+    async def send(url):
+        sent.append(url)
+        if url.endswith("broken"):
+            raise ConnectionError("reset")
+        now[0] += delays.get(url, 0.1) + rng.uniform(0, 0.05)
+
+    return send, (lambda: now[0]), sent
+
+
+def test_sprt_and_spending_bounds():
+    sprt = SPRT(1 / 3, 0.9, alpha=0.01, beta=0.05)
+    assert [sprt.update(True) for _ in range(5)][-1] is True
+    sprt = SPRT(1 / 3, 0.9, alpha=0.01, beta=0.05)
+    assert [sprt.update(False) for _ in range(2)] == [None, False]
+    assert alpha_spent(0.0, 0.05) == 0.0
+    assert alpha_spent(1.0, 0.05) == pytest.approx(0.05)
+    assert alpha_spent(0.5, 0.05) > 0.025  # Pocock-type: front-loaded
+    with pytest.raises(ValueError):
+        SequentialTimingEngine(lambda r: None, method="t-test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["sprt", "mann-whitney"])
+async def test_slow_variant_detected_and_null_stops_early(method):
+    send, clock, sent = _fake_server({"http://a.test/?id=1'sleep": 2.0})
+    engine = SequentialTimingEngine(send, method=method, alpha=0.05, max_rounds=10, clock=clock)
+    slow, null = await engine.test_many(
+        "http://a.test/?id=1", ["http://a.test/?id=1'sleep", "http://a.test/?id=1'"]
+    )
+    assert slow.detected and slow.decided
+    assert slow.rounds < 10 and slow.shift > 1.5
+    assert not null.detected
+    assert engine.requests == len(sent) == slow.requests + null.requests
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["sprt", "mann-whitney"])
+async def test_null_variants_stop_well_before_the_round_cap(method):
+    requests = []
+    for seed in range(20):
+        send, clock, _ = _fake_server({}, seed)
+        engine = SequentialTimingEngine(send, method=method, max_rounds=10, clock=clock)
+        verdict = await engine.test("http://a.test/?id=1", "http://a.test/?id=1'")
+        assert not verdict.detected
+        requests.append(verdict.requests)
+    # a fixed design would spend 1 + 2 * 10 requests on each
+    assert sum(requests) / len(requests) < 13
+
+
+@pytest.mark.asyncio
+async def test_failed_rounds_are_discarded_and_host_limit_holds():
+    send, clock, _ = _fake_server({})
+    inflight = peak = 0
+
+    async def limited(url):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        await asyncio.sleep(0.001)
+        inflight -= 1
+        await send(url)
+
+    engine = SequentialTimingEngine(limited, per_host=2, max_errors=2, clock=clock)
+    verdicts = await engine.test_many(
+        "http://a.test/", [f"http://a.test/?q={i}" for i in range(6)] + ["http://a.test/broken"]
+    )
+    assert [v.variant for v in verdicts][-1] == "http://a.test/broken"
+    broken = verdicts[-1]
+    assert broken.errors == 2 and broken.rounds == 0 and not broken.decided
+    assert peak == 2
@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import pytest
+
+from sqldetector.detect.sql_errors import SQL_ERROR_RX
+from sqldetector.pacing.host_bucket import SharedRateLimiter
+from sqldetector.runners.sharded import run_sharded, shards_for
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        body = b"ok"
+        if "'" in query.get("id", ""):
+            body = b"You have an error in your SQL syntax; check the manual for MySQL"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_shards_are_endpoint_by_param():
+    shards = shards_for(["http://t/a?id=1&q=x", "http://t/b", "http://t/a?id=1&q=x"])
+    assert shards == [("http://t/a?id=1&q=x", "id"), ("http://t/a?id=1&q=x", "q")]
+
+
+def _drain(limiter, host, n, out):
+    async def go():
+        for _ in range(n):
+            await limiter.acquire(host)
+            out.put((host, time.monotonic()))
+
+    asyncio.run(go())
+
+
+def _run_workers(limiter, ctx, jobs):
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_drain, args=(limiter, host, n, out)) for host, n in jobs]
+    for p in procs:
+        p.start()
+    stamps = [out.get(timeout=30) for _ in range(sum(n for _, n in jobs))]
+    for p in procs:
+        p.join(10)
+    by_host = {}
+    for host, ts in stamps:
+        by_host.setdefault(host, []).append(ts)
+    return {host: max(ts) - min(ts) for host, ts in by_host.items()}
+
+
+def test_shared_buckets_limit_each_host_across_processes():
+    ctx = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(
+        20, 1, {"*.slow.test": 10}, hosts=["a.test", "b.test"], ctx=ctx
+    )
+    # two processes on one host share its 20 rps: 20 tokens take ~0.95 s;
+    # b.test has its own bucket and finishes its 10 in ~0.45 s meanwhile
+    spans = _run_workers(limiter, ctx, [("a.test", 10), ("a.test", 10), ("b.test", 10)])
+    assert spans["a.test"] >= 0.8
+    assert spans["b.test"] < 0.8
+    # hosts matching one override pattern share that pattern's bucket
+    spans = _run_workers(limiter, ctx, [("x.slow.test", 5), ("y.slow.test", 5)])
+    assert max(spans.values()) >= 0.7
+
+
+def test_unknown_hosts_claim_their_own_shared_buckets():
+    ctx = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(20, 1, ctx=ctx)
+    # hosts first seen in the workers get separate buckets, yet two processes
+    # on the same unknown host still map it to one bucket
+    spans = _run_workers(limiter, ctx, [("u1.test", 10), ("u2.test", 10)])
+    assert max(spans.values()) < 0.8
+    spans = _run_workers(limiter, ctx, [("u3.test", 10), ("u3.test", 10)])
+    assert spans["u3.test"] >= 0.8
+
+
+def _learn(limiter, host, rate):
+    limiter.learn(host, rate)
+
+
+def test_learned_rate_only_throttles_its_host():
+    ctx = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(20, 1, {"*.slow.test": 10}, ctx=ctx)
+    p = ctx.Process(target=_learn, args=(limiter, "x.slow.test", 1))
+    p.start()
+    p.join(30)
+    assert limiter.bucket("x.slow.test").rate == 1
+    assert limiter.bucket("y.slow.test").rate == 10
+    assert limiter.bucket("z.test").rate == 20
+
+
+async def _probe_worker(shards, limiter, report, marker):
+    async with httpx.AsyncClient() as client:
+        async for url, param in shards:
+            await limiter.acquire(httpx.URL(url).host)
+            r = await client.get(url, params={param: marker})
+            if SQL_ERROR_RX.search(r.text):
+                report("finding", {"url": url, "param": param})
+            report("done", (url, param))
+
+
+@pytest.mark.asyncio
+async def test_workers_stream_findings_back():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [f"{base}/p{i}?id=1&q=2" for i in range(4)]
+    seen, progress = [], []
+    try:
+        findings = await asyncio.wait_for(
+            run_sharded(
+                shards_for(urls),
+                _probe_worker,
+                workers=2,
+                args=("'",),
+                progress=progress.append,
+                on_finding=seen.append,
+            ),
+            timeout=60,
+        )
+    finally:
+        server.shutdown()
+    assert sorted(f["url"] for f in findings) == sorted(urls)
+    assert all(f["param"] == "id" for f in findings)
+    assert seen == findings
+    assert progress[-1] == 100.0 and len(progress) == 8
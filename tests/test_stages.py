@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from sqldetector.core.stages import Stage, StagedPipeline
+
+
+@pytest.mark.asyncio
+async def test_items_flow_through_all_stages():
+    async def double(x):
+        await asyncio.sleep(0)
+        return x * 2
+
+    pipe = StagedPipeline(
+        [
+            Stage("double", double, workers=3),
+            Stage("drop_odd_tens", lambda x: None if x % 20 else x),
+            Stage("split", lambda x: [x, x + 1], fan_out=True, workers=2),
+        ]
+    )
+    out = [x async for x in pipe.run(range(50))]
+    assert sorted(out) == [0, 1, 20, 21, 40, 41, 60, 61, 80, 81]
+    assert pipe.processed["double"] == 50
+
+
+@pytest.mark.asyncio
+async def test_network_and_cpu_stages_overlap():
+    async def fetch(x):
+        await asyncio.sleep(0.05)
+        return x
+
+    def crunch(x):
+        time.sleep(0.05)
+        return x
+
+    pipe = StagedPipeline(
+        [Stage("fetch", fetch, workers=4), Stage("crunch", crunch, workers=1, offload=True)]
+    )
+    start = time.monotonic()
+    out = [x async for x in pipe.run(range(8))]
+    elapsed = time.monotonic() - start
+    assert sorted(out) == list(range(8))
+    # serial would be 8 * 0.1s; pipelined is bounded by the CPU stage (8 * 0.05s)
+    assert elapsed < 0.65
+
+
+@pytest.mark.asyncio
+async def test_per_host_limit_and_errors():
+    active = {}
+    peak = {}
+
+    async def visit(item):
+        host, n = item
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+        if n == 3:
+            raise ValueError("boom")
+        return item
+
+    errors = []
+    pipe = StagedPipeline(
+        [Stage("visit", visit, workers=6, per_host=2)],
+        host_of=lambda item: item[0],
+        on_error=lambda stage, item, exc: errors.append((stage, item)),
+    )
+    items = [(h, n) for h in ("a", "b") for n in range(5)]
+    out = [x async for x in pipe.run(items)]
+    assert len(out) == 8
+    assert peak == {"a": 2, "b": 2}
+    assert errors == [("visit", ("a", 3)), ("visit", ("b", 3))]
+
+
+@pytest.mark.asyncio
+async def test_bounded_queues_pull_input_lazily():
+    pulled = []
+
+    def source():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    async def slow(x):
+        await asyncio.sleep(0.01)
+        return x
+
+    pipe = StagedPipeline([Stage("slow", slow, workers=1, queue=2)])
+    stream = pipe.run(source())
+    first = await stream.__anext__()
+    assert first == 0
+    assert len(pulled) < 10
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failing_fan_out_and_error_hook_do_not_stall():
+    def split(x):
+        yield x
+        if x == 2:
+            raise ValueError("broken generator")
+        yield x + 10
+
+    def hook(stage, item, exc):
+        raise RuntimeError("hook failed")
+
+    pipe = StagedPipeline(
+        [Stage("split", split, fan_out=True, workers=2), Stage("pass", lambda x: x)],
+        on_error=hook,
+    )
+
+    async def collect():
+        return sorted([x async for x in pipe.run(range(4))])
+
+    out = await asyncio.wait_for(collect(), timeout=3)
+    assert out == [0, 1, 2, 3, 10, 11, 13]
+    assert [type(e).__name__ for _, _, e in pipe.errors] == ["ValueError", "RuntimeError"]
+    assert pipe.processed == {"split": 3, "pass": 7}
@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from sqldetector.core.config import Settings
+from sqldetector.core.http_async import HttpClient
+from sqldetector.detect.stream_match import first_match
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith(".bin"):
+        headers = {"Content-Type": "application/octet-stream"}
+        return httpx.Response(200, headers=headers, content=b"\0" * 4096)
+    body = b"<html>" + b"a" * 5000 + b"You have an error in your SQL syntax; MySQL" + b"b" * 5000
+    return httpx.Response(200, headers={"Content-Type": "text/html"}, content=body)
+
+
+def test_max_body_kb_truncates_and_skips_binary():
+    settings = Settings(transport=httpx.MockTransport(_handler), max_body_kb=2)
+
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            resp = await client.get("http://test/page")
+            assert len(resp.content) == 2048
+            assert resp.extensions["body_truncated"]
+            resp = await client.get("http://test/export.bin")
+            assert resp.content == b""
+            assert resp.extensions["body_skipped"]
+
+    asyncio.run(run())
+
+
+def test_iter_body_stops_at_first_match():
+    settings = Settings(transport=httpx.MockTransport(_handler))
+
+    async def run() -> None:
+        async with HttpClient(settings) as client:
+            async with client.stream("GET", "http://test/page") as resp:
+                m = await first_match(client.iter_body(resp), r"SQL syntax.*MySQL", overlap=64)
+                assert m is not None
+
+    asyncio.run(run())
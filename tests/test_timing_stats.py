@@ -1,4 +1,16 @@
-from sqldetector.detect.timing_stats import evaluate_timing, sequential_test
+import random
+
+import pytest
+
+from sqldetector.detect import timing_stats
+from sqldetector.detect.timing_stats import (
+    OnlineMannWhitney,
+    _cliffs_delta,
+    _mann_whitney_u,
+    evaluate_timing,
+    evaluate_timing_batch,
+    sequential_test,
+)
 
 
 def test_evaluate_timing_detects_difference():
@@ -22,3 +34,63 @@ def test_sequential_test_stops_early():
     detected, stats = sequential_test(next_control, next_variant, max_rounds=5, alpha=0.05)
     assert detected
     assert stats["rounds"] < 5
+
+
+def _brute(control, variant):
+    gt = sum(a > b for a in control for b in variant)
+    lt = sum(a < b for a in control for b in variant)
+    pairs = len(control) * len(variant)
+    u1 = gt + (pairs - gt - lt) / 2
+    return min(u1, pairs - u1), (gt - lt) / pairs
+
+
+def _samples(seed, n1=9, n2=7):
+    rng = random.Random(seed)
+    # millisecond-quantised timings produce plenty of ties
+    control = [round(rng.uniform(0.1, 0.12), 3) for _ in range(n1)]
+    variant = [round(rng.uniform(0.1, 0.13), 3) for _ in range(n2)]
+    return control, variant
+
+
+def test_ties_get_average_ranks_and_corrected_variance():
+    u, p = _mann_whitney_u([1, 2, 3], [4, 5, 6])
+    assert u == 0 and p == pytest.approx(0.0495, abs=1e-4)
+    # ties shrink the variance, so the same separation is more significant
+    _, p_tied = _mann_whitney_u([1, 1, 1], [2, 2, 2])
+    assert p_tied < p
+    assert _mann_whitney_u([0.1] * 4, [0.1] * 5) == (10.0, 1.0)
+    for seed in range(20):
+        control, variant = _samples(seed)
+        u, delta = _brute(control, variant)
+        assert _mann_whitney_u(control, variant)[0] == pytest.approx(u)
+        assert _cliffs_delta(control, variant) == pytest.approx(delta)
+
+
+def test_online_updates_match_full_recomputation():
+    control, variant = _samples(7, 12, 12)
+    state = OnlineMannWhitney()
+    for c, v in zip(control, variant):
+        state.add_control(c)
+        state.add_variant(v)
+        expected = evaluate_timing(state.control, state.variant)
+        got = state.result()
+        assert got["u"] == pytest.approx(expected["u"])
+        assert got["p"] == pytest.approx(expected["p"])
+        assert got["cliffs_delta"] == pytest.approx(expected["cliffs_delta"])
+
+
+def test_batch_matches_pairwise_evaluation():
+    pairs = [_samples(seed) for seed in range(50)]
+    batch = evaluate_timing_batch([c for c, _ in pairs], [v for _, v in pairs])
+    for i, (control, variant) in enumerate(pairs):
+        expected = evaluate_timing(control, variant)
+        assert float(batch["u"][i]) == pytest.approx(expected["u"])
+        assert float(batch["p"][i]) == pytest.approx(expected["p"])
+        assert float(batch["cliffs_delta"][i]) == pytest.approx(expected["cliffs_delta"])
+
+
+def test_batch_falls_back_without_numpy(monkeypatch):
+    monkeypatch.setattr(timing_stats, "np", None)
+    control, variant = _samples(3)
+    batch = evaluate_timing_batch([control], [variant])
+    assert batch["p"] == [evaluate_timing(control, variant)["p"]]
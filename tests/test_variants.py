@@ -0,0 +1,51 @@
+from urllib.parse import parse_qs, urlparse
+
+from sqldetector.payload.variants import Transform, VariantGenerator, wire_form
+
+PAYLOADS = ["' OR 1=1--", "1 AND 1=2", "' OR 1=1--"]
+
+
+def test_values_are_unique_on_the_wire_and_budgeted():
+    gen = VariantGenerator(budget=50)
+    values = [v for v, _ in gen.values(PAYLOADS)]
+    assert len(values) == 50
+    assert len({wire_form(v) for v in values}) == 50
+    assert values[0] == "' OR 1=1--"  # raw top payload has the highest value
+
+
+def test_order_follows_expected_value():
+    transforms = (Transform("upper", str.upper, 0.9), Transform("rev", lambda p: p[::-1], 0.1))
+    gen = VariantGenerator(transforms, budget=10, depth=1, decay=0.5)
+    labels = list(gen.values(["ab", "cd"]))
+    # raw ab (1.0), upper ab (0.9), raw cd (0.5), upper cd (0.45), rev ab, rev cd
+    assert labels == [
+        ("ab", "raw"),
+        ("AB", "upper"),
+        ("cd", "raw"),
+        ("CD", "upper"),
+        ("ba", "rev"),
+        ("dc", "rev"),
+    ]
+
+
+def test_equivalent_encodings_are_sent_once():
+    # both transforms are no-ops for a payload without quotes or spaces
+    gen = VariantGenerator(budget=100)
+    assert [v for v, _ in gen.values(["1"])][:1] == ["1"]
+    assert gen.stats()["duplicates"] > 0
+
+
+def test_query_and_form_variants_are_lazy():
+    gen = VariantGenerator(budget=3, headersets=[None, {"Accept": "application/json"}])
+    stream = gen.for_query("http://x/p?id=5&q=a", "id", PAYLOADS)
+    first = next(stream)
+    assert gen.generated == 1
+    method, url, param, data, headers = first
+    assert method == "GET" and param == "id" and headers is None
+    assert parse_qs(urlparse(url).query)["id"] == ["5' OR 1=1--"]
+    assert len(list(stream)) == 5
+
+    form = {"action": "http://x/login", "inputs": {"u": "bob", "p": ""}}
+    posts = list(gen.for_form(form, "u", PAYLOADS))
+    assert len(posts) == 6
+    assert posts[0][3] == {"u": "bob' OR 1=1--", "p": ""}
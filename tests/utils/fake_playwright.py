@@ -0,0 +1,105 @@
+"""Minimal stand-in for ``playwright.async_api`` used by browser pool tests."""
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.method = "GET"
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, request, log):
+        self.request = request
+        self.log = log
+
+    async def abort(self):
+        self.log.append(("abort", self.request.url))
+
+    async def continue_(self):
+        self.log.append(("continue", self.request.url))
+
+
+class FakePage:
+    # (suffix, resource type) requested by every navigation
+    subresources = [("/api", "xhr")]
+
+    def __init__(self, context):
+        self.context = context
+        self.handlers = {}
+        self.closed = False
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def goto(self, url):
+        for suffix, kind in self.subresources:
+            req = FakeRequest(url + suffix, kind)
+            if "request" in self.handlers:
+                self.handlers["request"](req)
+            if self.context.router is not None:
+                await self.context.router(FakeRoute(req, self.context.browser.routed))
+
+    async def query_selector_all(self, selector):
+        return []
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.router = None
+        self.pages = 0
+        self.closed = False
+
+    async def route(self, pattern, handler):
+        self.router = handler
+
+    async def new_page(self):
+        self.pages += 1
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+        self.routed = []
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        ctx = FakeContext(self, options)
+        self.contexts.append(ctx)
+        return ctx
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = self
+        self.browsers = []
+        self.stopped = False
+
+    async def launch(self, headless=True, args=None):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        self.stopped = True